@@ -0,0 +1,154 @@
+"""
+Admin commands
+
+Commands for keeping an eye on the running Druidia world. They are
+added to the CharacterCmdSet in `commands/default_cmdsets.py`.
+
+"""
+
+import time
+
+from commands.command import MuxCommand
+
+from world import janitor, stats
+
+
+class CmdJanitor(MuxCommand):
+    """
+    Show what the world janitor cleaned up
+
+    Usage:
+      @janitor
+      @janitor/run
+
+    Switches:
+      run - do a full pass right now instead of waiting for the next one.
+
+    The janitor regularly removes stale ticker subscriptions, stranded
+    weapons and light sources and other leftovers of play. Without
+    switches, this shows the report of its last pass.
+    """
+
+    key = "@janitor"
+    switch_options = ("run",)
+    locks = "cmd:perm(Builder)"
+    help_category = "Admin"
+
+    def func(self):
+        """Show the report, optionally after a new pass."""
+        if "run" in self.switches:
+            report = janitor.run_pass()
+        else:
+            report = janitor.last_report()
+        if not report:
+            self.caller.msg("The janitor has not finished a pass yet.")
+            return
+        removed = report["removed"]
+        lines = [
+            "|wLast janitor pass|n (finished %s ago):"
+            % _ago(time.time() - report["finished"]),
+            "  checked: %i items in %i chunks" % (report["checked"], report["chunks"]),
+            "  cost: %.1f ms" % (report["seconds"] * 1000),
+        ]
+        if removed:
+            lines.extend("  %s: %i" % (what, num) for what, num in removed.items())
+        else:
+            lines.append("  nothing to clean up")
+        self.caller.msg("\n".join(lines))
+
+
+class CmdStats(MuxCommand):
+    """
+    Show what the world is made of
+
+    Usage:
+      @stats
+      @stats/recount
+
+    Switches:
+      recount - count everything from scratch right now.
+
+    Shows the running counts of rooms, exits, mobiles, objects, areas
+    and help entries, as reported to MUD listing sites over MSSP.
+    """
+
+    key = "@stats"
+    switch_options = ("recount",)
+    locks = "cmd:perm(Builder)"
+    help_category = "Admin"
+
+    def func(self):
+        """Show the counts."""
+        if "recount" in self.switches:
+            stats.recount()
+        counts = stats.snapshot()
+        info = stats.info()
+        lines = ["|wWorld stats|n"]
+        lines.extend("  %s: %i" % (key, counts[key]) for key in stats.STATS_KEYS)
+        if info["recounted"]:
+            lines.append(
+                "  last recount %s ago, off by %i"
+                % (_ago(time.time() - info["recounted"]), info["drift"])
+            )
+        else:
+            lines.append("  not recounted yet")
+        self.caller.msg("\n".join(lines))
+
+
+class CmdLatency(MuxCommand):
+    """
+    Show how fast sessions send commands and how long they take
+
+    Usage:
+      @latency
+
+    Lists the connected sessions, slowest first, with their recent rate
+    of commands per minute, the average and longest processing time of
+    their latest commands, how many commands the throttle dropped and
+    how many tokens are left in their throttle bucket.
+    """
+
+    key = "@latency"
+    locks = "cmd:perm(Admin)"
+    help_category = "Admin"
+
+    def func(self):
+        """List the sessions."""
+        from evennia.server.sessionhandler import SESSION_HANDLER
+
+        rows = [
+            (session, session.latency_stats())
+            for session in SESSION_HANDLER.values()
+            if hasattr(session, "latency_stats")
+        ]
+        if not rows:
+            self.caller.msg("No sessions with latency stats.")
+            return
+        rows.sort(key=lambda row: row[1]["average"], reverse=True)
+        lines = ["|wSession latency|n"]
+        for session, latency in rows:
+            lines.append(
+                "  #%i %s (%s): %.1f cmds/min, avg %.1f ms, max %.1f ms (%s), "
+                "throttled %i, tokens %.1f"
+                % (
+                    session.sessid,
+                    session.account or "unlogged",
+                    session.puppet or "-",
+                    latency["rate"],
+                    latency["average"] * 1000,
+                    latency["max"] * 1000,
+                    latency["slowest"] or "-",
+                    latency["throttled"],
+                    latency["tokens"],
+                )
+            )
+        self.caller.msg("\n".join(lines))
+
+
+def _ago(seconds):
+    """Format a number of seconds as a short duration."""
+    if seconds < 60:
+        return "%is" % seconds
+    if seconds < 3600:
+        return "%im" % (seconds // 60)
+    return "%ih" % (seconds // 3600)
@@ -17,6 +17,8 @@ own cmdsets by inheriting from them or directly from `evennia.CmdSet`.
 
 from evennia import default_cmds
 
+from commands.admin import CmdJanitor, CmdLatency, CmdStats
+
 
 class CharacterCmdSet(default_cmds.CharacterCmdSet):
     """
@@ -35,6 +37,9 @@ class CharacterCmdSet(default_cmds.CharacterCmdSet):
         #
         # any commands you add below will overload the default ones.
         #
+        self.add(CmdJanitor())
+        self.add(CmdStats())
+        self.add(CmdLatency())
 
 
 class AccountCmdSet(default_cmds.AccountCmdSet):
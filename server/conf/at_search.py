@@ -23,8 +23,226 @@ line to your settings file:
 
     SEARCH_AT_RESULT = "server.conf.at_search.at_search_result"
 
+Druidia's version works like the default, with two additions:
+
+ - when nothing is found, the names of what was searched (by default
+   what is around the caller) are ranked by how many character n-grams
+   they share with the query and the best are suggested ("Did you
+   mean ..."). Global searches get no suggestions. The n-gram index of
+   a set of candidates is built once and reused while they stay the
+   same.
+ - the last multimatch is remembered (in `caller.ndb.last_multimatch`).
+   `remembered_match` uses it to answer a follow-up like `2-small`
+   without searching again, see `Character.search`.
+
 """
 
+import re
+from collections import Counter, OrderedDict, defaultdict
+
+from django.conf import settings
+from evennia.utils.utils import make_iter
+
+_MULTIMATCH_REGEX = re.compile(settings.SEARCH_MULTIMATCH_REGEX, re.I + re.U)
+_MULTIMATCH_TEMPLATE = settings.SEARCH_MULTIMATCH_TEMPLATE
+
+# the length of the n-grams names are compared by
+NGRAM_SIZE = 3
+# the share of n-grams (Dice coefficient) a name must have in common
+# with the query to be suggested
+SUGGESTION_MIN_SCORE = 0.3
+# the most names to suggest
+SUGGESTION_MAX = 3
+# the number of n-gram indexes to keep
+NGRAM_CACHE_SIZE = 100
+
+# {fingerprint: NgramIndex}, least recently used first
+_INDEX_CACHE = OrderedDict()
+
+
+# ------------------------------------------------------------
+#
+# Suggestions
+#
+# ------------------------------------------------------------
+
+
+def _ngrams(text):
+    """The set of n-grams of a text, padded to also weigh its ends."""
+    text = " %s " % text.lower()
+    return {
+        text[pos : pos + NGRAM_SIZE]
+        for pos in range(max(1, len(text) - NGRAM_SIZE + 1))
+    }
+
+
+class NgramIndex:
+    """
+    An inverted index from n-grams to the names (keys and aliases) of a
+    set of objects. Looking up a query only touches the names sharing
+    at least one n-gram with it.
+    """
+
+    def __init__(self, names):
+        """
+        Args:
+            names (list): (name, obj) tuples.
+
+        """
+        self.names = names
+        self.sizes = []
+        self.postings = defaultdict(list)
+        for num, (name, _) in enumerate(names):
+            grams = _ngrams(name)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings[gram].append(num)
+
+    def rank(self, query, min_score=SUGGESTION_MIN_SCORE):
+        """
+        Rank the objects by how similar their best name is to the query.
+
+        Args:
+            query (str): What was searched for.
+            min_score (float, optional): Skip objects scoring lower.
+
+        Returns:
+            ranked (list): The objects, best match first.
+
+        """
+        grams = _ngrams(query)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        scores = {}
+        for num, count in shared.items():
+            score = 2.0 * count / (len(grams) + self.sizes[num])
+            obj = self.names[num][1]
+            if score >= min_score and score > scores.get(obj, 0):
+                scores[obj] = score
+        return sorted(scores, key=scores.get, reverse=True)
+
+
+def _get_index(candidates):
+    """
+    Get the n-gram index of a list of objects, building it if needed.
+    """
+    names = [
+        (name, obj)
+        for obj in candidates
+        for name in [obj.key] + list(obj.aliases.all())
+        if name
+    ]
+    fingerprint = tuple((name, obj.id) for name, obj in names)
+    index = _INDEX_CACHE.get(fingerprint)
+    if index is None:
+        index = _INDEX_CACHE[fingerprint] = NgramIndex(names)
+        if len(_INDEX_CACHE) > NGRAM_CACHE_SIZE:
+            _INDEX_CACHE.popitem(last=False)
+    else:
+        _INDEX_CACHE.move_to_end(fingerprint)
+    return index
+
+
+def suggestions(caller, query, limit=SUGGESTION_MAX, candidates=None):
+    """
+    Find what the caller may have meant, among the objects searched.
+
+    Args:
+        caller (Object): Who searched.
+        query (str): What they searched for.
+        limit (int, optional): The most objects to return.
+        candidates (list, optional): The objects searched. By default
+            what the caller carries and what is in their location, as
+            for a search without a scope.
+
+    Returns:
+        objs (list): Similarly named objects the caller can see, the
+            most similar first.
+
+    """
+    if not query:
+        return []
+    if candidates is None:
+        location = getattr(caller, "location", None)
+        if not location:
+            return []
+        candidates = [location] + location.contents + caller.contents
+    objs = []
+    for obj in _get_index(candidates).rank(query):
+        if obj != caller and obj.access(caller, "view"):
+            objs.append(obj)
+            if len(objs) >= limit:
+                break
+    return objs
+
+
+# ------------------------------------------------------------
+#
+# Remembered multimatches
+#
+# ------------------------------------------------------------
+
+
+def remembered_match(caller, searchdata, candidates=None):
+    """
+    Pick from the caller's last multimatch, if searchdata is something
+    like `2-small` and `small` is what gave that multimatch.
+
+    Args:
+        caller (Object): Who searches.
+        searchdata (str): What they search for.
+        candidates (list, optional): If given, the match must be one
+            of these.
+
+    Returns:
+        obj (Object or None): The picked object, or None if a normal
+            search is needed: there is no such multimatch, the caller
+            has moved or the object is no longer within reach.
+
+    """
+    remembered = caller.ndb.last_multimatch
+    if not remembered:
+        return None
+    match = _MULTIMATCH_REGEX.match(searchdata)
+    if not match:
+        return None
+    query, location, objs = remembered
+    number = int(match.group("number"))
+    if match.group("name").strip().lower() != query or not 0 < number <= len(objs):
+        return None
+    obj = objs[number - 1]
+    if (
+        caller.location != location
+        or not obj.pk
+        or (obj.location not in (caller, location) and obj != location)
+        or (candidates is not None and obj not in candidates)
+    ):
+        return None
+    return obj
+
+
+# ------------------------------------------------------------
+#
+# The search hook
+#
+# ------------------------------------------------------------
+
+
+def _searched(kwargs):
+    """
+    The candidates a search was limited to, from the keywords given to
+    `at_search_result`. None means the default search around the caller
+    and False a global search.
+    """
+    if kwargs.get("candidates") is not None:
+        return list(kwargs["candidates"])
+    if kwargs.get("location"):
+        return [obj for loc in make_iter(kwargs["location"]) for obj in loc.contents]
+    if kwargs.get("global_search"):
+        return False
+    return None
+
 
 def at_search_result(matches, caller, query="", quiet=False, **kwargs):
     """
@@ -45,6 +263,10 @@ def at_search_result(matches, caller, query="", quiet=False, **kwargs):
     Keyword Args:
         nofound_string (str): Replacement string to echo on a notfound error.
         multimatch_string (str): Replacement string to echo on a multimatch error.
+        candidates (list): The objects the search was limited to, if any.
+        location (Object or list): The location(s) searched, if any.
+        global_search (bool): If the whole database was searched. The
+            last three are only used to scope the suggestions.
 
     Returns:
         processed_result (Object or None): This is always a single result
@@ -52,3 +274,54 @@ def at_search_result(matches, caller, query="", quiet=False, **kwargs):
             already have happened.
 
     """
+    error = ""
+    if not matches:
+        # no results.
+        error = kwargs.get("nofound_string") or "Could not find '%s'." % query
+        searched = _searched(kwargs)
+        if not quiet and searched is not False:
+            similar = suggestions(caller, query, candidates=searched)
+            if similar:
+                error += " Did you mean %s?" % " or ".join(
+                    "'%s'" % obj.get_display_name(caller) for obj in similar
+                )
+        matches = None
+    elif len(matches) > 1:
+        multimatch_string = kwargs.get("multimatch_string")
+        if multimatch_string:
+            error = "%s\n" % multimatch_string
+        else:
+            error = "More than one match for '%s' (please narrow target):\n" % query
+
+        for num, result in enumerate(matches):
+            # we need to consider Commands, where .aliases is a list
+            aliases = (
+                result.aliases.all()
+                if hasattr(result.aliases, "all")
+                else result.aliases
+            )
+            error += _MULTIMATCH_TEMPLATE.format(
+                number=num + 1,
+                name=(
+                    result.get_display_name(caller)
+                    if hasattr(result, "get_display_name")
+                    else query
+                ),
+                aliases=" [%s]" % ";".join(aliases) if aliases else "",
+                info=result.get_extra_info(caller),
+            )
+        if hasattr(caller, "ndb") and hasattr(matches[0], "location"):
+            # remember, so a follow-up like 2-small needs no new search
+            caller.ndb.last_multimatch = (
+                query.strip().lower(),
+                getattr(caller, "location", None),
+                list(matches),
+            )
+        matches = None
+    else:
+        # exactly one match
+        matches = matches[0]
+
+    if error and not quiet:
+        caller.msg(error.strip())
+    return matches
@@ -16,13 +16,54 @@ at_server_cold_stop()
 
 """
 
+from evennia import TICKER_HANDLER, logger
+
+from world import effects, instances, janitor, metrics, stats, streams, telemetry
+from world import snapshots, warmup, writebehind
+
 
 def at_server_start():
     """
     This is called every time the server starts up, regardless of
     how it was shut down.
     """
-    pass
+    # regularly clean out Druidia instances nobody is playing in anymore
+    TICKER_HANDLER.add(
+        interval=instances.INSTANCE_GC_INTERVAL,
+        callback=instances.collect_instances,
+        idstring="druidia_instances",
+    )
+    # and slowly sweep up other leftovers, a chunk at a time
+    TICKER_HANDLER.add(
+        interval=janitor.JANITOR_INTERVAL,
+        callback=janitor.collect,
+        idstring="druidia_janitor",
+    )
+    # keep the world counts for MSSP current, starting with a full count
+    stats.update()
+    TICKER_HANDLER.add(
+        interval=stats.STATS_INTERVAL,
+        callback=stats.update,
+        idstring="druidia_stats",
+    )
+    # save often-changing Attributes in batches
+    writebehind.start()
+    # and record combat to disk from a thread of its own
+    telemetry.start()
+    # run timed effects, restoring those saved at the last stop
+    effects.start()
+    # push state changes to clients subscribed to them
+    streams.start()
+    # and keep the snapshots served by the web API current
+    snapshots.start()
+    # fill the caches before the players do
+    warmup.start()
+
+    # the weapon prototypes are checked when loaded; report any problems
+    from typeclasses.weapons.rack import WEAPON_PROTOTYPE_ERRORS
+
+    for error in WEAPON_PROTOTYPE_ERRORS:
+        logger.log_err("Weapon rack: %s" % error)
 
 
 def at_server_stop():
@@ -30,7 +71,13 @@ def at_server_stop():
     This is called just before the server is shut down, regardless
     of it is for a reload, reset or shutdown.
     """
-    pass
+    warmup.stop()
+    streams.stop()
+    snapshots.stop()
+    effects.stop()
+    writebehind.stop()
+    telemetry.stop()
+    metrics.stop()
 
 
 def at_server_reload_start():
@@ -44,7 +91,8 @@ def at_server_reload_stop():
     """
     This is called only time the server stops before a reload.
     """
-    pass
+    # clients keep their sessions over a reload, and their subscriptions
+    streams.save()
 
 
 def at_server_cold_start():
@@ -52,7 +100,8 @@ def at_server_cold_start():
     This is called only when the server starts "cold", i.e. after a
     shutdown or a reset.
     """
-    pass
+    # session ids start over; subscriptions saved before are stale
+    streams.forget()
 
 
 def at_server_cold_stop():
@@ -60,4 +109,4 @@ def at_server_cold_stop():
     This is called only when the server goes down due to a shutdown or
     reset.
     """
-    pass
+    streams.forget()
@@ -4,33 +4,221 @@ Changing the default command parser
 The cmdparser is responsible for parsing the raw text inserted by the
 user, identifying which command/commands match and return one or more
 matching command objects. It is called by Evennia's cmdhandler and
-must accept input and return results on the same form. The default
-handler is very generic so you usually don't need to overload this
-unless you have very exotic parsing needs; advanced parsing is best
-done at the Command.parse level.
+must accept input and return results on the same form.
 
-The default cmdparser understands the following command combinations
-(where [] marks optional parts.)
+Druidia's commands have many aliases (the attack command alone has
+eleven), and the default parser compares the input with every key and
+alias of the merged cmdset on every command entered. This parser
+instead compiles the keys and aliases of a merged cmdset into a prefix
+trie once, and walks the input through it, so the cost of finding the
+candidates only depends on the length of the input. The tries are kept
+in a small cache, keyed by the merged cmdset itself: Evennia's
+cmdhandler caches its merges and hands the same merged cmdset to the
+parser until the cmdsets involved change, so most inputs reuse a trie
+built for an earlier one.
+
+Otherwise this behaves just like the default parser:
 
 [cmdname[ cmdname2 cmdname3 ...] [the rest]
 
 A command may consist of any number of space-separated words of any
-length, and contain any character. It may also be empty.
+length, and contain any character. It may also be empty. Prefixes in
+`settings.CMD_IGNORE_PREFIXES` are ignored if the input doesn't match
+otherwise, and `2-cmdname` picks among commands with the same name.
 
 The parser makes use of the cmdset to find command candidates. The
 parser return a list of matches. Each match is a tuple with its first
 three elements being the parsed cmdname (lower case), the remaining
 arguments, and the matched cmdobject from the cmdset.
 
-
-This module is not accessed by default. To tell Evennia to use it
-instead of the default command parser, add the following line to
-your settings file:
+This module is used by setting this in the settings file:
 
     COMMAND_PARSER = "server.conf.cmdparser.cmdparser"
 
 """
 
+import re
+from collections import OrderedDict
+
+from django.conf import settings
+from evennia.utils.logger import log_trace
+
+_MULTIMATCH_REGEX = re.compile(settings.SEARCH_MULTIMATCH_REGEX, re.I + re.U)
+_CMD_IGNORE_PREFIXES = settings.CMD_IGNORE_PREFIXES
+
+# the number of compiled cmdsets to keep
+CMDPARSER_CACHE_SIZE = 200
+
+# the key of a trie node holding the commands ending at that node
+_END = None
+# {(cmdset id, number of commands): _CommandTrie}, least recently used first
+_CACHE = OrderedDict()
+
+
+def _strip_prefixes(string):
+    """Remove ignored prefixes, unless that would leave nothing."""
+    return string.lstrip(_CMD_IGNORE_PREFIXES) if len(string) > 1 else string
+
+
+class _CommandTrie:
+    """
+    The keys and aliases of the commands in a merged cmdset, as two
+    prefix tries of lower-case characters: one of the names as they
+    are, and one with their ignored prefixes stripped.
+
+    Each trie node is a dict mapping a character to the next node.
+    Under the key `_END`, it lists the (cmdname, cmd, raw_cmdname) of
+    the names ending there.
+    """
+
+    def __init__(self, cmdset):
+        # keeping the cmdset alive keeps its id (the cache key) unique
+        self.cmdset = cmdset
+        self.full = {}
+        self.stripped = {}
+        for cmd in cmdset.commands:
+            for raw_cmdname in [cmd.key] + cmd.aliases:
+                if raw_cmdname:
+                    self._add(self.full, raw_cmdname, cmd, raw_cmdname)
+                    cmdname = _strip_prefixes(raw_cmdname)
+                    if cmdname:
+                        self._add(self.stripped, cmdname, cmd, raw_cmdname)
+
+    @staticmethod
+    def _add(trie, cmdname, cmd, raw_cmdname):
+        """Add a name to a trie."""
+        node = trie
+        for char in cmdname.lower():
+            node = node.setdefault(char, {})
+        node.setdefault(_END, []).append((cmdname, cmd, raw_cmdname))
+
+    def candidates(self, string, include_prefixes=True):
+        """
+        Find all names that the input starts with.
+
+        Args:
+            string (str): The input, in lower case.
+            include_prefixes (bool, optional): Use the names as they are,
+                rather than with ignored prefixes stripped.
+
+        Returns:
+            candidates (list): (cmdname, cmd, raw_cmdname) tuples.
+
+        """
+        node = self.full if include_prefixes else self.stripped
+        candidates = list(node.get(_END, ()))
+        for char in string:
+            node = node.get(char)
+            if node is None:
+                break
+            candidates.extend(node.get(_END, ()))
+        return candidates
+
+
+def _get_trie(cmdset):
+    """
+    Get the compiled trie of a merged cmdset, building it if needed.
+    The number of commands is part of the key, in case a command is
+    added to a cmdset already compiled.
+    """
+    fingerprint = (id(cmdset), len(cmdset.commands))
+    trie = _CACHE.get(fingerprint)
+    if trie is None:
+        trie = _CACHE[fingerprint] = _CommandTrie(cmdset)
+        if len(_CACHE) > CMDPARSER_CACHE_SIZE:
+            _CACHE.popitem(last=False)
+    else:
+        _CACHE.move_to_end(fingerprint)
+    return trie
+
+
+def create_match(cmdname, string, cmdobj, raw_cmdname):
+    """
+    Builds a command match by splitting the incoming string and
+    evaluating the quality of the match.
+
+    Args:
+        cmdname (str): Name of command to check for.
+        string (str): The string to match against.
+        cmdobj (str): The full Command instance.
+        raw_cmdname (str, optional): If CMD_IGNORE_PREFIX is set and the
+            cmdname starts with one of the prefixes to ignore, this
+            contains the raw, unstripped cmdname, otherwise it is None.
+
+    Returns:
+        match (tuple): This is on the form (cmdname, args, cmdobj, cmdlen,
+            mratio, raw_cmdname), where `cmdname` is the command's name and
+            `args` is the rest of the incoming string, without said command
+            name. `cmdobj` is the Command instance, the cmdlen is the same
+            as len(cmdname) and mratio is a measure of how big a part of the
+            full input string the cmdname takes up - an exact match would be
+            1.0. Finally, the `raw_cmdname` is the cmdname unmodified by
+            eventual prefix-stripping.
+
+    """
+    cmdlen, strlen = len(str(cmdname)), len(str(string))
+    mratio = 1 - (strlen - cmdlen) / (1.0 * strlen)
+    args = string[cmdlen:]
+    return (cmdname, args, cmdobj, cmdlen, mratio, raw_cmdname)
+
+
+def build_matches(raw_string, cmdset, include_prefixes=False):
+    """
+    Build match tuples by matching raw_string against available commands.
+
+    Args:
+        raw_string (str): Input string that can look in any way; the only
+            assumption is that the sought command's name/alias must be
+            *first* in the string.
+        cmdset (CmdSet): The current cmdset to pick Commands from.
+        include_prefixes (bool): If set, include prefixes like @, ! etc
+            (specified in settings) in the match, otherwise strip them
+            before matching.
+
+    Returns:
+        matches (list) A list of match tuples created by `cmdparser.create_match`.
+
+    """
+    matches = []
+    try:
+        if not include_prefixes:
+            raw_string = _strip_prefixes(raw_string)
+        l_raw_string = raw_string.lower()
+        for cmdname, cmd, raw_cmdname in _get_trie(cmdset).candidates(
+            l_raw_string, include_prefixes=include_prefixes
+        ):
+            if not cmd.arg_regex or cmd.arg_regex.match(l_raw_string[len(cmdname) :]):
+                matches.append(create_match(cmdname, raw_string, cmd, raw_cmdname))
+    except Exception:
+        log_trace("cmdhandler error. raw_input:%s" % raw_string)
+    return matches
+
+
+def try_num_differentiators(raw_string):
+    """
+    Test if user tried to separate multi-matches with a number separator
+    (default 1-name, 2-name etc). This is usually called last, if no other
+    match was found.
+
+    Args:
+        raw_string (str): The user input to parse.
+
+    Returns:
+        mindex (int or None): If found, this is the number index of the
+            matching command.
+        new_raw_string (str or None): The input with the number part
+            removed.
+
+    """
+    num_ref_match = _MULTIMATCH_REGEX.match(raw_string)
+    if num_ref_match:
+        # the user might be trying to identify the command
+        # with a #num-command style syntax. We expect the regex to
+        # contain the groups "number" and "name".
+        groups = num_ref_match.groupdict()
+        return int(groups["number"]), groups["name"] + (groups.get("args") or "")
+    return None, None
+
 
 def cmdparser(raw_string, cmdset, caller, match_index=None):
     """
@@ -44,7 +232,7 @@ def cmdparser(raw_string, cmdset, caller, match_index=None):
                   list of same-named command matches.
 
     Returns:
-     list of tuples: [(cmdname, args, cmdobj, cmdlen, mratio), ...]
+     list of tuples: [(cmdname, args, cmdobj, cmdlen, mratio, raw_cmdname), ...]
             where cmdname is the matching command name and args is
             everything not included in the cmdname. Cmdobj is the actual
             command instance taken from the cmdset, cmdlen is the length
@@ -52,4 +240,50 @@ def cmdparser(raw_string, cmdset, caller, match_index=None):
             (possibly) separate multiple matches.
 
     """
-    # Your implementation here
+    if not raw_string:
+        return []
+
+    # find matches, first using the full name
+    matches = build_matches(raw_string, cmdset, include_prefixes=True)
+    if not matches:
+        # try to match a number 1-cmdname, 2-cmdname etc
+        mindex, new_raw_string = try_num_differentiators(raw_string)
+        if mindex is not None:
+            return cmdparser(new_raw_string, cmdset, caller, match_index=mindex)
+        if _CMD_IGNORE_PREFIXES:
+            # still no match. Try to strip prefixes
+            raw_string = _strip_prefixes(raw_string)
+            matches = build_matches(raw_string, cmdset, include_prefixes=False)
+
+    # only select command matches we are actually allowed to call.
+    matches = [match for match in matches if match[2].access(caller, "cmd")]
+
+    # try to bring the number of matches down to 1
+    if len(matches) > 1:
+        # See if it helps to analyze the match with preserved case but only if
+        # it leaves at least one match.
+        trimmed = [match for match in matches if raw_string.startswith(match[0])]
+        if trimmed:
+            matches = trimmed
+
+    if len(matches) > 1:
+        # we still have multiple matches. Sort them by count quality.
+        matches = sorted(matches, key=lambda m: m[3])
+        # only pick the matches with highest count quality
+        quality = [mat[3] for mat in matches]
+        matches = matches[-quality.count(quality[-1]) :]
+
+    if len(matches) > 1:
+        # still multiple matches. Fall back to ratio-based quality.
+        matches = sorted(matches, key=lambda m: m[4])
+        # only pick the highest rated ratio match
+        quality = [mat[4] for mat in matches]
+        matches = matches[-quality.count(quality[-1]) :]
+
+    if len(matches) > 1 and match_index is not None and 0 < match_index <= len(matches):
+        # We couldn't separate match by quality, but we have an
+        # index argument to tell us which match to use.
+        matches = [matches[match_index - 1]]
+
+    # no matter what we have at this point, we have to return it.
+    return matches
@@ -26,11 +26,9 @@ Example 2 (using nested "pad" and "time" inlinefuncs):
 To add more inline functions, add them to this module, using
 the following call signature:
 
-    def funcname(text, *args, **kwargs)
+    def funcname(*args, **kwargs)
 
-where `text` is always the part between {funcname(args) and
-{/funcname and the *args are taken from the appropriate part of the
-call. If no {/funcname is given, `text` will be the empty string.
+where the *args are taken from the appropriate part of the call.
 
 It is important that the inline function properly clean the
 incoming `args`, checking their type and replacing them with sane
@@ -43,9 +41,200 @@ internally by Evennia, notably to send the `session` keyword to
 the function; this is the session of the object viewing the string
 and can be used to customize it to each session.
 
+Druidia also renders inlinefuncs in room descriptions, for the one
+looking (see `Room.return_appearance`). Only the desc is rendered, not
+the names of what is in the room. Rather than scanning and
+parsing a description on every look, each distinct template is compiled
+once into a sequence of static strings and prepared calls, and kept in
+a size-bounded LRU cache (`_TEMPLATES`). Rendering then only joins the
+static parts with the results of the calls. Only flat calls with
+literal arguments are compiled, like
+
+    The $daytime() sun warms your face, $viewer().
+
+Everything public in this module is picked up as an inlinefunc, which
+is why the template helpers are all underscore-named.
+
 """
 
-# def capitalize(text, *args, **kwargs):
-#    "Silly capitalize example. Used as {capitalize() ... {/capitalize"
-#    session = kwargs.get("session")
-#    return text.capitalize()
+import re
+from collections import OrderedDict
+
+from django.conf import settings
+from evennia.utils import gametime
+from evennia.utils.utils import callables_from_module, make_iter
+
+# the number of compiled templates to keep
+INLINE_TEMPLATE_CACHE_SIZE = 500
+
+_RE_CALL = re.compile(r"(?<!\\)\$(\w+)\(([^()]*)\)")
+_RE_ESCAPE = re.compile(r"\\(\$)")
+_INLINE_FUNCS = None
+
+
+# ------------------------------------------------------------
+#
+# Druidia inlinefuncs
+#
+# ------------------------------------------------------------
+
+
+def viewer(*args, **kwargs):
+    """
+    The name of who is looking. Used as $viewer(), or as
+    $viewer(fallback) to name someone not in the game.
+    """
+    looker = kwargs.get("looker")
+    if looker is None and kwargs.get("session"):
+        looker = kwargs["session"].puppet
+    return looker.key if looker else (args[0] if args else "stranger")
+
+
+def daytime(*args, **kwargs):
+    """
+    The part of the game day; morning, afternoon, evening or night.
+    Used as $daytime().
+    """
+    hour = gametime.gametime(absolute=True) // 3600 % 24
+    if 6 <= hour < 12:
+        return "morning"
+    if 12 <= hour < 18:
+        return "afternoon"
+    if 18 <= hour < 22:
+        return "evening"
+    return "night"
+
+
+# ------------------------------------------------------------
+#
+# Compiled templates
+#
+# ------------------------------------------------------------
+
+
+def _funcs():
+    """All inlinefuncs, loaded on first use like Evennia does."""
+    global _INLINE_FUNCS
+    if _INLINE_FUNCS is None:
+        _INLINE_FUNCS = {}
+        for module in make_iter(settings.INLINEFUNC_MODULES):
+            _INLINE_FUNCS.update(callables_from_module(module))
+    return _INLINE_FUNCS
+
+
+def _parse_args(argstring):
+    """Split literal call arguments, removing surrounding quotes."""
+    args = []
+    for arg in argstring.split(","):
+        arg = arg.strip()
+        if len(arg) > 1 and arg[0] == arg[-1] and arg[0] in "\"'":
+            arg = arg[1:-1]
+        if arg:
+            args.append(arg)
+    return tuple(args)
+
+
+def _compile(template):
+    """
+    Compile a template into the parts to join when rendering.
+
+    Args:
+        template (str): Text with $funcname(args) calls.
+
+    Returns:
+        parts (tuple): Static strings and (func, args) calls, in order.
+            Adjacent static text is merged and unescaped already, and
+            calls to unknown functions are kept as static text.
+
+    """
+    funcs = _funcs()
+    parts, static, pos = [], [], 0
+    for match in _RE_CALL.finditer(template):
+        func = funcs.get(match.group(1))
+        if not func:
+            continue
+        static.append(template[pos : match.start()])
+        if static:
+            parts.append(_RE_ESCAPE.sub(r"\1", "".join(static)))
+            static = []
+        parts.append((func, _parse_args(match.group(2))))
+        pos = match.end()
+    static.append(template[pos:])
+    tail = _RE_ESCAPE.sub(r"\1", "".join(static))
+    if tail:
+        parts.append(tail)
+    return tuple(part for part in parts if part)
+
+
+class _TemplateCache:
+    """
+    Compiled templates, least recently used first, with counts of how
+    often a render found its template already compiled.
+    """
+
+    def __init__(self, size=INLINE_TEMPLATE_CACHE_SIZE):
+        self.size = size
+        self.templates = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, template):
+        """Get the compiled parts of a template, compiling if needed."""
+        parts = self.templates.get(template)
+        if parts is None:
+            self.misses += 1
+            parts = self.templates[template] = _compile(template)
+            if len(self.templates) > self.size:
+                self.templates.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.hits += 1
+            self.templates.move_to_end(template)
+        return parts
+
+    def info(self):
+        """
+        Returns:
+            info (dict): size, hits, misses, evictions and hit_rate
+                (hits per lookup, 0.0 before the first).
+
+        """
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.templates),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_TEMPLATES = _TemplateCache()
+
+
+def _render(template, **kwargs):
+    """
+    Render the inlinefuncs in a template.
+
+    Args:
+        template (str): The text to render.
+        **kwargs: Passed to every inlinefunc, like `looker` or `session`.
+
+    Returns:
+        text (str): The rendered text. A call that fails is left out.
+
+    """
+    if "$" not in template:
+        return template
+    result = []
+    for part in _TEMPLATES.get(template):
+        if part.__class__ is str:
+            result.append(part)
+        else:
+            func, args = part
+            try:
+                result.append(str(func(*args, **kwargs)))
+            except Exception:
+                pass
+    return "".join(result)
@@ -24,8 +24,98 @@ as argument.
 
     default(session, cmdname, *args, **kwargs)
 
+Druidia adds the subscriptions to the streams of world/streams.py. Over
+GMCP they are called as `Room.Info`, `Char.Vitals` and `Room.Players`
+(GMCP names are turned into function names like `room_info`). Called
+without arguments, they subscribe and send the full state right away;
+called with `{"subscribe": false}` (or the argument "off"), they end
+the subscription.
+
+It also replaces `text`, the input of commands, to drop commands while
+the session is throttled (see server/conf/serversession.py).
+
 """
 
+from django.conf import settings
+from evennia.server.inputfuncs import text as _text
+
+from world import streams
+
+
+def text(session, *args, **kwargs):
+    """
+    Run a command, unless the session is sending them too fast.
+
+    Args:
+        session (Session): The Session sending the command.
+        *args: The command text is the first argument.
+
+    """
+    txt = args[0] if args else None
+    if (
+        txt
+        and txt.strip() != settings.IDLE_COMMAND
+        and hasattr(session, "throttle")
+        and not session.throttle()
+    ):
+        return
+    _text(session, *args, **kwargs)
+
+
+def _subscription(session, stream, args, kwargs):
+    """Subscribe to or unsubscribe from a stream."""
+    subscribe = kwargs.get("subscribe", True)
+    if args and str(args[0]).lower() in ("off", "false", "0"):
+        subscribe = False
+    if subscribe:
+        streams.subscribe(session, stream)
+    else:
+        streams.unsubscribe(session, stream)
+
+
+def room_info(session, *args, **kwargs):
+    """
+    Subscribe to Room.Info: the room's id, name and exits, and the
+    bridge position.
+
+    Args:
+        session (Session): The subscribing Session.
+
+    Kwargs:
+        subscribe (bool): False to unsubscribe.
+
+    """
+    _subscription(session, "room_info", args, kwargs)
+
+
+def char_vitals(session, *args, **kwargs):
+    """
+    Subscribe to Char.Vitals: health and max health.
+
+    Args:
+        session (Session): The subscribing Session.
+
+    Kwargs:
+        subscribe (bool): False to unsubscribe.
+
+    """
+    _subscription(session, "char_vitals", args, kwargs)
+
+
+def room_players(session, *args, **kwargs):
+    """
+    Subscribe to Room.Players: the other players in the room.
+
+    Args:
+        session (Session): The subscribing Session.
+
+    Kwargs:
+        subscribe (bool): False to unsubscribe.
+
+    """
+    _subscription(session, "room_players", args, kwargs)
+
+
 # def oob_echo(session, *args, **kwargs):
 #     """
 #     Example echo function. Echoes args, kwargs sent to it.
@@ -28,3 +28,20 @@ lock functions from evennia.locks.lockfuncs.
 #    """
 #    print "%s tried to access %s. Access denied." % (accessing_obj, accessed_obj)
 #    return False
+
+
+def progress(accessing_obj, accessed_obj, *args, **kwargs):
+    """
+    Usage:
+        progress(flagname)
+
+    Only true if accessing_obj has the given flag set in its Druidia
+    progress (see world/progress.py). This replaces the old
+    tag(flagname, world) checks, like
+
+        view:progress(climbed_tree);traverse:progress(climbed_tree)
+
+    """
+    if not args or not hasattr(accessing_obj, "progress"):
+        return False
+    return accessing_obj.progress.has(args[0].strip())
@@ -3,7 +3,7 @@
 MSSP (Mud Server Status Protocol) meta information
 
 Modify this file to specify what MUD listing sites will report about your game.
-All fields are static. The number of currently active players and your game's
+All fields but the world counts are static. The number of currently active players and your game's
 current uptime will be added automatically by Evennia.
 
 You don't have to fill in everything (and most fields are not shown/used by all
@@ -16,11 +16,44 @@ MUD website list you want to track you. The listing crawler will then regularly
 connect to your server to get the latest info. No further configuration is
 needed on the Evennia side.
 
+The world counts (ROOMS, EXITS, MOBILES, OBJECTS, AREAS and HELPFILES)
+are live: the Server keeps them up to date (see world/stats.py) and
+writes them to `settings.DRUIDIA_STATS_FILE`, from where the callables
+below read them for each crawler. The file is re-read at most every
+_STATS_MAX_AGE seconds.
+
 """
 
+import json
+import time
+
+from django.conf import settings
+
+_STATS_MAX_AGE = 60
+_STATS = {"read": 0, "counts": {}}
+
+
+def _stat(key):
+    """
+    Get a callable giving the latest count of key, as a string.
+    """
+
+    def _get():
+        if time.time() - _STATS["read"] > _STATS_MAX_AGE:
+            _STATS["read"] = time.time()
+            try:
+                with open(settings.DRUIDIA_STATS_FILE) as fil:
+                    _STATS["counts"] = json.load(fil)
+            except (OSError, ValueError):
+                pass
+        return str(_STATS["counts"].get(key, 0))
+
+    return _get
+
+
 MSSPTable = {
     # Required fields
-    "NAME": "Mygame",  # usually the same as SERVERNAME
+    "NAME": "Druidia",  # usually the same as SERVERNAME
     # Generic
     "CRAWL DELAY": "-1",  # limit how often crawler may update the listing. -1 for no limit
     "HOSTNAME": "",  # telnet hostname
@@ -47,11 +80,11 @@ MSSPTable = {
     # Cyberpunk, Dragonlance, etc. Or None if not applicable.
     "SUBGENRE": "None",
     # World
-    "AREAS": "0",
-    "HELPFILES": "0",
-    "MOBILES": "0",
-    "OBJECTS": "0",
-    "ROOMS": "0",  # use 0 if room-less
+    "AREAS": _stat("areas"),
+    "HELPFILES": _stat("helpfiles"),
+    "MOBILES": _stat("mobiles"),
+    "OBJECTS": _stat("objects"),
+    "ROOMS": _stat("rooms"),  # use 0 if room-less
     "CLASSES": "0",  # use 0 if class-less
     "LEVELS": "0",  # use 0 if level-less
     "RACES": "0",  # use 0 if race-less
@@ -81,7 +114,7 @@ MSSPTable = {
     # Extended variables
     # World
     "DBSIZE": "0",
-    "EXITS": "0",
+    "EXITS": _stat("exits"),
     "EXTRA DESCRIPTIONS": "0",
     "MUDPROGS": "0",
     "MUDTRIGS": "0",
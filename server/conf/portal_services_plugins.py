@@ -12,8 +12,209 @@ your services can be added to it). The function should not return
 anything. Plugin services are started last in the Portal startup
 process.
 
+Druidia adds an output queue service here. Normally everything the
+Server sends is written straight to the connection, and a client that
+can't keep up just makes the Portal buffer grow. Instead, each session
+with a TCP-like transport registers an OutputQueue as a push producer
+with its transport. As long as the transport keeps up, output passes
+straight through. When its buffer fills, the transport pauses the queue
+and output is held in two bounded queues until it resumes:
+
+ - direct output (replies, combat and everything else) goes out first,
+   in order. At most OUTPUT_MAX_DIRECT messages are held; beyond that
+   the oldest are dropped.
+ - ambient text (weather, mob emotes), sent by the Server as
+   `msg(text=(text, {"type": "ambient"}))`, goes out last. Repeats of
+   the same line are merged into one, and at most OUTPUT_MAX_AMBIENT
+   are held, dropping the oldest.
+
+So the memory held for a slow connection is bounded, and what it gets
+when it catches up is what matters most.
+
+When a session disconnects, its queue hands over what it still holds
+to the transport and is unregistered, as a transport with a producer
+registered may not close (TLS connections wait for it).
+
 """
 
+from collections import deque
+
+from twisted.application import service
+from twisted.internet.interfaces import IPushProducer
+from zope.interface import implementer
+from evennia.server.portal.portalsessionhandler import PORTAL_SESSIONS
+
+# most direct messages held for a paused connection
+OUTPUT_MAX_DIRECT = 500
+# most ambient lines held for a paused connection
+OUTPUT_MAX_AMBIENT = 20
+# text types considered ambient
+AMBIENT_TYPES = ("ambient",)
+
+
+def _ambient_text(kwargs):
+    """The text of an ambient message, or None if it's not one."""
+    text = kwargs.get("text")
+    if len(kwargs) == 1 and text and len(text) == 2:
+        args, textkwargs = text
+        if args and textkwargs.get("type") in AMBIENT_TYPES:
+            return args[0]
+    return None
+
+
+@implementer(IPushProducer)
+class OutputQueue:
+    """
+    The output held for one session while its transport is busy.
+    """
+
+    def __init__(self, session, deliver):
+        self.session = session
+        self.deliver = deliver
+        self.paused = False
+        self.direct = deque()
+        # [kwargs, text, times repeated]
+        self.ambient = deque()
+        self.dropped = 0
+
+    def put(self, kwargs):
+        """Send output, or hold it if the transport is busy."""
+        if not (self.paused or self.direct or self.ambient):
+            self.deliver(self.session, **kwargs)
+            return
+        text = _ambient_text(kwargs)
+        if text is None:
+            if len(self.direct) >= OUTPUT_MAX_DIRECT:
+                self.direct.popleft()
+                self.dropped += 1
+            self.direct.append(kwargs)
+        elif self.ambient and self.ambient[-1][1] == text:
+            self.ambient[-1][2] += 1
+        else:
+            if len(self.ambient) >= OUTPUT_MAX_AMBIENT:
+                self.ambient.popleft()
+                self.dropped += 1
+            self.ambient.append([kwargs, text, 1])
+
+    def _flush(self):
+        """Send held output until done or paused again."""
+        while self.direct and not self.paused:
+            self.deliver(self.session, **self.direct.popleft())
+        while self.ambient and not self.paused:
+            kwargs, text, repeats = self.ambient.popleft()
+            if repeats > 1:
+                kwargs = {"text": (("%s (x%i)" % (text, repeats),), kwargs["text"][1])}
+            self.deliver(self.session, **kwargs)
+
+    # IPushProducer, called by the transport
+
+    def pauseProducing(self):
+        self.paused = True
+
+    def resumeProducing(self):
+        self.paused = False
+        self._flush()
+
+    def stopProducing(self):
+        self.paused = True
+        self.direct.clear()
+        self.ambient.clear()
+        OutputQueueService.queues.pop(self.session.sessid, None)
+
+    def release(self):
+        """
+        Stop queueing: write out what is held, whatever the state of
+        the transport, and unregister from it. Called on disconnect.
+        """
+        OutputQueueService.queues.pop(self.session.sessid, None)
+        self.paused = False
+        self._flush()
+        transport = getattr(self.session, "transport", None)
+        if getattr(transport, "producer", None) is self:
+            transport.unregisterProducer()
+
+
+class OutputQueueService(service.Service):
+    """
+    Routes all output of the Portal through the OutputQueue of its
+    session.
+    """
+
+    name = "DruidiaOutputQueues"
+    # {sessid: OutputQueue}; removed when the connection is lost
+    queues = {}
+
+    def startService(self):
+        super().startService()
+        self.deliver = PORTAL_SESSIONS.data_out
+        self.disconnect = PORTAL_SESSIONS.disconnect
+        self.server_disconnect = PORTAL_SESSIONS.server_disconnect
+        self.server_disconnect_all = PORTAL_SESSIONS.server_disconnect_all
+        PORTAL_SESSIONS.data_out = self.data_out
+        PORTAL_SESSIONS.disconnect = self.on_disconnect
+        PORTAL_SESSIONS.server_disconnect = self.on_server_disconnect
+        PORTAL_SESSIONS.server_disconnect_all = self.on_server_disconnect_all
+
+    def stopService(self):
+        super().stopService()
+        PORTAL_SESSIONS.data_out = self.deliver
+        PORTAL_SESSIONS.disconnect = self.disconnect
+        PORTAL_SESSIONS.server_disconnect = self.server_disconnect
+        PORTAL_SESSIONS.server_disconnect_all = self.server_disconnect_all
+        for queue in list(self.queues.values()):
+            queue.release()
+
+    def data_out(self, session, **kwargs):
+        """Replaces PortalSessionHandler.data_out."""
+        if not session:
+            return
+        queue = self.queues.get(session.sessid) or self._register(session)
+        if queue is None:
+            self.deliver(session, **kwargs)
+        else:
+            queue.put(kwargs)
+
+    def release(self, session):
+        """Release the queue of a session, if it has one."""
+        queue = self.queues.get(session.sessid) if session else None
+        if queue:
+            queue.release()
+
+    # replacing the disconnect methods of PortalSessionHandler
+
+    def on_disconnect(self, session):
+        """The connection of a session was closed or lost."""
+        self.release(session)
+        self.disconnect(session)
+
+    def on_server_disconnect(self, session, reason=""):
+        """The Server disconnects a session, like on quit or @boot."""
+        self.release(session)
+        self.server_disconnect(session, reason=reason)
+
+    def on_server_disconnect_all(self, reason=""):
+        """The Server disconnects all sessions."""
+        for queue in list(self.queues.values()):
+            queue.release()
+        self.server_disconnect_all(reason=reason)
+
+    def _register(self, session):
+        """
+        Make a queue for a session, if its transport supports it. The
+        web client's AJAX sessions, for one, have no transport.
+        """
+        if session.sessid not in PORTAL_SESSIONS:
+            # disconnected already
+            return None
+        transport = getattr(session, "transport", None)
+        if getattr(transport, "registerProducer", None) is None or getattr(
+            transport, "producer", None
+        ):
+            return None
+        queue = self.queues[session.sessid] = OutputQueue(session, self.deliver)
+        transport.registerProducer(queue, True)
+        return queue
+
 
 def start_plugin_services(portal):
     """
@@ -21,4 +222,4 @@ def start_plugin_services(portal):
 
     portal - a reference to the main portal application.
     """
-    pass
+    OutputQueueService().setServiceParent(portal.services)
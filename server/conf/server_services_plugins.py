@@ -12,8 +12,29 @@ call this function with the main Server application (so your services
 can be added to it). The function should not return anything. Plugin
 services are started last in the Server startup process.
 
+Druidia starts its metrics service here: the counters and histograms of
+world/metrics.py, served in the Prometheus text format at /metrics on a
+local port (settings.DRUIDIA_METRICS_PORT, None to turn it off).
+
 """
 
+from twisted.application import internet
+from twisted.web import resource, server as web_server
+
+from world import metrics
+
+
+class MetricsResource(resource.Resource):
+    """
+    Serves the metrics to a Prometheus scraper.
+    """
+
+    isLeaf = True
+
+    def render_GET(self, request):
+        request.setHeader(b"Content-Type", b"text/plain; version=0.0.4")
+        return metrics.render().encode("utf-8")
+
 
 def start_plugin_services(server):
     """
@@ -21,4 +42,14 @@ def start_plugin_services(server):
 
     server - a reference to the main server application.
     """
-    pass
+    if metrics.METRICS_PORT:
+        root = resource.Resource()
+        root.putChild(b"metrics", MetricsResource())
+        service = internet.TCPServer(
+            metrics.METRICS_PORT,
+            web_server.Site(root),
+            interface=metrics.METRICS_INTERFACE,
+        )
+        service.setName("DruidiaMetrics")
+        server.services.addService(service)
+        metrics.start()
@@ -19,10 +19,39 @@ settings file:
 
     SERVER_SESSION_CLASS = "server.conf.serversession.ServerSession"
 
+Druidia's session keeps track of the commands it runs: how many, and
+how long each took to process (as measured by the command metrics, see
+commands/command.py). Admins can see these with @latency.
+
+It also throttles its input with a token bucket. Every command costs
+one token, plus one for every THROTTLE_SECONDS_PER_TOKEN of processing
+time it took, and the bucket refills at THROTTLE_RATE tokens a second
+up to THROTTLE_BURST. Normal play never empties it, but a client
+spamming commands does, and one spamming expensive commands (looking
+around a crowded room, stabbing in a big fight) empties it much sooner.
+Commands arriving while the bucket is empty are dropped (see the `text`
+inputfunc in server/conf/inputfuncs.py), so no single client can keep
+the server busy at the cost of everyone else.
+
 """
 
+import time
+from collections import deque
+
+from django.conf import settings
 from evennia.server.serversession import ServerSession as BaseServerSession
 
+# tokens added to the bucket per second
+THROTTLE_RATE = getattr(settings, "DRUIDIA_THROTTLE_RATE", 4.0)
+# the most tokens the bucket holds; also how far below zero it can go
+THROTTLE_BURST = getattr(settings, "DRUIDIA_THROTTLE_BURST", 20.0)
+# seconds of processing time costing one extra token
+THROTTLE_SECONDS_PER_TOKEN = 0.01
+# commands remembered per session for the latency stats
+SESSION_LATENCY_SAMPLES = 100
+# seconds over which the command rate is measured
+SESSION_RATE_WINDOW = 60
+
 
 class ServerSession(BaseServerSession):
     """
@@ -34,4 +63,92 @@ class ServerSession(BaseServerSession):
     through their session(s).
     """
 
-    pass
+    def __init__(self):
+        super().__init__()
+        # (time, command key, seconds) of the latest commands
+        self.cmd_samples = deque(maxlen=SESSION_LATENCY_SAMPLES)
+        self.cmd_throttled = 0
+        self.throttle_tokens = THROTTLE_BURST
+        self.throttle_updated = time.monotonic()
+        # if the player was told about the throttle since the last
+        # command let through
+        self.throttle_warned = False
+
+    def _refill(self):
+        """Add the tokens earned since the last refill."""
+        now = time.monotonic()
+        self.throttle_tokens = min(
+            THROTTLE_BURST,
+            self.throttle_tokens + (now - self.throttle_updated) * THROTTLE_RATE,
+        )
+        self.throttle_updated = now
+
+    def throttle(self):
+        """
+        Take a token for a new command, if there is one.
+
+        Returns:
+            allowed (bool): If the command may run. If not, the player is
+                told (once until a command is let through again).
+
+        """
+        if self.account and self.account.is_superuser:
+            return True
+        self._refill()
+        if self.throttle_tokens < 1:
+            self.cmd_throttled += 1
+            if not self.throttle_warned:
+                self.throttle_warned = True
+                self.msg(
+                    "|rYou are sending commands faster than the game can handle "
+                    "them. Wait a moment.|n"
+                )
+            return False
+        self.throttle_tokens -= 1
+        self.throttle_warned = False
+        return True
+
+    def record_command(self, key, seconds):
+        """
+        Record a finished command, charging its processing time to the
+        throttle.
+
+        Args:
+            key (str): The key of the command.
+            seconds (float): How long it took to process.
+
+        """
+        self.cmd_samples.append((time.time(), key, seconds))
+        self.throttle_tokens = max(
+            -THROTTLE_BURST, self.throttle_tokens - seconds / THROTTLE_SECONDS_PER_TOKEN
+        )
+
+    def latency_stats(self):
+        """
+        Get the stats of the latest commands.
+
+        Returns:
+            stats (dict): `rate` (commands per minute over the last
+                SESSION_RATE_WINDOW seconds), `average` and `max` (the
+                processing time of the remembered commands, in seconds),
+                `slowest` (the key of the slowest one, or None),
+                `throttled` (commands dropped by the throttle) and
+                `tokens` (what is left in the bucket).
+
+        """
+        self._refill()
+        since = time.time() - SESSION_RATE_WINDOW
+        recent = sum(1 for sample in self.cmd_samples if sample[0] >= since)
+        slowest = max(self.cmd_samples, key=lambda sample: sample[2], default=None)
+        return {
+            "rate": recent * 60.0 / SESSION_RATE_WINDOW,
+            "average": (
+                sum(sample[2] for sample in self.cmd_samples) / len(self.cmd_samples)
+                if self.cmd_samples
+                else 0.0
+            ),
+            "max": slowest[2] if slowest else 0.0,
+            "slowest": slowest[1] if slowest else None,
+            "throttled": self.cmd_throttled,
+            "tokens": self.throttle_tokens,
+        }
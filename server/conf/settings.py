@@ -50,6 +50,51 @@ BASE_ROOM_TYPECLASS = "typeclasses.base.Room"
 # but create custom variations of scripts on a per-case basis instead.
 BASE_SCRIPT_TYPECLASS = "typeclasses.base.Script"
 
+######################################################################
+# Druidia
+######################################################################
+
+# Attributes changed often during play. Changes to these are kept in
+# memory and written to the database in batches (see
+# world/writebehind.py).
+DRUIDIA_HOT_ATTRIBUTES = ("health", "root_pos", "druidia_progress")
+# Max number of seconds a change to a hot Attribute stays unsaved; this
+# is how much can be lost in a crash. Set to 0 to save them right away.
+DRUIDIA_WRITE_BEHIND_INTERVAL = 5
+# Save early when this many hot Attributes are waiting to be written.
+DRUIDIA_WRITE_BEHIND_MAX_DIRTY = 500
+# Record every attack to binary files for balance analysis (see
+# world/telemetry.py), starting a new file after MAX_BYTES.
+DRUIDIA_TELEMETRY = True
+DRUIDIA_TELEMETRY_DIR = os.path.join(GAME_DIR, "server", "logs", "telemetry")
+DRUIDIA_TELEMETRY_MAX_BYTES = 16 * 1024**2
+# Where the Server leaves the world counts for MSSP (see world/stats.py).
+DRUIDIA_STATS_FILE = os.path.join(GAME_DIR, "server", "logs", "stats.json")
+# Serve server metrics for Prometheus on this local port (see
+# world/metrics.py). Set to None to turn them off.
+DRUIDIA_METRICS_PORT = 4010
+DRUIDIA_METRICS_INTERFACE = "127.0.0.1"
+# Fill the Druidia caches in the background at server start (see
+# world/warmup.py), doing at most SLICE seconds of work at a time.
+DRUIDIA_WARMUP = True
+DRUIDIA_WARMUP_SLICE = 0.05
+# Druidia's sessions track command latency and throttle clients sending
+# more (or more expensive) commands than the server can keep up with
+# (see server/conf/serversession.py). The throttle allows RATE commands
+# a second, in bursts of up to BURST.
+SERVER_SESSION_CLASS = "server.conf.serversession.ServerSession"
+DRUIDIA_THROTTLE_RATE = 4.0
+DRUIDIA_THROTTLE_BURST = 20.0
+# Default commands inherit from this, which adds the command metrics.
+COMMAND_DEFAULT_CLASS = "commands.command.MuxCommand"
+
+# Parse commands with a cached prefix trie of the command names (see
+# server/conf/cmdparser.py).
+COMMAND_PARSER = "server.conf.cmdparser.cmdparser"
+# Handle search results with suggestions and remembered multimatches
+# (see server/conf/at_search.py).
+SEARCH_AT_RESULT = "server.conf.at_search.at_search_result"
+
 ######################################################################
 # Settings given in secret_settings.py override those in this file.
 ######################################################################
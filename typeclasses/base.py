@@ -224,6 +224,14 @@ creation commands.
 
 
 from evennia import DefaultCharacter
+from evennia.utils import lazy_property
+
+from server.conf import at_search
+from world.progress import ProgressHandler
+
+# search keywords that change where to search; remembered multimatches
+# are not used for such searches
+_SCOPED_SEARCH_KWARGS = ("global_search", "typeclass", "location", "attribute_name")
 
 
 class Character(DefaultCharacter):
@@ -245,9 +253,49 @@ class Character(DefaultCharacter):
                     pre_logout_location Attribute and move it back on the grid.
     at_post_puppet - Echoes "AccountName has entered the game" to the room.
 
+    Druidia adds the `progress` handler (see world/progress.py), which
+    remembers what the character has achieved in the world.
+
+    Searches like `2-small`, following a search for `small` that found
+    several matches, are answered from the remembered multimatch (see
+    server/conf/at_search.py) instead of searching again.
+
     """
 
-    pass
+    @lazy_property
+    def progress(self):
+        return ProgressHandler(self)
+
+    def search(self, searchdata, quiet=False, **kwargs):
+        """
+        Search for an object, first trying the last multimatch.
+        See DefaultObject.search for the arguments.
+
+        The result is handled here rather than in DefaultObject.search,
+        so the search hook learns what was searched and only suggests
+        names from there.
+        """
+        if isinstance(searchdata, str) and not any(
+            kwargs.get(key) for key in _SCOPED_SEARCH_KWARGS
+        ):
+            obj = at_search.remembered_match(
+                self, searchdata, candidates=kwargs.get("candidates")
+            )
+            if obj:
+                return [obj] if quiet else obj
+        results = super().search(searchdata, quiet=True, **kwargs)
+        if quiet:
+            return results
+        return at_search.at_search_result(
+            results,
+            self,
+            query=searchdata,
+            nofound_string=kwargs.get("nofound_string"),
+            multimatch_string=kwargs.get("multimatch_string"),
+            candidates=kwargs.get("candidates"),
+            location=kwargs.get("location"),
+            global_search=kwargs.get("global_search"),
+        )
 
 
 # -------------------------------------------------------------
@@ -273,6 +321,10 @@ class Object(DefaultObject):
     This is the baseclass for all objects in Druidia.
     """
 
+    @lazy_property
+    def progress(self):
+        return ProgressHandler(self)
+
     def at_object_creation(self):
         """Called when the object is first created."""
         super().at_object_creation()
@@ -294,12 +346,19 @@ in a separate module (e.g. if they could have been re-used elsewhere.)
 """
 
 
+from collections import defaultdict
+
 from evennia import CmdSet, Command, DefaultRoom
 from evennia import utils, create_object, search_object
 from evennia import syscmdkeys
-from evennia.commands.default.muxcommand import MuxCommand
 from evennia.commands.default.general import CmdLook
 
+from commands.command import MuxCommand
+
+from server.conf import inlinefuncs
+from world import instances
+from world.combat import CombatRoundHandler
+
 # the system error-handling module is defined in the settings. We load the
 # given setting here using utils.object_from_module. This way we can use
 # it regardless of if we change settings later.
@@ -363,6 +422,46 @@ class CmdSetDetail(MuxCommand):
         self.caller.msg("Detail set: '%s': '%s'" % (self.lhs, self.rhs))
 
 
+class CmdInstance(MuxCommand):
+    """
+    creates a private copy of Druidia
+
+    Usage:
+        @instance [<character>[, <character>, ...]]
+
+    Example:
+        @instance
+        @instance Anna, Bob
+
+    This creates a new instance of the Druidia area (all rooms with a
+    dru# alias) and moves you, and any characters listed that are in
+    the same room as you, into the instance copy of this room. The
+    instance is removed again once no players are left in it.
+    This is a Builder command.
+    """
+
+    key = "@instance"
+    locks = "cmd:perm(Builder)"
+    help_category = "World"
+
+    def func(self):
+        """Create the instance and move the party there."""
+        caller = self.caller
+        if self.obj.db.template or self.obj.db.instance_id:
+            caller.msg("You are already inside an instance.")
+            return
+        party = [caller]
+        for name in self.lhslist:
+            if not name:
+                continue
+            member = caller.search(name, location=self.obj)
+            if not member:
+                return
+            party.append(member)
+        if instances.create_instance(party, start=self.obj) is None:
+            caller.msg("There are no rooms with a dru# alias to make an instance of.")
+
+
 class CmdLook(CmdLook):
     """
     looks at the room and on details
@@ -477,6 +576,7 @@ class RoomCmdSet(CmdSet):
     def at_cmdset_creation(self):
         """add the room commands"""
         self.add(CmdSetDetail())
+        self.add(CmdInstance())
         self.add(CmdLook())
         self.add(CmdGiveUp())
 
@@ -492,12 +592,187 @@ class Room(DefaultRoom):
     properties and methods available on all Objects.
 
     This is the base room type for all rooms in Druidia.
+
+    The appearance of the room is cached per viewer class (player,
+    builder or superuser), so repeated looks in an unchanged room only
+    cost a dict lookup. A cached render is reused as long as
+
+     - the room's appearance version is unchanged. It is bumped by
+       `invalidate_appearance()`, which is called when a detail is set
+       and when a dark room's light changes.
+     - the contents are the same objects as when it was rendered. This
+       catches all movement, also direct `obj.location = ...` moves that
+       bypass the move hooks.
+     - the room and its contents have the same names as when it was
+       rendered, so renaming with @name shows right away.
+     - the contents have the same view locks as when it was rendered,
+       so `@lock obj = view:...` shows right away.
+
+    Rooms holding something with a custom view lock are always
+    rendered from scratch, since who sees what then depends on more
+    than the viewer class.
+
+    The desc is not part of the cached render. It is put in for each
+    looker, with its inlinefuncs (like $viewer()) rendered for them (see
+    server/conf/inlinefuncs.py).
+
+    A room that is part of an instance (see world/instances.py) has its
+    template room stored in the Attribute `template`. The desc and
+    details are read from the template unless the room has its own.
+
+    With the Attribute `combat_rounds` set, combat in the room is
+    resolved in rounds by the handler `room.combat` (see
+    world/combat.py).
     """
 
+    @lazy_property
+    def combat(self):
+        """Handler for the combat rounds of this room."""
+        return CombatRoundHandler(self)
+
     def at_object_creation(self):
         """Called when room is first created"""
         self.cmdset.add_default(RoomCmdSet)
 
+    def invalidate_appearance(self):
+        """
+        Bump the appearance version of the room, dropping all cached
+        renders of it. Call this after changing the room in a way that
+        is not a move or a new desc.
+        """
+        self.ndb.appearance_version = (self.ndb.appearance_version or 0) + 1
+        self.ndb.appearance_cache = {}
+
+    def get_desc(self):
+        """
+        Get the desc of the room, falling back to the template's desc
+        for an instance room.
+        """
+        desc = self.db.desc
+        if desc is None and self.db.template:
+            desc = self.db.template.db.desc
+        return desc
+
+    def _viewer_class(self, looker):
+        """
+        Group lookers by what they see of the room. Builders see dbrefs
+        and superusers bypass the view locks.
+        """
+        if looker.is_superuser:
+            return "superuser"
+        if looker.locks.check_lockstring(looker, "perm(Builder)"):
+            return "builder"
+        return "player"
+
+    def _render_appearance(self, looker, contents, cacheable=True):
+        """
+        Render the parts of the room appearance that are the same for
+        all lookers of the same viewer class.
+
+        Args:
+            looker (Object): Object doing the looking.
+            contents (list): What to list.
+            cacheable (bool): If the render will be cached. If not, the
+                contents must already be filtered by what the looker can
+                see.
+
+        Returns:
+            tuple or None: `(header, footer, users, things)` where header
+                and footer are the text before and after the desc, and
+                users is a list of `(id, name)` for listed characters so
+                the looker can be left out of the list later. `None` if
+                the room can't be cached.
+
+        """
+        exits, users, things = [], [], defaultdict(list)
+        for con in contents:
+            if cacheable and con.locks.get("view") not in ("", "view:all()"):
+                return None
+            key = con.get_display_name(looker)
+            if con.destination:
+                exits.append(key)
+            elif con.has_account:
+                users.append((con.id, "|c%s|n" % key))
+            else:
+                # things can be pluralized
+                things[key].append(con)
+        header = "|c%s|n\n" % self.get_display_name(looker)
+        footer = ""
+        if exits:
+            footer = "\n|wExits:|n " + utils.list_to_string(exits)
+        thing_strings = []
+        for key, itemlist in sorted(things.items()):
+            nitem = len(itemlist)
+            if nitem == 1:
+                key, _ = itemlist[0].get_numbered_name(nitem, looker, key=key)
+            else:
+                key = [
+                    item.get_numbered_name(nitem, looker, key=key)[1]
+                    for item in itemlist
+                ][0]
+            thing_strings.append(key)
+        return header, footer, users, thing_strings
+
+    def return_appearance(self, looker, **kwargs):
+        """
+        This formats a description of the room, using a cached render
+        when possible.
+
+        Args:
+            looker (Object): Object doing the looking.
+
+        """
+        if not looker:
+            return ""
+        desc = self.get_desc()
+        if looker.location == self and not looker.has_account:
+            # the looker is among the listed things; skip the cache
+            return self._uncached_appearance(looker, desc)
+
+        contents = self.contents
+        signature = (self.key,) + tuple(
+            (con.id, con.key, con.locks.get("view")) for con in contents
+        )
+        version = self.ndb.appearance_version or 0
+        viewer = self._viewer_class(looker)
+
+        cache = self.ndb.appearance_cache
+        if cache is None:
+            cache = self.ndb.appearance_cache = {}
+        entry = cache.get(viewer)
+        if not (entry and entry[0] == version and entry[1] == signature):
+            parts = self._render_appearance(looker, contents)
+            if parts is None:
+                return self._uncached_appearance(looker, desc)
+            entry = cache[viewer] = (version, signature, parts)
+        return self._assemble_appearance(looker, entry[2], desc)
+
+    def _uncached_appearance(self, looker, desc):
+        """
+        Render the appearance from scratch, only listing what the looker
+        may see.
+        """
+        contents = [
+            con for con in self.contents if con != looker and con.access(looker, "view")
+        ]
+        parts = self._render_appearance(looker, contents, cacheable=False)
+        return self._assemble_appearance(looker, parts, desc)
+
+    def _assemble_appearance(self, looker, parts, desc):
+        """
+        Put together the rendered parts of the appearance and the desc,
+        rendered for the looker.
+        """
+        header, footer, users, thing_strings = parts
+        string = header
+        if desc:
+            string += inlinefuncs._render("%s" % desc, looker=looker)
+        string += footer
+        users = [name for obj_id, name in users if obj_id != looker.id]
+        if users or thing_strings:
+            string += "\n|wYou see:|n " + utils.list_to_string(users + thing_strings)
+        return string
+
     def at_object_receive(self, new_arrival, source_location):
         """
         When an object enters a room we tell other objects in the room
@@ -527,8 +802,11 @@ class Room(DefaultRoom):
 
         """
         details = self.db.details
-        if details:
-            return details.get(detailkey.lower(), None)
+        detail = details.get(detailkey.lower(), None) if details else None
+        if detail is None and self.db.template:
+            # an instance room shares the details of its template
+            return self.db.template.return_detail(detailkey)
+        return detail
 
     def set_detail(self, detailkey, description):
         """
@@ -546,6 +824,7 @@ class Room(DefaultRoom):
             self.db.details[detailkey.lower()] = description
         else:
             self.db.details = {detailkey.lower(): description}
+        self.invalidate_appearance()
 
 
 """
@@ -30,10 +30,12 @@
 import random
 
 from evennia import CmdSet, DefaultExit
-from evennia.utils import delay, search
+from evennia.utils import delay
 
 from commands.command import Command
 from typeclasses.base import Object
+from world import writebehind
+from world.instances import instance_search
 
 
 class CmdShiftRoot(Command):
@@ -88,8 +90,9 @@ class CmdShiftRoot(Command):
         color = self.arglist[0].lower()
         direction = self.arglist[1].lower()
 
-        # get current root positions dict
-        root_pos = self.obj.db.root_pos
+        # get current root positions dict. We work on a plain copy,
+        # since changing the stored dict saves it on every change.
+        root_pos = dict(self.obj.db.root_pos)
 
         if color not in root_pos:
             self.caller.msg("No such root to move.")
@@ -186,7 +189,7 @@ class CmdShiftRoot(Command):
                 )
 
         # we have moved the root. Store new position
-        self.obj.db.root_pos = root_pos
+        writebehind.set_attribute(self.obj, "root_pos", root_pos)
 
         # Check victory condition
         if list(root_pos.values()).count(0) == 0:  # no roots in middle position
@@ -214,7 +217,7 @@ class CmdPressButton(Command):
     def func(self):
         """Implements the command"""
 
-        if self.caller.db.crumbling_wall_found_exit:
+        if self.caller.progress.has("crumbling_wall_found_exit"):
             # we already pushed the button
             self.caller.msg(
                 "The button folded away when the secret passage opened. You cannot push it again."
@@ -252,6 +255,11 @@ class CmdSetCrumblingWall(CmdSet):
         self.add(CmdPressButton())
 
 
+# descriptions of the wall, keyed by (root positions, button_exposed,
+# exit_open). There are only a few hundred possible states.
+_DESC_CACHE = {}
+
+
 class CrumblingWall(Object, DefaultExit):
     """
     This is a custom Exit.
@@ -309,7 +317,7 @@ class CrumblingWall(Object, DefaultExit):
         itself.
         """
         # this will make it into a proper exit (this returns a list)
-        eloc = search.search_object(self.db.destination)
+        eloc = instance_search(self.db.destination, self)
         if not eloc:
             return False
         else:
@@ -345,11 +353,22 @@ class CrumblingWall(Object, DefaultExit):
             string = rootnames[root] + vpos[ipos]
         return string
 
-    def return_appearance(self, caller):
+    def _render_desc(self):
         """
-        This is called when someone looks at the wall. We need to echo the
-        current root positions.
+        Build the description of the wall from the puzzle state. The
+        result only depends on the state, so it's only built once for
+        each combination of root positions and flags.
         """
+        root_pos = self.db.root_pos or {}
+        state = (
+            tuple(root_pos.items()),
+            bool(self.db.button_exposed),
+            bool(self.db.exit_open),
+        )
+        desc = _DESC_CACHE.get(state)
+        if desc is not None:
+            return desc
+
         if self.db.button_exposed:
             # we found the button by moving the roots
             result = [
@@ -374,20 +393,28 @@ class CrumblingWall(Object, DefaultExit):
                 "try to |wshift|n or |wmove|n them (like '|wshift red up|n').\n"
             ]
             # display the root positions to help with the puzzle
-            for key, pos in self.db.root_pos.items():
+            for key, pos in root_pos.items():
                 result.append("\n" + self._translate_position(key, pos))
-        self.db.desc = "".join(result)
+        desc = _DESC_CACHE[state] = "".join(result)
+        return desc
 
-        # call the parent to continue execution (will use the desc we just set)
-        return super().return_appearance(caller)
+    def return_appearance(self, caller):
+        """
+        This is called when someone looks at the wall. We need to echo the
+        current root positions. The wall holds nothing, so we don't need
+        the parent's listing of contents, nor do we store the desc.
+        """
+        if not caller:
+            return ""
+        return "|c%s|n\n%s" % (self.get_display_name(caller), self._render_desc())
 
     def at_after_traverse(self, traverser, source_location):
         """
         This is called after we traversed this exit. Cleans up and resets
         the puzzle.
         """
-        del traverser.db.crumbling_wall_found_buttothe
-        del traverser.db.crumbling_wall_found_exit
+        traverser.progress.remove("crumbling_wall_found_button")
+        traverser.progress.remove("crumbling_wall_found_exit")
         self.reset()
 
     def at_failed_traverse(self, traverser):
@@ -14,8 +14,11 @@ still create the goto-callbacks.
 
 from evennia import create_object
 from evennia import CmdSet
+from evennia.utils.search import search_tag
 from evennia.utils.evmenu import parse_menu_template, EvMenu
 
+from typeclasses.base import Room
+
 # Goto callbacks and helper resources for the menu
 
 
@@ -186,84 +189,180 @@ This is a fist-sized stone covered in runes:
 """
 
 
-def _maintain_demo_room(caller, delete=False):
+# all parts of the demo area are tagged like this
+_DEMO_TAG = "intro_demo"
+_DEMO_TAG_CATEGORY = "druidia_menu"
+# the demo area, once found or created: {part: object}
+_DEMO_AREA = {}
+
+
+class DemoRoom(Room):
     """
-    Handle the creation/cleanup of demo assets. We store them
-    on the character and clean them when leaving the menu later.
+    A room in the demo area of the intro menu. The demo area is shared
+    by everyone going through the menu, and players are only meant to
+    be here while in the menu. Someone arriving without a menu (such as
+    after reconnecting in the middle of it) is sent home, and players
+    still here when the server reloads (which closes their menu) are
+    sent back where they came from.
     """
-    # this is a tuple (room, obj)
-    roomdata = caller.db.tutorial_world_demo_room_data
 
-    if delete:
-        if roomdata:
-            # we delete directly for simplicity. We need to delete
-            # in specific order to avoid deleting rooms moves
-            # its contents to their default home-location
-            prev_loc, room1, sign, room2, stone, door_out, door_in = roomdata
-            caller.location = prev_loc
-            sign.delete()
-            stone.delete()
-            door_out.delete()
-            door_in.delete()
-            room1.delete()
-            room2.delete()
-            del caller.db.tutorial_world_demo_room_data
-    elif not roomdata:
-        # create and describe the cabin and box
-        room1 = create_object(
-            "evennia.objects.objects.DefaultRoom", key="A small, cozy cabin"
-        )
-        room1.db.desc = _ROOM_DESC.lstrip()
-        sign = create_object(
-            "evennia.objects.objects.DefaultObject",
-            key="small wooden sign",
-            location=room1,
-        )
-        sign.db.desc = _SIGN_DESC.strip()
-        sign.locks.add("get:false()")
-        sign.db.get_err_msg = "The sign is nailed to the wall. It's not budging."
+    def at_object_creation(self):
+        """The commands of the demo come from the menu, not the room."""
+        super().at_object_creation()
+        self.cmdset.remove_default()
+
+    def at_object_receive(self, obj, source_location):
+        """Send players not using the menu home."""
+        if obj.has_account and not obj.ndb._menutree:
+            obj.msg("The cozy cabin fades away around you ...")
+            obj.ndb.demo_room_return = None
+            obj.move_to(obj.home, quiet=True)
+            return
+        super().at_object_receive(obj, source_location)
+
+    def at_object_leave(self, obj, target_location, **kwargs):
+        """Forget the way back when leaving the demo area."""
+        if not (
+            target_location
+            and target_location.tags.get(_DEMO_TAG, category=_DEMO_TAG_CATEGORY)
+        ):
+            obj.ndb.demo_room_return = None
+        super().at_object_leave(obj, target_location, **kwargs)
+
+    def at_server_reload(self):
+        """Send players back, since their menu does not survive."""
+        for obj in self.contents:
+            if obj.has_account:
+                _maintain_demo_room(obj, delete=True)
+                obj.cmdset.remove(DemoCommandSetRoom)
+
+
+def _create_demo_area():
+    """
+    Create the demo area. This is only done once; everyone going
+    through the menu then shares the same rooms.
 
-        # create and describe the meadow and stone
-        room2 = create_object(
-            "evennia.objects.objects.DefaultRoom", key="A lush summer meadow"
-        )
-        room2.db.desc = _MEADOW_DESC.lstrip()
-        stone = create_object(
-            "evennia.objects.objects.DefaultObject", key="carved stone", location=room2
-        )
-        stone.db.desc = _STONE_DESC.strip()
-
-        # make the linking exits
-        door_out = create_object(
-            "evennia.objects.objects.DefaultExit",
-            key="Door",
-            location=room1,
-            destination=room2,
-            locks=["get:false()"],
-        )
-        door_out.db.desc = _DOOR_DESC_OUT.strip()
-        door_in = create_object(
-            "evennia.objects.objects.DefaultExit",
-            key="entrance to the cabin",
-            aliases=["door", "in", "entrance"],
-            location=room2,
-            destination=room1,
-            locks=["get:false()"],
-        )
-        door_in.db.desc = _DOOR_DESC_IN.strip()
-
-        # store references for easy removal later
-        caller.db.tutorial_world_demo_room_data = (
-            caller.location,
-            room1,
-            sign,
-            room2,
-            stone,
-            door_out,
-            door_in,
-        )
+    Returns:
+        area (dict): The parts of the area, keyed by their demo_part.
+
+    """
+    tags = [(_DEMO_TAG, _DEMO_TAG_CATEGORY)]
+
+    # create and describe the cabin and box
+    room1 = create_object(
+        DemoRoom,
+        key="A small, cozy cabin",
+        tags=tags,
+        attributes=[("desc", _ROOM_DESC.lstrip()), ("demo_part", "room1")],
+    )
+    sign = create_object(
+        "evennia.objects.objects.DefaultObject",
+        key="small wooden sign",
+        location=room1,
+        locks=["get:false()"],
+        tags=tags,
+        attributes=[
+            ("desc", _SIGN_DESC.strip()),
+            ("get_err_msg", "The sign is nailed to the wall. It's not budging."),
+            ("demo_part", "sign"),
+        ],
+    )
+
+    # create and describe the meadow and stone
+    room2 = create_object(
+        DemoRoom,
+        key="A lush summer meadow",
+        tags=tags,
+        attributes=[("desc", _MEADOW_DESC.lstrip()), ("demo_part", "room2")],
+    )
+    stone = create_object(
+        "evennia.objects.objects.DefaultObject",
+        key="carved stone",
+        location=room2,
+        home=room2,
+        tags=tags,
+        attributes=[("desc", _STONE_DESC.strip()), ("demo_part", "stone")],
+    )
+
+    # make the linking exits
+    door_out = create_object(
+        "evennia.objects.objects.DefaultExit",
+        key="Door",
+        location=room1,
+        destination=room2,
+        locks=["get:false()"],
+        tags=tags,
+        attributes=[("desc", _DOOR_DESC_OUT.strip()), ("demo_part", "door_out")],
+    )
+    door_in = create_object(
+        "evennia.objects.objects.DefaultExit",
+        key="entrance to the cabin",
+        aliases=["door", "in", "entrance"],
+        location=room2,
+        destination=room1,
+        locks=["get:false()"],
+        tags=tags,
+        attributes=[("desc", _DOOR_DESC_IN.strip()), ("demo_part", "door_in")],
+    )
+    return {
+        obj.db.demo_part: obj for obj in (room1, sign, room2, stone, door_out, door_in)
+    }
+
+
+def _get_demo_area():
+    """
+    Get the shared demo area, creating it the first time it is needed.
+    """
+    room1 = _DEMO_AREA.get("room1")
+    if not (room1 and room1.pk):
+        _DEMO_AREA.clear()
+        for obj in search_tag(_DEMO_TAG, category=_DEMO_TAG_CATEGORY):
+            _DEMO_AREA[obj.db.demo_part] = obj
+        if "room1" not in _DEMO_AREA:
+            _DEMO_AREA.update(_create_demo_area())
+    return _DEMO_AREA
+
+
+def _maintain_demo_room(caller, delete=False):
+    """
+    Move the caller in and out of the demo area. The area itself is
+    shared and persistent, so nothing is created or deleted per player;
+    we only remember where the caller came from, in
+    `caller.ndb.demo_room_return`, for as long as they are in the area.
+    """
+    if delete:
+        legacy = caller.attributes.get("tutorial_world_demo_room_data")
+        if legacy:
+            # per-player demo rooms made by older versions of this menu
+            prev_loc, *demo_objs = legacy
+            if caller.sessions.count():
+                caller.location = prev_loc
+            else:
+                # logged off (cleaned up by the janitor); they are put
+                # back there when they next log in
+                caller.db.prelogout_location = prev_loc
+            for obj in demo_objs:
+                if obj and obj.pk:
+                    obj.delete()
+            caller.attributes.remove("tutorial_world_demo_room_data")
+        prev_loc = caller.ndb.demo_room_return
+        if prev_loc is None and not (
+            caller.location
+            and caller.location.tags.get(_DEMO_TAG, category=_DEMO_TAG_CATEGORY)
+        ):
+            # we never went to the demo area
+            return
+        # hand back anything picked up in the demo area (like the stone)
+        for obj in caller.contents:
+            if obj.tags.get(_DEMO_TAG, category=_DEMO_TAG_CATEGORY):
+                obj.location = obj.home
+        caller.location = prev_loc or caller.home
+        caller.ndb.demo_room_return = None
+    elif caller.ndb.demo_room_return is None:
+        area = _get_demo_area()
+        caller.ndb.demo_room_return = caller.location
         # move caller into room
-        caller.location = room1
+        caller.location = area["room1"]
 
 
 class DemoCommandSetRoom(CmdSet):
@@ -290,8 +389,8 @@ class DemoCommandSetRoom(CmdSet):
 
 def goto_command_demo_room(caller, raw_string, **kwargs):
     """
-    Setup and go to the demo-room node. Generates a little 2-room environment
-    for testing out some commands.
+    Setup and go to the demo-room node. Moves the caller into a little
+    2-room environment for testing out some commands.
     """
     _maintain_demo_room(caller)
     caller.cmdset.remove(DemoCommandSetHelp)
@@ -744,6 +843,13 @@ back: conclusions
 # -------------------------------------------------------------------------------------------
 
 
+# the parsed MENU_TEMPLATE, see get_menutree
+_MENUTREE = None
+# formatted node texts and options, keyed by node
+_NODETEXT_CACHE = {}
+_OPTIONS_CACHE = {}
+
+
 class TutorialEvMenu(EvMenu):
     """
     Custom EvMenu for displaying the intro-menu
@@ -757,8 +863,29 @@ class TutorialEvMenu(EvMenu):
         _maintain_demo_room(self.caller, delete=True)
         super().close_menu()
 
-    def options_formatter(self, optionslist):
+    def nodetext_formatter(self, nodetext):
+        """
+        The text of a node never changes, so only format it once.
+        """
+        key = (self.nodename, nodetext)
+        text = _NODETEXT_CACHE.get(key)
+        if text is None:
+            text = _NODETEXT_CACHE[key] = super().nodetext_formatter(nodetext)
+        return text
 
+    def options_formatter(self, optionslist):
+        """
+        The options of a node never change either; they are formatted
+        once per node and then reused.
+        """
+        key = (self.nodename, tuple(optionslist))
+        text = _OPTIONS_CACHE.get(key)
+        if text is None:
+            text = _OPTIONS_CACHE[key] = self._format_options(optionslist)
+        return text
+
+    def _format_options(self, optionslist):
+        """Format the options, with the navigation options on one line."""
         navigation_keys = ("next", "back", "back to start")
 
         other = []
@@ -780,10 +907,21 @@ class TutorialEvMenu(EvMenu):
         return f"{navigation}{sep}{other}"
 
 
+def get_menutree():
+    """
+    Parse the menu template. This is only done the first time the menu
+    is used; the nodes do not depend on the caller, so the same parsed
+    tree is then used for everyone.
+    """
+    global _MENUTREE
+    if _MENUTREE is None:
+        _MENUTREE = parse_menu_template(None, MENU_TEMPLATE, GOTO_CALLABLES)
+    return _MENUTREE
+
+
 def init_menu(caller):
     """
     Call to initialize the menu.
 
     """
-    menutree = parse_menu_template(caller, MENU_TEMPLATE, GOTO_CALLABLES)
-    TutorialEvMenu(caller, menutree)
+    TutorialEvMenu(caller, dict(get_menutree()))
@@ -6,11 +6,14 @@ object based on that mobile class.
 """
 
 import random
+from commands.command import Command
 from typeclasses.base import Object
+from world import combat, metrics, writebehind
+from world.instances import instance_search
 
 from evennia import TICKER_HANDLER
 from evennia import search_object
-from evennia import Command, CmdSet
+from evennia import CmdSet
 from evennia import logger
 
 
@@ -186,7 +189,7 @@ class Mob(Object):
         idstring = "druidia_mob"  # this doesn't change
         last_interval = self.db.last_ticker_interval
         last_hook_key = self.db.last_hook_key
-        if last_interval and last_hook_key:
+        if last_interval and hasattr(self, last_hook_key or ""):
             # we have a previous subscription, kill this first.
             TICKER_HANDLER.remove(
                 interval=last_interval,
@@ -201,6 +204,13 @@ class Mob(Object):
                 interval=interval, callback=getattr(self, hook_key), idstring=idstring
             )
 
+    def at_object_delete(self):
+        """
+        Stop ticking when deleted, so no subscription is left behind.
+        """
+        self._set_ticker(None, None, stop=True)
+        return True
+
     def _find_target(self, location):
         """
         Scan the given location for suitable targets (this is defined
@@ -280,7 +290,7 @@ class Mob(Object):
         if not self.db.hunting:
             self.start_patrolling()
             return
-        self._set_ticker(self.db.hunting_pace, "do_hunt")
+        self._set_ticker(self.db.hunting_pace, "do_hunting")
         self.ndb.is_patrolling = False
         self.ndb.is_hunting = True
         self.ndb.is_attacking = False
@@ -297,6 +307,7 @@ class Mob(Object):
         self.ndb.is_hunting = False
         self.ndb.is_attacking = True
 
+    @metrics.timed_ticker("druidia_mob")
     def do_patrol(self, *args, **kwargs):
         """
         Called repeatedly during patrolling mode.  In this mode, the
@@ -306,7 +317,9 @@ class Mob(Object):
         allowing account-controlled characters to move normally.
         """
         if random.random() < 0.01 and self.db.irregular_msgs:
-            self.location.msg_contents(random.choice(self.db.irregular_msgs))
+            self.location.msg_contents(
+                (random.choice(self.db.irregular_msgs), {"type": "ambient"})
+            )
         if self.db.aggressive:
             # first check if there are any targets in the room.
             target = self._find_target(self.location)
@@ -324,6 +337,7 @@ class Mob(Object):
             # no exits! teleport to home to get away.
             self.move_to(self.home)
 
+    @metrics.timed_ticker("druidia_mob")
     def do_hunting(self, *args, **kwargs):
         """
         Called regularly when in hunting mode. In hunting mode the mob
@@ -331,7 +345,9 @@ class Mob(Object):
         attack if possible.
         """
         if random.random() < 0.01 and self.db.irregular_msgs:
-            self.location.msg_contents(random.choice(self.db.irregular_msgs))
+            self.location.msg_contents(
+                (random.choice(self.db.irregular_msgs), {"type": "ambient"})
+            )
         if self.db.aggressive:
             # first check if there are any targets in the room.
             target = self._find_target(self.location)
@@ -355,6 +371,7 @@ class Mob(Object):
             # no exits! teleport to home to get away.
             self.move_to(self.home)
 
+    @metrics.timed_ticker("druidia_mob")
     def do_attack(self, *args, **kwargs):
         """
         Called regularly when in attacking mode. In attacking mode
@@ -362,7 +379,9 @@ class Mob(Object):
         in the room.
         """
         if random.random() < 0.01 and self.db.irregular_msgs:
-            self.location.msg_contents(random.choice(self.db.irregular_msgs))
+            self.location.msg_contents(
+                (random.choice(self.db.irregular_msgs), {"type": "ambient"})
+            )
         # first make sure we have a target
         target = self._find_target(self.location)
         if not target:
@@ -373,6 +392,8 @@ class Mob(Object):
         # we use the same attack commands as defined in
         # objects.Weapon, assuming that
         # the mob is given a Weapon to attack with.
+        # a hit bringing the target to <= 0 health calls at_defeat, right
+        # away or when the combat round is resolved (see world/combat.py)
         attack_cmd = random.choice(("thrust", "pierce", "stab", "slash", "chop"))
         self.execute_cmd("%s %s" % (attack_cmd, target))
 
@@ -381,50 +402,64 @@ class Mob(Object):
             logger.log_err(
                 f"{self.key} found {target} had an `health` attribute of `None`."
             )
-            return
 
-        # analyze the current state
-        if target.db.health <= 0:
-            # we reduced the target to <= 0 health. Move them to the
-            # defeated room
-            target.msg(self.db.defeat_msg)
-            self.location.msg_contents(
-                self.db.defeat_msg_room % target.key, exclude=target
+    def at_defeat(self, target, report=None):
+        """
+        We reduced the target to <= 0 health. Move them to the defeated
+        room.
+
+        Args:
+            target (Object): Who we defeated.
+            report (DirectReport, optional): Where to send messages (see
+                world/combat.py). By default they are sent right away.
+
+        """
+        report = report or combat.DirectReport(target.location)
+        report.msg(target, self.db.defeat_msg)
+        report.msg_contents(self.db.defeat_msg_room % target.key, exclude=[target])
+        send_defeated_to = instance_search(self.db.send_defeated_to, self)
+        if send_defeated_to:
+            target.move_to(send_defeated_to[0], quiet=True)
+        else:
+            logger.log_err(
+                "Mob: mob.db.send_defeated_to not found: %s" % self.db.send_defeated_to
             )
-            send_defeated_to = search_object(self.db.send_defeated_to)
-            if send_defeated_to:
-                target.move_to(send_defeated_to[0], quiet=True)
-            else:
-                logger.log_err(
-                    "Mob: mob.db.send_defeated_to not found: %s"
-                    % self.db.send_defeated_to
-                )
 
     # response methods - called by other objects
 
-    def at_hit(self, weapon, attacker, damage):
+    def at_hit(self, weapon, attacker, damage, report=None):
         """
         Someone landed a hit on us. Check our status
         and start attacking if not already doing so.
+
+        Args:
+            weapon (Weapon): What we were hit with.
+            attacker (Object): Who hit us.
+            damage (float): The damage of the hit.
+            report (DirectReport, optional): Where to send messages
+                (see world/combat.py). By default they are sent
+                right away.
+
         """
+        report = report or combat.DirectReport(self.location)
         if self.db.health is None:
             # health not set - this can't be damaged.
-            attacker.msg(self.db.weapon_ineffective_msg)
+            report.msg(attacker, self.db.weapon_ineffective_msg)
             return
 
         if not self.ndb.is_immortal:
-            if not weapon.db.magic:
+            if not weapon.stats.magic:
                 # not a magic weapon - divide away magic resistance
                 damage /= self.db.damage_resistance
-                attacker.msg(self.db.weapon_ineffective_msg)
+                report.msg(attacker, self.db.weapon_ineffective_msg)
             else:
-                self.location.msg_contents(self.db.hit_msg)
-            self.db.health -= damage
+                report.msg_contents(self.db.hit_msg)
+            writebehind.set_attribute(self, "health", self.db.health - damage)
 
         # analyze the result
         if self.db.health <= 0:
             # we are dead!
-            attacker.msg(self.db.death_msg)
+            report.msg(attacker, self.db.death_msg)
             self.set_dead()
         else:
             # still alive, start attack if not already attacking
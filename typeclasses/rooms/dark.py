@@ -11,10 +11,11 @@
 
 import random
 from evennia import TICKER_HANDLER
-from evennia import CmdSet, Command
+from evennia import CmdSet
 from evennia import utils, create_object, search_object
 from evennia import syscmdkeys, default_cmds
 
+from commands.command import Command
 from typeclasses.base import Room
 from typeclasses.widgets.lights import LightSource
 
@@ -220,6 +221,8 @@ class DarkRoom(Room):
         Args:
             exclude (Object): An object to not include in the light check.
         """
+        # the view lock changes below, so drop any cached look
+        self.invalidate_appearance()
         if any(self._carries_light(obj) for obj in self.contents if obj != exclude):
             self.locks.add("view:all()")
             self.cmdset.remove(DarkCmdSet)
@@ -1,9 +1,11 @@
-from evennia import CmdSet, Command
+from evennia import CmdSet
 from evennia import utils, create_object, search_object
 from evennia import syscmdkeys, default_cmds
 
+from commands.command import Command
 from typeclasses.base import Room
 from typeclasses.menus.intro_menu import init_menu
+from world.progress import LEGACY_ATTRIBUTES
 
 
 # ------------------------------------------------------------
@@ -120,14 +122,16 @@ class OutroRoom(Room):
         if character.has_account:
             del character.db.health_max
             del character.db.health
-            del character.db.last_climbed
-            del character.db.puzzle_clue
-            del character.db.combat_parry_mode
-            del character.db.tutorial_bridge_position
+            # all world flags and puzzle state go in one write
+            character.progress.clear()
             for obj in character.contents:
                 if obj.typeclass_path.startswith("."):
                     obj.delete()
+            # world tags and Attributes may still linger on characters
+            # from before the progress record was introduced.
             character.tags.clear(category="world")
+            for key in LEGACY_ATTRIBUTES:
+                character.attributes.remove(key)
 
     def at_object_leave(self, character, destination):
         if character.account:
@@ -14,11 +14,13 @@
 # -------------------------------------------------------------
 
 
-from evennia import CmdSet, Command
+from evennia import CmdSet
 from evennia import utils, create_object, search_object
 from evennia import syscmdkeys, default_cmds
 
+from commands.command import Command
 from typeclasses.base import Room
+from world.instances import instance_search
 
 
 class TeleportRoom(Room):
@@ -26,8 +28,8 @@ class TeleportRoom(Room):
     Teleporter - puzzle room.
 
     Important attributes (set at creation):
-      puzzle_key    - which attr to look for on character
-      puzzle_value  - what char.db.puzzle_key must be set to
+      puzzle_value  - what the puzzle_clue in the character's progress
+                      must be set to
       success_teleport_to -  where to teleport in case if success
       success_teleport_msg - message to echo while teleporting to success
       failure_teleport_to - where to teleport to in case of failure
@@ -38,7 +40,7 @@ class TeleportRoom(Room):
     def at_object_creation(self):
         """Called at first creation"""
         super().at_object_creation()
-        # what character.db.puzzle_clue must be set to, to avoid teleportation.
+        # what the character's puzzle_clue must be set to, to avoid teleportation.
         self.db.puzzle_value = 1
         # target of successful teleportation. Can be a dbref or a
         # unique room name.
@@ -57,12 +59,14 @@ class TeleportRoom(Room):
             # only act on player characters.
             return
         # determine if the puzzle is a success or not
-        is_success = str(character.db.puzzle_clue) == str(self.db.puzzle_value)
+        is_success = str(character.progress.get("puzzle_clue")) == str(
+            self.db.puzzle_value
+        )
         teleport_to = (
             self.db.success_teleport_to if is_success else self.db.failure_teleport_to
         )
         # note that this returns a list
-        results = search_object(teleport_to)
+        results = instance_search(teleport_to, self)
         if not results or len(results) > 1:
             # we cannot move anywhere since no valid target was found.
             character.msg("no valid teleport target for %s was found." % teleport_to)
@@ -7,11 +7,14 @@
 
 import random
 from evennia import TICKER_HANDLER
-from evennia import Command, CmdSet
+from evennia import CmdSet
 from evennia import utils, create_object, search_object
 from evennia import syscmdkeys, default_cmds
 
+from commands.command import Command
 from typeclasses.base import Room
+from world import metrics
+from world.instances import instance_search
 
 
 # These are rainy weather strings
@@ -58,6 +61,17 @@ class WeatherRoom(Room):
             interval=self.db.interval, callback=self.update_weather, idstring="druidia"
         )
 
+    def at_object_delete(self):
+        """
+        Called just before the room is deleted (such as when an instance
+        is cleaned up). Stop our ticker so it doesn't outlive us.
+        """
+        TICKER_HANDLER.remove(
+            interval=self.db.interval, callback=self.update_weather, idstring="druidia"
+        )
+        return True
+
+    @metrics.timed_ticker("druidia")
     def update_weather(self, *args, **kwargs):
         """
         Called by the tickerhandler at regular intervals. Even so, we
@@ -68,7 +82,9 @@ class WeatherRoom(Room):
         """
         if random.random() < 0.2:
             # only update 20 % of the time
-            self.msg_contents("|w%s|n" % random.choice(WEATHER_STRINGS))
+            self.msg_contents(
+                ("|w%s|n" % random.choice(WEATHER_STRINGS), {"type": "ambient"})
+            )
 
 
 # -------------------------------------------------------------
@@ -99,8 +115,8 @@ class CmdEast(Command):
               when exiting east.
             - west_exit: a unique name or dbref to the room to go to
               when exiting west.
-       The room must also have the following Attributes
-           - tutorial_bridge_posistion: the current position on
+       The caller's progress must also hold the following field
+           - bridge_position: the current position on
              on the bridge, 0 - 4.
 
     """
@@ -114,18 +130,18 @@ class CmdEast(Command):
         """move one step eastwards"""
         caller = self.caller
 
-        bridge_step = min(5, caller.db.tutorial_bridge_position + 1)
+        bridge_step = min(5, caller.progress.get("bridge_position", 0) + 1)
 
         if bridge_step > 4:
             # we have reached the far east end of the bridge.
             # Move to the east room.
-            eexit = search_object(self.obj.db.east_exit)
+            eexit = instance_search(self.obj.db.east_exit, self.obj)
             if eexit:
                 caller.move_to(eexit[0])
             else:
                 caller.msg("No east exit was found for this room. Contact an admin.")
             return
-        caller.db.tutorial_bridge_position = bridge_step
+        caller.progress.set("bridge_position", bridge_step)
         # since we are really in one room, we have to notify others
         # in the room when we move.
         caller.location.msg_contents(
@@ -146,8 +162,8 @@ class CmdWest(Command):
              when exiting east.
            - west_exit: a unique name or dbref to the room to go to
              when exiting west.
-       The room must also have the following property:
-           - tutorial_bridge_posistion: the current position on
+       The caller's progress must also hold the following field:
+           - bridge_position: the current position on
              on the bridge, 0 - 4.
 
     """
@@ -161,18 +177,18 @@ class CmdWest(Command):
         """move one step westwards"""
         caller = self.caller
 
-        bridge_step = max(-1, caller.db.tutorial_bridge_position - 1)
+        bridge_step = max(-1, caller.progress.get("bridge_position", 0) - 1)
 
         if bridge_step < 0:
             # we have reached the far west end of the bridge.
             # Move to the west room.
-            wexit = search_object(self.obj.db.west_exit)
+            wexit = instance_search(self.obj.db.west_exit, self.obj)
             if wexit:
                 caller.move_to(wexit[0])
             else:
                 caller.msg("No west exit was found for this room. Contact an admin.")
             return
-        caller.db.tutorial_bridge_position = bridge_step
+        caller.progress.set("bridge_position", bridge_step)
         # since we are really in one room, we have to notify others
         # in the room when we move.
         caller.location.msg_contents(
@@ -233,7 +249,7 @@ class CmdLookBridge(Command):
     def func(self):
         """Looking around, including a chance to fall."""
         caller = self.caller
-        bridge_position = self.caller.db.tutorial_bridge_position
+        bridge_position = self.caller.progress.get("bridge_position", 0)
         # this command is defined on the room, so we get it through self.obj
         location = self.obj
         # randomize the look-echo
@@ -261,7 +277,7 @@ class CmdLookBridge(Command):
             and not self.caller.is_superuser
         ):
             # we fall 5% of time.
-            fall_exit = search_object(self.obj.db.fall_exit)
+            fall_exit = instance_search(self.obj.db.fall_exit, self.obj)
             if fall_exit:
                 self.caller.msg("|r%s|n" % FALL_MESSAGE)
                 self.caller.move_to(fall_exit[0], quiet=True)
@@ -336,7 +352,7 @@ class BridgeRoom(WeatherRoom):
         self.db.west_exit     -   -  |  -   -     self.db.east_exit
                               0   1  2  3   4
 
-     The position is handled by a variable stored on the character
+     The position is handled by a field in the character's progress
      when entering and giving special move commands will
      increase/decrease the counter until the bridge is crossed.
 
@@ -366,6 +382,7 @@ class BridgeRoom(WeatherRoom):
         # handle all return messages.
         self.locks.add("view:false()")
 
+    @metrics.timed_ticker("druidia")
     def update_weather(self, *args, **kwargs):
         """
         This is called at irregular intervals and makes the passage
@@ -373,7 +390,9 @@ class BridgeRoom(WeatherRoom):
         """
         if random.random() < 80:
             # send a message most of the time
-            self.msg_contents("|w%s|n" % random.choice(BRIDGE_WEATHER))
+            self.msg_contents(
+                ("|w%s|n" % random.choice(BRIDGE_WEATHER), {"type": "ambient"})
+            )
 
     def at_object_receive(self, character, source_location):
         """
@@ -383,22 +402,22 @@ class BridgeRoom(WeatherRoom):
         if character.has_account:
             # we only run this if the entered object is indeed a player object.
             # check so our east/west exits are correctly defined.
-            wexit = search_object(self.db.west_exit)
-            eexit = search_object(self.db.east_exit)
-            fexit = search_object(self.db.fall_exit)
+            wexit = instance_search(self.db.west_exit, self)
+            eexit = instance_search(self.db.east_exit, self)
+            fexit = instance_search(self.db.fall_exit, self)
             if not (wexit and eexit and fexit):
                 character.msg(
                     "The bridge's exits are not properly configured. "
                     "Contact an admin. Forcing west-end placement."
                 )
-                character.db.tutorial_bridge_position = 0
+                character.progress.set("bridge_position", 0)
                 return
             if source_location == eexit[0]:
                 # we assume we enter from the same room we will exit to
-                character.db.tutorial_bridge_position = 4
+                character.progress.set("bridge_position", 4)
             else:
                 # if not from the east, then from the west!
-                character.db.tutorial_bridge_position = 0
+                character.progress.set("bridge_position", 0)
             character.execute_cmd("look")
 
     def at_object_leave(self, character, target_location):
@@ -406,5 +425,5 @@ class BridgeRoom(WeatherRoom):
         This is triggered when the player leaves the bridge room.
         """
         if character.has_account:
-            # clean up the position attribute
-            del character.db.tutorial_bridge_position
+            # clean up the position
+            character.progress.set("bridge_position", None)
@@ -3,7 +3,7 @@
 # Climbable object
 #
 # The climbable object works so that once climbed, it sets
-# a flag on the climber to show that it was climbed. A simple
+# a progress flag on the climber to show that it was climbed. A simple
 # command 'climb' handles the actual climbing. The memory
 # of what was last climbed is used in a simple puzzle in
 # Druidia.
@@ -50,8 +50,9 @@ class CmdClimb(Command):
                 % self.obj.name
             )
         self.caller.msg(ostring)
-        # set a tag on the caller to remember that we climbed.
-        self.caller.tags.add("climbed_tree", category="world")
+        # remember that we climbed, and what.
+        self.caller.progress.add("climbed_tree")
+        self.caller.progress.set("last_climbed", self.obj.id)
 
 
 class CmdSetClimbable(CmdSet):
@@ -5,7 +5,7 @@
 # The Obelisk is an object with a modified return_appearance method
 # that causes it to look slightly different every time one looks at it.
 # Since what you actually see is a part of a game puzzle, the act of
-# looking also stores a key attribute on the looking object (different
+# looking also stores a clue in the progress of the looker (different
 # depending on which text you saw) for later reference.
 #
 # -------------------------------------------------------------
@@ -55,7 +55,7 @@ class Obelisk(Object):
         # remember that this was the clue we got. The Puzzle room will
         # look for this later to determine if you should be teleported
         # or not.
-        caller.db.puzzle_clue = clueindex
+        caller.progress.set("puzzle_clue", clueindex)
         # call the parent function as normal (this will use
         # the new desc Attribute we just set)
         return super().return_appearance(caller)
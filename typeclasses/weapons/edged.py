@@ -14,12 +14,58 @@
 # -------------------------------------------------------------
 
 
-import random
-
+from django.db.models.signals import post_delete, post_save
 from evennia import CmdSet
+from evennia.typeclasses.attributes import Attribute
 
 from commands.command import Command
 from typeclasses.base import Object
+from world import combat, effects
+
+# the Attributes making up the stats of a weapon
+WEAPON_STAT_KEYS = ("hit", "parry", "damage", "magic", "bleed")
+
+# loaded WeaponStats, keyed by weapon id
+_WEAPON_STATS = {}
+
+
+class WeaponStats:
+    """
+    The combat stats of a weapon, read once from its Attributes. This
+    is what combat uses, so a swing never has to go to the Attribute
+    handler. The stats are read-only; change the Attributes instead.
+
+    Besides the stat Attributes, this holds the name of the prototype
+    the weapon was made from (if any), for the combat telemetry.
+    """
+
+    __slots__ = WEAPON_STAT_KEYS + ("prototype",)
+
+    def __init__(self, hit, parry, damage, magic, bleed=None, prototype=None):
+        values = (hit, parry, damage, magic, bleed, prototype)
+        for key, value in zip(self.__slots__, values):
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Weapon stats are read-only.")
+
+
+def _invalidate_weapon_stats(sender, instance, **kwargs):
+    """
+    Forget all loaded stats when a stat Attribute is saved or deleted.
+    An Attribute does not know which object it sits on, but stats
+    change so rarely that starting over is cheap.
+    """
+    if instance.db_key in WEAPON_STAT_KEYS:
+        _WEAPON_STATS.clear()
+
+
+post_save.connect(
+    _invalidate_weapon_stats, sender=Attribute, dispatch_uid="druidia_weapon_stats"
+)
+post_delete.connect(
+    _invalidate_weapon_stats, sender=Attribute, dispatch_uid="druidia_weapon_stats"
+)
 
 
 class CmdAttack(Command):
@@ -69,83 +115,39 @@ class CmdAttack(Command):
             self.caller.msg(string)
             return
 
-        # parry mode
         if cmdstring in ("parry", "defend"):
-            string = "You raise your weapon in a defensive pose, ready to block the next enemy attack."
-            self.caller.msg(string)
-            self.caller.db.combat_parry_mode = True
-            self.caller.location.msg_contents(
-                "%s takes a defensive stance" % self.caller, exclude=[self.caller]
-            )
-            return
-
-        if not self.args:
-            self.caller.msg("Who do you attack?")
-            return
-        target = self.caller.search(self.args.strip())
-        if not target:
-            return
-
-        if cmdstring in ("thrust", "pierce", "stab"):
-            hit = float(self.obj.db.hit) * 0.7  # modified due to stab
-            damage = self.obj.db.damage * 2  # modified due to stab
-            string = "You stab with %s. " % self.obj.key
-            tstring = "%s stabs at you with %s. " % (self.caller.key, self.obj.key)
-            ostring = "%s stabs at %s with %s. " % (
-                self.caller.key,
-                target.key,
-                self.obj.key,
-            )
-            self.caller.db.combat_parry_mode = False
-        elif cmdstring in ("slash", "chop", "bash"):
-            hit = float(self.obj.db.hit)  # un modified due to slash
-            damage = self.obj.db.damage  # un modified due to slash
-            string = "You slash with %s. " % self.obj.key
-            tstring = "%s slash at you with %s. " % (self.caller.key, self.obj.key)
-            ostring = "%s slash at %s with %s. " % (
-                self.caller.key,
-                target.key,
-                self.obj.key,
-            )
-            self.caller.db.combat_parry_mode = False
+            mode = "parry"
+            target = None
         else:
-            self.caller.msg(
-                "You fumble with your weapon, unsure of whether to stab, slash or parry ..."
-            )
-            self.caller.location.msg_contents(
-                "%s fumbles with their weapon." % self.caller, exclude=self.caller
-            )
-            self.caller.db.combat_parry_mode = False
-            return
-
-        if target.db.combat_parry_mode:
-            # target is defensive; even harder to hit!
-            target.msg("|GYou defend, trying to avoid the attack.|n")
-            hit *= 0.5
-
-        if random.random() <= hit:
-            self.caller.msg(string + "|gIt's a hit!|n")
-            target.msg(tstring + "|rIt's a hit!|n")
-            self.caller.location.msg_contents(
-                ostring + "It's a hit!", exclude=[target, self.caller]
-            )
-
-            # call enemy hook
-            if hasattr(target, "at_hit"):
-                # should return True if target is defeated, False otherwise.
-                target.at_hit(self.obj, self.caller, damage)
+            if not self.args:
+                self.caller.msg("Who do you attack?")
                 return
-            elif target.db.health:
-                target.db.health -= damage
+            target = self.caller.search(self.args.strip())
+            if not target:
+                return
+            if cmdstring in ("thrust", "pierce", "stab"):
+                mode = "stab"
+            elif cmdstring in ("slash", "chop", "bash"):
+                mode = "slash"
             else:
-                # sorry, impossible to fight this enemy ...
-                self.caller.msg("The enemy seems unaffected.")
+                self.caller.msg(
+                    "You fumble with your weapon, unsure of whether to stab, slash or parry ..."
+                )
+                self.caller.location.msg_contents(
+                    "%s fumbles with their weapon." % self.caller, exclude=self.caller
+                )
+                effects.remove(self.caller, "parry")
                 return
+
+        location = self.caller.location
+        if location and location.db.combat_rounds:
+            # the room resolves all combat in rounds
+            location.combat.declare(self.caller, self.obj, mode, target)
+        elif mode == "parry":
+            combat.resolve_parry(self.caller, self.obj, combat.DirectReport(location))
         else:
-            self.caller.msg(string + "|rYou miss.|n")
-            target.msg(tstring + "|gThey miss you.|n")
-            self.caller.location.msg_contents(
-                ostring + "They miss.", exclude=[target, self.caller]
+            combat.resolve_attack(
+                self.caller, self.obj, mode, target, combat.DirectReport(location)
             )
 
 
@@ -178,6 +180,26 @@ class Weapon(Object):
         self.db.magic = False
         self.cmdset.add_default(CmdSetWeapon, permanent=True)
 
+    @property
+    def stats(self):
+        """
+        The WeaponStats of this weapon, loaded the first time they are
+        needed after a change.
+        """
+        stats = _WEAPON_STATS.get(self.id)
+        if stats is None:
+            prototypes = self.tags.get(category="from_prototype", return_list=True)
+            stats = _WEAPON_STATS[self.id] = WeaponStats(
+                *(self.attributes.get(key) for key in WEAPON_STAT_KEYS),
+                prototype=prototypes[0] if prototypes else None,
+            )
+        return stats
+
+    def at_object_delete(self):
+        """Forget the stats of a deleted weapon."""
+        _WEAPON_STATS.pop(self.id, None)
+        return True
+
     def reset(self):
         """
         When reset, the weapon is simply deleted, unless it has a place
@@ -16,11 +16,11 @@ import random
 
 from evennia import CmdSet
 from evennia.utils import dedent
-from evennia.prototypes.spawner import spawn
 
 from commands.command import Command
 from typeclasses.base import Object
 from typeclasses.weapons.edged import Weapon
+from world.spawning import flatten_prototypes, spawn_prototype
 
 WEAPON_PROTOTYPES = {
     "weapon": {
@@ -135,6 +135,14 @@ WEAPON_PROTOTYPES = {
     },
 }
 
+# The prototypes above with all inheritance resolved, so handing out a
+# weapon is a single create_object. Prototypes that failed to resolve
+# are left out and listed in WEAPON_PROTOTYPE_ERRORS, which is reported
+# at server start.
+FLAT_WEAPON_PROTOTYPES, WEAPON_PROTOTYPE_ERRORS = flatten_prototypes(
+    WEAPON_PROTOTYPES
+)
+
 
 class CmdGetWeapon(Command):
     """
@@ -210,20 +218,27 @@ class WeaponRack(Object):
         """
         This will produce a new weapon from the rack,
         assuming the caller hasn't already gotten one. When
-        doing so, the caller will get Tagged with the id
-        of this rack, to make sure they cannot keep
+        doing so, the caller will get the id of this rack
+        set as a progress flag, to make sure they cannot keep
         pulling weapons from it indefinitely.
         """
         rack_id = self.db.rack_id
-        if caller.tags.get(rack_id, category="world"):
+        # prototypes that failed their check at load are left out of the
+        # flattened dictionary (see WEAPON_PROTOTYPE_ERRORS)
+        prototypes = [
+            name.lower()
+            for name in self.db.available_weapons or ()
+            if name.lower() in FLAT_WEAPON_PROTOTYPES
+        ]
+        if caller.progress.has(rack_id):
             caller.msg(self.db.no_more_weapons_msg)
+        elif not prototypes:
+            caller.msg("The rack is empty.")
         else:
-            prototype = random.choice(self.db.available_weapons)
-            # use the spawner to create a new Weapon from the
-            # spawner dictionary, tag the caller
-            wpn = spawn(
-                WEAPON_PROTOTYPES[prototype], prototype_parents=WEAPON_PROTOTYPES
-            )[0]
-            caller.tags.add(rack_id, category="world")
+            prototype = random.choice(prototypes)
+            # create a new Weapon from the flattened prototype
+            # dictionary, flag the caller
+            wpn = spawn_prototype(FLAT_WEAPON_PROTOTYPES[prototype])
+            caller.progress.add(rack_id)
             wpn.location = caller
             caller.msg(self.db.get_weapon_msg % wpn.key)
@@ -6,10 +6,9 @@
 # cannot be turned off. When it burns out it will delete
 # itself.
 #
-# This could be implemented using a single-repeat Script or by
-# registering with the TickerHandler. We do it simpler by
-# using the delay() utility function. This is very simple
-# to use but does not survive a server @reload. Because of
+# The burning is a timed effect (see world/effects.py), so lit
+# lights cost no timer of their own. Like the delay() it
+# replaces, it does not survive a server @reload. Because of
 # where the light matters (in the Dark Room where you can
 # find new light sources easily), this is okay here.
 #
@@ -21,6 +20,7 @@ from evennia.utils import delay
 
 from commands.command import Command
 from typeclasses.base import Object
+from world import effects
 
 
 class CmdLight(Command):
@@ -136,8 +136,14 @@ class LightSource(Object):
                 # we are in a None location
                 pass
         finally:
-            # start the burn timer. When it runs out, self._burnout
-            # will be called. We store the deferred so it can be
-            # killed in unittesting.
-            self.deferred = delay(60 * 3, self._burnout)
+            # start burning. When the effect runs out, self._burnout
+            # will be called.
+            burntime = self.db.burntime or 60 * 3
+            if effects.is_running():
+                effects.apply(self, "burning", duration=burntime)
+            else:
+                # no effects engine (like in unittests); use a timer.
+                # We store the deferred so it can be killed in
+                # unittesting.
+                self.deferred = delay(burntime, self._burnout)
         return True
@@ -0,0 +1,62 @@
+"""
+World API
+
+Read-only JSON views of the world, for maps and status dashboards:
+
+    /api/rooms/             the room graph: {room id: {key, exits}}
+    /api/rooms/<id>/        a room's key, desc, detail names and exits
+    /api/occupancy/         the online characters in each room
+    /api/mobs/              the mobs, where they are and if they live
+
+The views only hand out the snapshots kept by world/snapshots.py, so
+they never touch the database or wait for the game loop. Every response
+has an ETag; ask with If-None-Match to get an empty 304 Not Modified
+while nothing has changed.
+
+"""
+
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.views.decorators.http import require_GET
+
+from world import snapshots
+
+
+def _snapshot_response(request, name):
+    """Respond with a snapshot, or 304 if the client has it already."""
+    snapshot = snapshots.get(name)
+    if snapshot is None:
+        return JsonResponse({"error": "not found"}, status=404)
+    body, etag = snapshot
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH", "")
+    if etag in if_none_match or if_none_match.strip() == "*":
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    # let clients keep it, but always check the ETag first
+    response["Cache-Control"] = "no-cache"
+    return response
+
+
+@require_GET
+def rooms(request):
+    """The room graph."""
+    return _snapshot_response(request, "rooms")
+
+
+@require_GET
+def room_detail(request, room_id):
+    """The details of one room."""
+    return _snapshot_response(request, "room:%s" % room_id)
+
+
+@require_GET
+def occupancy(request):
+    """Who is online where."""
+    return _snapshot_response(request, "occupancy")
+
+
+@require_GET
+def mobs(request):
+    """Where the mobs are."""
+    return _snapshot_response(request, "mobs")
@@ -9,9 +9,15 @@ from django.conf.urls import url, include
 # default evennia patterns
 from evennia.web.urls import urlpatterns
 
+from web import api
+
 # eventual custom patterns
 custom_patterns = [
-    # url(r'/desired/url/', view, name='example'),
+    # read-only JSON views of the world, see web/api.py
+    url(r"^api/rooms/$", api.rooms, name="api-rooms"),
+    url(r"^api/rooms/(?P<room_id>\d+)/$", api.room_detail, name="api-room"),
+    url(r"^api/occupancy/$", api.occupancy, name="api-occupancy"),
+    url(r"^api/mobs/$", api.mobs, name="api-mobs"),
 ]
 
 # this is required by Django.
@@ -0,0 +1,365 @@
+"""
+Balance
+
+An offline tool for checking how the weapons in WEAPON_PROTOTYPES fare
+against the mobs of Druidia. It simulates a large number of duels
+between a player and a mob for every weapon/mob pair, using NumPy to
+run all the duels of a pair at once, and reports how often the player
+wins and how long the kills take.
+
+The duels follow the rules of the game:
+
+ - the player swings every `--pace` seconds, always with the same
+   attack mode. A stab hits with 0.7 x the weapon's hit chance for 2 x
+   its damage; a slash uses both unmodified (see `CmdAttack`).
+ - damage from non-magic weapons is divided by the mob's
+   damage_resistance, and immortal mobs take none (see `Mob.at_hit`).
+ - with `--parry-every N`, every Nth action of the player is a parry
+   instead of an attack. Until the player's next attack, or until the
+   parry wears off after PARRY_DURATION seconds, the mob hits with 0.5 x
+   its chance (see `world.combat.resolve_attack`).
+ - only aggressive mobs attack (see `Mob.start_attacking`). They attack
+   every aggressive_pace seconds with their weapon, using a random
+   attack command like `Mob.do_attack`, starting right away since they
+   attack on arrival. Other mobs never fight back.
+ - the player starts with the health given by the intro room (20).
+
+The weapons are read from the weapon rack prototypes, the mobs either
+from the defaults below or, with --live, from the game database.
+
+This needs NumPy. Run it from the game directory, with the same Python
+environment as the server:
+
+    python -m world.balance --duels 1000000
+    python -m world.balance --live --mode stab --weapons sword,hawkblade
+
+"""
+
+import argparse
+import math
+import os
+import time
+
+import numpy
+
+# the mobs used unless reading them from the database. The defaults
+# are those of Mob.at_object_creation, armed with a Weapon as created;
+# the neighbor is configured by world/01-starting-area.ev.
+DEFAULT_MOBS = {
+    "mob": {
+        "full_health": 20,
+        "damage_resistance": 100.0,
+        "immortal": False,
+        "aggressive": True,
+        "aggressive_pace": 2,
+        "weapon": {"hit": 0.4, "damage": 1.0},
+    },
+    "neighbor": {
+        "full_health": 20,
+        "damage_resistance": 100.0,
+        "immortal": False,
+        "aggressive": False,
+        "aggressive_pace": 2,
+        "weapon": {"hit": 0.7, "damage": 5},
+    },
+}
+# the attack commands a mob picks from, see Mob.do_attack
+MOB_ATTACKS = ("thrust", "pierce", "stab", "slash", "chop")
+# share of mob attacks that are stabs (thrust, pierce and stab)
+MOB_STAB_SHARE = 3 / len(MOB_ATTACKS)
+# player health, see IntroRoom
+PLAYER_HEALTH = 20
+# seconds a parry lasts, see the "parry" effect in world/effects.py
+PARRY_DURATION = 15
+# duels simulated at the same time; this bounds the memory used
+BATCH_SIZE = 20000
+
+
+def weapon_table():
+    """
+    Get the stats of all rack weapons.
+
+    Returns:
+        weapons (dict): {name: {"hit": float, "damage": float,
+            "magic": bool}}, from the flattened weapon prototypes.
+
+    """
+    from typeclasses.weapons.rack import FLAT_WEAPON_PROTOTYPES
+
+    weapons = {}
+    for name, prototype in sorted(FLAT_WEAPON_PROTOTYPES.items()):
+        attrs = {attr[0]: attr[1] for attr in prototype["attrs"]}
+        weapons[name] = {
+            "hit": float(attrs.get("hit", 0)),
+            "damage": float(attrs.get("damage", 0)),
+            "magic": bool(attrs.get("magic")),
+        }
+    return weapons
+
+
+def live_mobs():
+    """
+    Read the configuration of all mobs in the game database.
+
+    Returns:
+        mobs (dict): Like DEFAULT_MOBS, keyed by "key(#dbref)".
+
+    """
+    from evennia.objects.models import ObjectDB
+
+    mobs = {}
+    for mob in ObjectDB.objects.filter(db_typeclass_path="typeclasses.npcs.mob.Mob"):
+        weapon = None
+        for obj in mob.contents:
+            if hasattr(obj, "stats"):
+                weapon = {"hit": obj.stats.hit, "damage": obj.stats.damage}
+                break
+        mobs["%s(%s)" % (mob.key, mob.dbref)] = {
+            "full_health": mob.db.full_health,
+            "damage_resistance": mob.db.damage_resistance,
+            "immortal": bool(mob.db.immortal),
+            "aggressive": bool(mob.db.aggressive),
+            "aggressive_pace": mob.db.aggressive_pace,
+            "weapon": weapon,
+        }
+    return mobs
+
+
+def _first_crossing(damage, threshold):
+    """
+    For each row, find the first column where the summed damage
+    reaches the threshold.
+
+    Returns:
+        index (ndarray): The column, or -1 where it's never reached.
+
+    """
+    reached = numpy.cumsum(damage, axis=1) >= threshold
+    index = reached.argmax(axis=1)
+    index[~reached[:, -1]] = -1
+    return index
+
+
+def _simulate_batch(
+    rng, weapon, mob, mode, count, swings, pace, player_health, parry_every
+):
+    """
+    Simulate `count` duels of at most `swings` player actions.
+
+    Returns:
+        ttk (ndarray): Seconds until the mob died, NaN if the player
+            lost or ran out of swings.
+
+    """
+    if mode == "stab":
+        hit, damage = weapon["hit"] * 0.7, weapon["damage"] * 2
+    else:
+        hit, damage = weapon["hit"], weapon["damage"]
+    if mob["immortal"]:
+        damage = 0.0
+    elif not weapon["magic"]:
+        damage /= mob["damage_resistance"]
+
+    # the player's actions, at 0, pace, 2 * pace ...; every
+    # parry_every-th one is a parry, which never hits
+    actions = numpy.arange(swings)
+    if parry_every:
+        parries = actions % parry_every == parry_every - 1
+    else:
+        parries = numpy.zeros(swings, dtype=bool)
+    hits = (rng.random((count, swings)) <= hit) & ~parries
+    kill = _first_crossing(hits * damage, mob["full_health"])
+    ttk = numpy.where(kill >= 0, kill * pace, numpy.nan)
+
+    mob_weapon = mob["weapon"]
+    if not mob_weapon or not mob["aggressive"]:
+        # only aggressive mobs attack
+        return ttk
+
+    # the mob's attacks, every aggressive_pace seconds until the player
+    # runs out of actions
+    mob_pace = mob["aggressive_pace"]
+    attacks = int(math.ceil(swings * pace / mob_pace)) + 1
+    times = (numpy.arange(attacks) + 1) * mob_pace
+    # an attack is parried if the player's last action before it was a
+    # parry that has not worn off yet; at the same time, the player
+    # acts first
+    last = numpy.minimum((times // pace).astype(int), swings - 1)
+    parried = parries[last] & (times - last * pace < PARRY_DURATION)
+    stabs = rng.random((count, attacks)) < MOB_STAB_SHARE
+    mob_hit = numpy.where(stabs, mob_weapon["hit"] * 0.7, mob_weapon["hit"])
+    mob_hit = mob_hit * numpy.where(parried, 0.5, 1.0)
+    mob_damage = numpy.where(stabs, mob_weapon["damage"] * 2, mob_weapon["damage"])
+    mob_damage = (rng.random((count, attacks)) <= mob_hit) * mob_damage
+    defeat = _first_crossing(mob_damage, player_health)
+    defeated_at = numpy.where(defeat >= 0, times[defeat], numpy.inf)
+
+    # the player lost if defeated before landing the killing blow
+    ttk[defeated_at < ttk] = numpy.nan
+    return ttk
+
+
+def simulate(
+    weapon,
+    mob,
+    mode="slash",
+    duels=100000,
+    swings=300,
+    pace=2.0,
+    player_health=PLAYER_HEALTH,
+    parry_every=0,
+    rng=None,
+):
+    """
+    Simulate duels between a player with the given weapon and a mob.
+
+    Args:
+        weapon (dict): Weapon stats, as from `weapon_table`.
+        mob (dict): Mob configuration, as in DEFAULT_MOBS.
+        mode (str, optional): The player's attack, "stab" or "slash".
+        duels (int, optional): How many duels to simulate.
+        swings (int, optional): Max number of player actions per duel;
+            duels lasting longer count as not won.
+        pace (float, optional): Seconds between player actions.
+        player_health (int, optional): The player's starting health.
+        parry_every (int, optional): Make every this many actions a
+            parry. 0 never parries.
+        rng (numpy.random.Generator, optional): Source of randomness.
+
+    Returns:
+        result (dict): `win_rate` (share of duels where the mob died
+            first), `ttk` (the seconds-to-kill percentiles p10, p50 and
+            p90 of the won duels, NaN if none were won), `swings` (mean
+            number of actions in won duels) and `cpu` (the CPU seconds
+            the simulation took).
+
+    """
+    rng = rng or numpy.random.default_rng()
+    start = time.process_time()
+    ttks = []
+    for offset in range(0, duels, BATCH_SIZE):
+        count = min(BATCH_SIZE, duels - offset)
+        ttks.append(
+            _simulate_batch(
+                rng,
+                weapon,
+                mob,
+                mode,
+                count,
+                swings,
+                pace,
+                player_health,
+                parry_every,
+            )
+        )
+    ttk = numpy.concatenate(ttks)
+    won = ttk[~numpy.isnan(ttk)]
+    if len(won):
+        percentiles = tuple(numpy.percentile(won, (10, 50, 90)))
+        mean_swings = float(won.mean() / pace + 1)
+    else:
+        percentiles = (numpy.nan,) * 3
+        mean_swings = numpy.nan
+    return {
+        "win_rate": len(won) / duels,
+        "ttk": percentiles,
+        "swings": mean_swings,
+        "cpu": time.process_time() - start,
+    }
+
+
+def report(weapons, mobs, mode="slash", **kwargs):
+    """
+    Simulate all weapon/mob pairs and format the results as a table.
+
+    Args:
+        weapons (dict): Weapons to try, as from `weapon_table`.
+        mobs (dict): Mobs to fight, as DEFAULT_MOBS.
+        mode (str, optional): The player's attack, "stab" or "slash".
+        **kwargs: Passed on to `simulate`.
+
+    Returns:
+        table (str): One line per pair.
+
+    """
+    lines = [
+        "%-18s %-18s %6s %8s %8s %8s %7s %7s"
+        % ("weapon", "mob", "win%", "ttk p10", "ttk p50", "ttk p90", "swings", "cpu s")
+    ]
+    for mob_name, mob in mobs.items():
+        for weapon_name, weapon in weapons.items():
+            result = simulate(weapon, mob, mode=mode, **kwargs)
+            lines.append(
+                "%-18s %-18s %6.1f %8.1f %8.1f %8.1f %7.1f %7.2f"
+                % (
+                    weapon_name[:18],
+                    mob_name[:18],
+                    result["win_rate"] * 100,
+                    *result["ttk"],
+                    result["swings"],
+                    result["cpu"],
+                )
+            )
+    return "\n".join(lines)
+
+
+def main():
+    """
+    Run the simulator from the command line.
+    """
+    parser = argparse.ArgumentParser(
+        description="Simulate duels between Druidia weapons and mobs."
+    )
+    parser.add_argument("--duels", type=int, default=100000, help="duels per pair")
+    parser.add_argument("--mode", choices=("slash", "stab"), default="slash")
+    parser.add_argument(
+        "--swings", type=int, default=300, help="max player swings per duel"
+    )
+    parser.add_argument(
+        "--pace", type=float, default=2.0, help="seconds between player swings"
+    )
+    parser.add_argument("--health", type=int, default=PLAYER_HEALTH)
+    parser.add_argument(
+        "--parry-every",
+        type=int,
+        default=0,
+        help="make every Nth player action a parry (0: never parry)",
+    )
+    parser.add_argument("--weapons", help="comma-separated prototype names")
+    parser.add_argument(
+        "--live", action="store_true", help="use the mobs in the game database"
+    )
+    parser.add_argument("--seed", type=int, help="seed, for repeatable runs")
+    args = parser.parse_args()
+
+    # the prototypes and mobs need Django and Evennia set up
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "server.conf.settings")
+    import django
+
+    django.setup()
+    import evennia
+
+    evennia._init()
+
+    weapons = weapon_table()
+    if args.weapons:
+        names = [name.strip().lower() for name in args.weapons.split(",")]
+        weapons = {name: weapons[name] for name in names if name in weapons}
+    mobs = live_mobs() if args.live else DEFAULT_MOBS
+    print(
+        report(
+            weapons,
+            mobs,
+            mode=args.mode,
+            duels=args.duels,
+            swings=args.swings,
+            pace=args.pace,
+            player_health=args.health,
+            parry_every=args.parry_every,
+            rng=numpy.random.default_rng(args.seed),
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+Combat
+
+The rules for resolving attacks, shared by the attack command of
+weapons (see typeclasses/weapons/edged.py) and by combat rounds.
+
+Parrying opens a short window (the "parry" effect, see world/effects.py)
+during which attacks against the parrying combatant are harder to land.
+Stabs with a weapon that has a `bleed` Attribute make the target bleed
+for that much damage every few seconds.
+
+A character brought to 0 health or below is defeated. What happens then
+is up to the attacker's `at_defeat` hook; a mob sends them off to its
+`send_defeated_to` location (see `Mob.at_defeat`).
+
+By default an attack is resolved as soon as the command is given. A
+room can instead be set to use combat rounds:
+
+    @set here/combat_rounds = True
+
+In such a room, stab, slash and parry only declare what a combatant
+will do. Every COMBAT_ROUND_TIME seconds all declared actions are
+resolved together: first the parries, then the attacks in the order
+they were declared. Declaring again within a round replaces the
+earlier declaration, so spamming attacks gains nothing. Everyone in the
+room then gets a single message with everything they saw that round.
+
+"""
+
+import random
+
+from evennia.utils import delay
+
+from world import effects, telemetry, writebehind
+
+# seconds between the resolution of combat rounds
+COMBAT_ROUND_TIME = 3
+
+
+# ------------------------------------------------------------
+#
+# Combat messages
+#
+# ------------------------------------------------------------
+
+
+class DirectReport:
+    """
+    Sends combat messages right away.
+    """
+
+    def __init__(self, location):
+        self.location = location
+
+    def msg(self, receiver, text):
+        """Send text to receiver."""
+        receiver.msg(text)
+
+    def msg_contents(self, text, exclude=None):
+        """Send text to everyone in the location."""
+        if self.location:
+            self.location.msg_contents(text, exclude=exclude)
+
+
+class RoundReport(DirectReport):
+    """
+    Collects the combat messages of a round, to send everyone in the
+    location one message with everything they saw.
+    """
+
+    def __init__(self, location):
+        super().__init__(location)
+        self.lines = {}
+
+    def msg(self, receiver, text):
+        """Add text to what receiver will get."""
+        self.lines.setdefault(receiver, []).append(text)
+
+    def msg_contents(self, text, exclude=None):
+        """Add text to what everyone in the location will get."""
+        exclude = exclude or ()
+        for obj in self.location.contents:
+            if obj not in exclude:
+                self.msg(obj, text)
+
+    def send(self):
+        """Send everyone their part of the report."""
+        for receiver, lines in self.lines.items():
+            receiver.msg("\n".join(lines))
+        self.lines = {}
+
+
+# ------------------------------------------------------------
+#
+# Resolving actions
+#
+# ------------------------------------------------------------
+
+
+def resolve_parry(defender, weapon, report):
+    """
+    Take a defensive stance, making the defender harder to hit by the
+    next attack.
+
+    Args:
+        defender (Object): Who parries.
+        weapon (Weapon): What they parry with.
+        report (DirectReport): Where to send messages.
+
+    """
+    report.msg(
+        defender,
+        "You raise your weapon in a defensive pose, ready to block the next enemy attack.",
+    )
+    effects.apply(defender, "parry")
+    report.msg_contents("%s takes a defensive stance" % defender, exclude=[defender])
+    telemetry.record_attack(defender, None, weapon, "parry")
+
+
+def resolve_attack(attacker, weapon, mode, target, report):
+    """
+    Make an attack and apply the result.
+
+    Args:
+        attacker (Object): Who attacks.
+        weapon (Weapon): What they attack with.
+        mode (str): "stab" (harder to hit, more damage) or "slash".
+        target (Object): Who is attacked.
+        report (DirectReport): Where to send messages.
+
+    """
+    stats = weapon.stats
+    if mode == "stab":
+        hit = float(stats.hit) * 0.7  # modified due to stab
+        damage = stats.damage * 2  # modified due to stab
+        string = "You stab with %s. " % weapon.key
+        tstring = "%s stabs at you with %s. " % (attacker.key, weapon.key)
+        ostring = "%s stabs at %s with %s. " % (attacker.key, target.key, weapon.key)
+    else:
+        hit = float(stats.hit)  # un modified due to slash
+        damage = stats.damage  # un modified due to slash
+        string = "You slash with %s. " % weapon.key
+        tstring = "%s slash at you with %s. " % (attacker.key, weapon.key)
+        ostring = "%s slash at %s with %s. " % (attacker.key, target.key, weapon.key)
+    # attacking ends our own parry window
+    effects.remove(attacker, "parry")
+
+    parried = effects.has(target, "parry")
+    if parried:
+        # target is defensive; even harder to hit!
+        report.msg(target, "|GYou defend, trying to avoid the attack.|n")
+        hit *= 0.5
+
+    roll = random.random()
+    if roll <= hit:
+        report.msg(attacker, string + "|gIt's a hit!|n")
+        report.msg(target, tstring + "|rIt's a hit!|n")
+        report.msg_contents(ostring + "It's a hit!", exclude=[target, attacker])
+
+        if mode == "stab" and stats.bleed:
+            # a weapon made for drawing blood
+            effects.apply(target, "bleed", damage=stats.bleed, source=attacker.id)
+
+        # call enemy hook
+        if hasattr(target, "at_hit"):
+            target.at_hit(weapon, attacker, damage, report=report)
+        elif target.db.health:
+            health = target.db.health - damage
+            writebehind.set_attribute(target, "health", health)
+            if health <= 0:
+                defeat(target, attacker, report)
+        else:
+            # sorry, impossible to fight this enemy ...
+            report.msg(attacker, "The enemy seems unaffected.")
+    else:
+        report.msg(attacker, string + "|rYou miss.|n")
+        report.msg(target, tstring + "|gThey miss you.|n")
+        report.msg_contents(ostring + "They miss.", exclude=[target, attacker])
+    telemetry.record_attack(
+        attacker,
+        target,
+        weapon,
+        mode,
+        hit=hit,
+        roll=roll,
+        damage=damage,
+        parried=parried,
+    )
+
+
+def defeat(target, attacker, report=None):
+    """
+    Handle a character brought to 0 health or below. This is called as
+    soon as the damage is applied, also in the middle of a combat round.
+
+    Args:
+        target (Object): Who was defeated.
+        attacker (Object): Who defeated them. If it has an `at_defeat`
+            hook, that decides what happens to the target.
+        report (DirectReport, optional): Where to send messages. By
+            default they are sent right away.
+
+    """
+    if attacker is not None and hasattr(attacker, "at_defeat"):
+        attacker.at_defeat(target, report=report or DirectReport(target.location))
+
+
+# ------------------------------------------------------------
+#
+# Combat rounds
+#
+# ------------------------------------------------------------
+
+
+class CombatRoundHandler:
+    """
+    Collects the combat actions declared in a room and resolves them
+    once per round. It is made available as `room.combat` and used when
+    the room has the Attribute `combat_rounds` set.
+
+    The declared actions are not persistent; a reload in the middle of
+    a round simply drops them.
+    """
+
+    def __init__(self, room):
+        self.room = room
+        # {combatant: (weapon, mode, target)}, in order of declaration
+        self.actions = {}
+
+    def declare(self, combatant, weapon, mode, target=None):
+        """
+        Declare what a combatant does this round.
+
+        Args:
+            combatant (Object): Who acts.
+            weapon (Weapon): What they act with.
+            mode (str): "stab", "slash" or "parry".
+            target (Object, optional): Who to attack, unless parrying.
+
+        """
+        if not self.actions:
+            # the first action of a round; resolve when the round ends
+            delay(COMBAT_ROUND_TIME, self.resolve_round)
+        self.actions.pop(combatant, None)
+        self.actions[combatant] = (weapon, mode, target)
+        if mode == "parry":
+            combatant.msg("You get ready to parry.")
+        else:
+            combatant.msg("You get ready to %s at %s." % (mode, target.key))
+
+    def resolve_round(self):
+        """
+        Resolve all actions declared this round, parries first, and send
+        everyone present their report of the round.
+        """
+        actions, self.actions = self.actions, {}
+        report = RoundReport(self.room)
+        parries = [item for item in actions.items() if item[1][1] == "parry"]
+        attacks = [item for item in actions.items() if item[1][1] != "parry"]
+        for combatant, (weapon, mode, target) in parries + attacks:
+            if combatant.location != self.room or weapon.location != combatant:
+                # left the room, or dropped the weapon, since declaring
+                continue
+            if mode == "parry":
+                resolve_parry(combatant, weapon, report)
+            elif target.location != self.room:
+                report.msg(combatant, "%s is no longer here." % target.key)
+            else:
+                resolve_attack(combatant, weapon, mode, target, report)
+        report.send()
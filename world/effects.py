@@ -0,0 +1,355 @@
+"""
+Effects
+
+Timed effects on characters, mobs and objects, like the parry window
+after defending, bleeding from a stab or a burning torch. Rather than
+giving every effect its own timer, all effects share one min-heap of
+upcoming events (expiries and ticks), which `process` works through in
+one batch, a few times a second.
+
+Usage:
+
+    from world import effects
+    effects.apply(character, "parry")
+    if effects.has(target, "parry"):
+        ...
+    effects.apply(target, "bleed", damage=1)
+    effects.remove(character, "parry")
+
+The kinds of effect are defined by the Effect classes below and listed
+in EFFECTS. Active effects are only kept in memory. When the server
+stops, the ones marked `persistent` are saved, with their remaining
+time, as a single ServerConfig entry and restored at the next start.
+
+Until `start` is called (from server/conf/at_server_startstop.py),
+effects can be applied and checked, but nothing expires or ticks.
+
+"""
+
+import heapq
+import itertools
+import time
+
+from twisted.internet.task import LoopingCall
+from evennia import logger
+from evennia.objects.models import ObjectDB
+from evennia.server.models import ServerConfig
+
+from world import writebehind
+
+# seconds between runs of `process`
+EFFECTS_RESOLUTION = 0.5
+# the ServerConfig key persistent effects are saved under
+EFFECTS_CONFIG_KEY = "druidia_effects"
+
+
+# ------------------------------------------------------------
+#
+# Effect definitions
+#
+# ------------------------------------------------------------
+
+
+class Effect:
+    """
+    Base class for effects. An effect lasts `duration` seconds and, if
+    `interval` is set, ticks every `interval` seconds until then. Any
+    keywords given to `apply` are kept in the effect's data dict,
+    which is passed to the hooks.
+    """
+
+    key = None
+    duration = 10
+    interval = None
+    # if the effect survives a server restart
+    persistent = True
+
+    def at_apply(self, obj, data):
+        """Called when the effect starts."""
+        pass
+
+    def at_tick(self, obj, data):
+        """
+        Called every `interval` seconds.
+
+        Returns:
+            bool: False to end the effect early.
+
+        """
+        return True
+
+    def at_expire(self, obj, data):
+        """Called when the effect runs out (but not when removed)."""
+        pass
+
+
+class ParryWindow(Effect):
+    """
+    A defensive stance, making the next attack against us harder to
+    land. It ends when we attack or after a while.
+    """
+
+    key = "parry"
+    duration = 15
+    persistent = False
+
+    def at_expire(self, obj, data):
+        obj.msg("You lower your guard.")
+
+
+class Bleeding(Effect):
+    """
+    Loses `damage` health every few seconds. Bleeding to death counts as
+    being defeated by `source`, the id of who caused the wound.
+    """
+
+    key = "bleed"
+    duration = 9
+    interval = 3
+
+    def at_apply(self, obj, data):
+        obj.msg("|rYou are bleeding!|n")
+
+    def at_tick(self, obj, data):
+        health = obj.attributes.get("health")
+        if health is None:
+            return False
+        health -= data.get("damage", 1)
+        writebehind.set_attribute(obj, "health", health)
+        obj.msg("|rYou bleed.|n")
+        if health <= 0:
+            if hasattr(obj, "set_dead"):
+                obj.set_dead()
+            else:
+                from world.combat import defeat
+
+                source = data.get("source")
+                defeat(obj, ObjectDB.objects.get_id(source) if source else None)
+            return False
+        return True
+
+    def at_expire(self, obj, data):
+        obj.msg("The bleeding stops.")
+
+
+class Burning(Effect):
+    """
+    A lit light source, lighting up dark rooms until it burns out.
+    """
+
+    key = "burning"
+    duration = 60 * 3
+    # lights are put out on reload anyway, see LightSource.at_init
+    persistent = False
+
+    def at_expire(self, obj, data):
+        obj._burnout()
+
+
+EFFECTS = {effect.key: effect for effect in (ParryWindow(), Bleeding(), Burning())}
+
+
+# ------------------------------------------------------------
+#
+# The engine
+#
+# ------------------------------------------------------------
+
+
+class _Active:
+    """An effect on an object."""
+
+    __slots__ = ("obj", "effect", "expires", "next_tick", "data")
+
+    def __init__(self, obj, effect, expires, next_tick, data):
+        self.obj = obj
+        self.effect = effect
+        self.expires = expires
+        self.next_tick = next_tick
+        self.data = data
+
+    @property
+    def next_event(self):
+        """When something next happens to this effect."""
+        if self.next_tick is None:
+            return self.expires
+        return min(self.expires, self.next_tick)
+
+
+# {obj id: {effect key: _Active}}
+_ACTIVE = {}
+# heap of (time, sequence, obj id, effect key); entries no longer
+# matching the next_event of their effect are stale and skipped
+_HEAP = []
+_SEQUENCE = itertools.count()
+# the LoopingCall running `process`, when started
+_LOOP = None
+
+
+def _schedule(active):
+    """Queue the next event of an effect."""
+    heapq.heappush(
+        _HEAP,
+        (active.next_event, next(_SEQUENCE), active.obj.id, active.effect.key),
+    )
+
+
+def apply(obj, key, duration=None, **data):
+    """
+    Put an effect on obj. If it already has it, the effect is renewed
+    instead, with the new data added to the old.
+
+    Args:
+        obj (Object): What to affect.
+        key (str): The kind of effect, a key of EFFECTS.
+        duration (float, optional): Seconds until it expires. Defaults
+            to the `duration` of the effect.
+        **data: Effect-specific settings, like `damage` for bleeding.
+
+    """
+    effect = EFFECTS[key]
+    now = time.time()
+    expires = now + (effect.duration if duration is None else duration)
+    effects = _ACTIVE.setdefault(obj.id, {})
+    active = effects.get(key)
+    if active:
+        active.expires = expires
+        active.data.update(data)
+    else:
+        next_tick = now + effect.interval if effect.interval else None
+        active = effects[key] = _Active(obj, effect, expires, next_tick, data)
+        effect.at_apply(obj, active.data)
+    _schedule(active)
+
+
+def _discard(obj_id, key):
+    """Forget an active effect."""
+    effects = _ACTIVE.get(obj_id)
+    if effects and effects.pop(key, None) and not effects:
+        del _ACTIVE[obj_id]
+
+
+def remove(obj, key):
+    """
+    Take an effect off obj, without calling its `at_expire`.
+
+    Args:
+        obj (Object): The affected object.
+        key (str): The kind of effect.
+
+    """
+    _discard(obj.id, key)
+
+
+def has(obj, key):
+    """
+    Check for an effect.
+
+    Args:
+        obj (Object): The object to check.
+        key (str): The kind of effect.
+
+    Returns:
+        bool: If obj has the effect.
+
+    """
+    return key in _ACTIVE.get(obj.id, ())
+
+
+def process(now=None):
+    """
+    Handle all effect events that are due: ticks and expiries. This is
+    run regularly once the engine is started.
+
+    Args:
+        now (float, optional): The time to process up to. Defaults to
+            the current time.
+
+    Returns:
+        count (int): The number of events handled.
+
+    """
+    now = time.time() if now is None else now
+    count = 0
+    while _HEAP and _HEAP[0][0] <= now:
+        when, _, obj_id, key = heapq.heappop(_HEAP)
+        active = _ACTIVE.get(obj_id, {}).get(key)
+        if not active or active.next_event != when:
+            # removed or renewed since this was queued
+            continue
+        count += 1
+        obj, effect = active.obj, active.effect
+        try:
+            if not obj.pk:
+                _discard(obj_id, key)
+                continue
+            if active.next_tick is not None and active.next_tick <= when:
+                active.next_tick += effect.interval
+                if not effect.at_tick(obj, active.data):
+                    _discard(obj_id, key)
+                    continue
+            if active.expires <= when:
+                _discard(obj_id, key)
+                effect.at_expire(obj, active.data)
+            else:
+                _schedule(active)
+        except Exception:
+            logger.log_trace("Druidia effects: error in %s on %s." % (key, obj))
+            _discard(obj_id, key)
+    return count
+
+
+def is_running():
+    """True if effects are being processed."""
+    return _LOOP is not None
+
+
+def start():
+    """
+    Restore saved effects and start processing. This is called at
+    server start.
+    """
+    global _LOOP
+    if _LOOP is not None:
+        return
+    now = time.time()
+    for obj_id, key, remaining, tick_in, data in (
+        ServerConfig.objects.conf(EFFECTS_CONFIG_KEY) or ()
+    ):
+        obj = ObjectDB.objects.get_id(obj_id)
+        effect = EFFECTS.get(key)
+        if obj and effect:
+            next_tick = None if tick_in is None else now + tick_in
+            active = _Active(obj, effect, now + remaining, next_tick, data)
+            _ACTIVE.setdefault(obj_id, {})[key] = active
+            _schedule(active)
+    ServerConfig.objects.conf(EFFECTS_CONFIG_KEY, delete=True)
+    _LOOP = LoopingCall(process)
+    _LOOP.start(EFFECTS_RESOLUTION, now=False)
+
+
+def stop():
+    """
+    Stop processing and save the persistent effects, with the time
+    they have left. This is called when the server stops or reloads.
+    """
+    global _LOOP
+    if _LOOP is not None:
+        if _LOOP.running:
+            _LOOP.stop()
+        _LOOP = None
+    now = time.time()
+    saved = [
+        (
+            obj_id,
+            key,
+            active.expires - now,
+            None if active.next_tick is None else active.next_tick - now,
+            active.data,
+        )
+        for obj_id, effects in _ACTIVE.items()
+        for key, active in effects.items()
+        if active.effect.persistent and active.obj.pk
+    ]
+    if saved:
+        ServerConfig.objects.conf(EFFECTS_CONFIG_KEY, saved)
@@ -0,0 +1,236 @@
+"""
+Instances
+
+The Druidia area built by world/01-starting-area.ev is normally one
+shared copy. This module can create private copies ("instances") of the
+area, for example to give a party the puzzles and rooms to themselves.
+
+The area is made up of all rooms given a `dru#NN` alias by the build
+script. These rooms are the templates. An instance consists of
+
+ - one room per template room, of the same typeclass. The room keeps a
+   reference to its template and reads the desc and details from it,
+   so these large texts are never copied. Other (small) Attributes are
+   copied, since they hold per-room config and puzzle state.
+ - copies of the exits between the template rooms, leading between the
+   instance rooms instead.
+ - copies of the objects in the template rooms (puzzle objects, mobs,
+   weapon racks and so on), which is where the per-instance state lives.
+
+Everything belonging to an instance is tagged with its instance id and
+has an Attribute `instance_id`. Empty instances are deleted by
+`collect_instances`, which is run regularly by the TickerHandler (see
+server/conf/at_server_startstop.py).
+
+Code that looks up objects by name (like the bridge or the teleport
+rooms) should use `instance_search` rather than `search_object`, so that
+an instance finds its own rooms rather than those of the template.
+
+"""
+
+import uuid
+from collections import defaultdict
+
+from django.db import transaction
+from evennia import create_object, search_object, logger
+from evennia.objects.models import ObjectDB
+from evennia.utils.search import search_tag
+
+# rooms with an alias starting with this make up the area
+AREA_ALIAS_PREFIX = "dru#"
+# tag category marking all objects belonging to an instance
+INSTANCE_CATEGORY = "druidia_instance"
+# how often (in seconds) to look for empty instances
+INSTANCE_GC_INTERVAL = 60
+
+# Attributes read from the template rather than copied to the instance
+_SHARED_ATTRIBUTES = ("desc", "details")
+# Attributes that belong to a single room and are never copied
+_LOCAL_ATTRIBUTES = ("interval", "template", "instance_id")
+
+
+def area_rooms():
+    """
+    Get the template rooms of the area.
+
+    Returns:
+        rooms (list): All rooms carrying a `dru#` alias, oldest first.
+
+    """
+    return list(
+        ObjectDB.objects.filter(
+            db_location__isnull=True,
+            db_tags__db_key__startswith=AREA_ALIAS_PREFIX,
+            db_tags__db_tagtype="alias",
+        )
+        .distinct()
+        .order_by("id")
+    )
+
+
+def _instance_aliases(obj):
+    """The aliases of obj, minus the ones identifying the template area."""
+    return [
+        alias for alias in obj.aliases.all() if not alias.startswith(AREA_ALIAS_PREFIX)
+    ]
+
+
+def _mark(obj, instance_id, template):
+    """Flag obj as belonging to the given instance."""
+    obj.db.instance_id = instance_id
+    obj.db.template = template
+    obj.tags.add(instance_id, category=INSTANCE_CATEGORY)
+
+
+def _copy_contents(original, new_location, instance_id, room_map):
+    """
+    Copy the contents of original into new_location, recursively (so a
+    mob's weapon comes along with the mob).
+    """
+    for obj in original.contents:
+        if obj.has_account or obj.destination:
+            # characters are not copied, exits are handled separately
+            continue
+        copy = ObjectDB.objects.copy_object(
+            obj,
+            new_location=new_location,
+            new_home=room_map.get(obj.home, obj.home),
+            new_aliases=_instance_aliases(obj),
+        )
+        _mark(copy, instance_id, obj)
+        _copy_contents(obj, copy, instance_id, room_map)
+        if hasattr(copy, "set_alive") and not copy.db.is_dead:
+            # an active mob; get its copy going too
+            copy.set_alive()
+
+
+def create_instance(party=None, start=None):
+    """
+    Create a new instance of the area.
+
+    Args:
+        party (list, optional): Characters to move into the instance.
+        start (Room, optional): The template room to place the party
+            in. Defaults to the first room of the area (the one built
+            first).
+
+    Returns:
+        instance_id (str): The id of the new instance, or `None` if no
+            area was found.
+
+    """
+    templates = area_rooms()
+    if not templates:
+        return None
+    instance_id = "instance_%s" % uuid.uuid4().hex[:8]
+
+    with transaction.atomic():
+        room_map = {}
+        for template in templates:
+            attributes = [
+                (attr.key, attr.value)
+                for attr in template.attributes.all()
+                if attr.category is None
+                and attr.key not in _SHARED_ATTRIBUTES + _LOCAL_ATTRIBUTES
+            ]
+            room = create_object(
+                template.typeclass_path,
+                key=template.key,
+                aliases=_instance_aliases(template),
+                attributes=attributes,
+                nohome=True,
+            )
+            _mark(room, instance_id, template)
+            room_map[template] = room
+
+        for template, room in room_map.items():
+            for exi in template.exits:
+                copy = ObjectDB.objects.copy_object(
+                    exi,
+                    new_location=room,
+                    new_destination=room_map.get(exi.destination, exi.destination),
+                    new_aliases=_instance_aliases(exi),
+                )
+                _mark(copy, instance_id, exi)
+            _copy_contents(template, room, instance_id, room_map)
+
+    if party:
+        start = room_map.get(start) or room_map[templates[0]]
+        for character in party:
+            character.move_to(start)
+    logger.log_info("Druidia: created %s with %i rooms." % (instance_id, len(room_map)))
+    return instance_id
+
+
+def instance_search(searchdata, obj=None):
+    """
+    Search for an object by name or dbref, preferring results inside the
+    same instance as obj.
+
+    Args:
+        searchdata (str): What to search for.
+        obj (Object, optional): The object doing the search. If this
+            (or its location) belongs to an instance, we look for the
+            instance copy of what is found. Otherwise instance copies
+            are ignored.
+
+    Returns:
+        matches (list): The matching objects, like `search_object`.
+
+    """
+    matches = search_object(searchdata)
+    if not matches:
+        return []
+    instance_id = None
+    if obj:
+        instance_id = obj.tags.get(category=INSTANCE_CATEGORY) or (
+            obj.location and obj.location.tags.get(category=INSTANCE_CATEGORY)
+        )
+    # {id: instance_id} of the matches that are instance copies
+    copied = dict(
+        ObjectDB.objects.filter(
+            id__in=[match.id for match in matches],
+            db_tags__db_category=INSTANCE_CATEGORY,
+        ).values_list("id", "db_tags__db_key")
+    )
+    # things outside of the area are shared by all instances
+    shared = [match for match in matches if match.id not in copied]
+    if not instance_id:
+        return shared
+    local = [match for match in matches if copied.get(match.id) == instance_id]
+    if local or not shared:
+        return local
+    # we found the templates; map them to their copies in this instance,
+    # which have the same keys
+    copies = [
+        copy
+        for copy in ObjectDB.objects.filter(
+            db_key__in=set(match.key for match in shared),
+            db_tags__db_key=instance_id,
+            db_tags__db_category=INSTANCE_CATEGORY,
+        )
+        if copy.db.template in shared
+    ]
+    return copies or shared
+
+
+def collect_instances(*args, **kwargs):
+    """
+    Delete all instances that no longer have any players in them. This
+    is called by the TickerHandler.
+    """
+    instances = defaultdict(list)
+    for obj in search_tag(category=INSTANCE_CATEGORY):
+        instances[obj.db.instance_id].append(obj)
+
+    for instance_id, objs in instances.items():
+        if any(
+            con.has_account for obj in objs if not obj.location for con in obj.contents
+        ):
+            continue
+        # delete rooms last, so their contents are not moved home first
+        objs.sort(key=lambda obj: obj.location is None)
+        for obj in objs:
+            if obj.pk:
+                obj.delete()
+        logger.log_info("Druidia: removed empty %s." % instance_id)
@@ -0,0 +1,276 @@
+"""
+Janitor
+
+Over time a running Druidia collects leftovers that nothing refers to
+anymore:
+
+ - TickerHandler subscriptions of objects that were deleted, or of mobs
+   that have since switched to another AI state.
+ - weapons and light sources that ended up in a `None` location (a
+   burned-out splinter whose delete was interrupted by a reload, a
+   weapon whose holder was deleted and so on).
+ - demo objects of the intro menu that were carried out of the demo
+   area, and per-player demo rooms made by older versions of the menu.
+ - `world` tags on characters, used for puzzle state before the
+   progress record (see world/progress.py) was introduced.
+
+The janitor finds and cleans these up. A pass over everything is split
+into chunks of JANITOR_CHUNK_SIZE checks, one chunk per tick, so even a
+large world never stalls the server. `collect` is called by the
+TickerHandler (see server/conf/at_server_startstop.py) and the builder
+command `@janitor` shows the report of the last pass.
+
+"""
+
+import time
+from collections import Counter
+
+from evennia import TICKER_HANDLER, logger
+from evennia.objects.models import ObjectDB
+from evennia.utils.search import search_tag
+
+# seconds between ticks of the janitor; each tick handles one chunk
+JANITOR_INTERVAL = 10
+# max number of checks to do per tick
+JANITOR_CHUNK_SIZE = 50
+# min number of seconds between the start of two passes
+JANITOR_PASS_INTERVAL = 600
+
+# ticker subscriptions with these idstrings belong to Druidia
+JANITOR_IDSTRINGS = ("druidia", "druidia_mob")
+# objects of these typeclasses are deleted when found without a location
+ORPHAN_TYPECLASSES = (
+    "typeclasses.weapons.edged.Weapon",
+    "typeclasses.widgets.lights.LightSource",
+)
+
+# the pass in progress, if any
+_PASS = None
+# when the last pass was started
+_LAST_START = 0
+# report of the last finished pass, see `last_report`
+_LAST_REPORT = {}
+
+
+# ------------------------------------------------------------
+#
+# Checks
+#
+# Each check takes an item produced by `_items` and returns the
+# name of what it removed, or None if the item was fine.
+#
+# ------------------------------------------------------------
+
+
+def _check_ticker(store_key):
+    """Remove a subscription to a missing object or outdated hook."""
+    subscription = TICKER_HANDLER.ticker_storage.get(store_key)
+    if not subscription:
+        # removed since the pass started
+        return None
+    _, callfunc, path, interval, idstring, _ = store_key
+    if path:
+        # a module function rather than an object method
+        return None
+    obj = subscription[1].get("_obj")
+    if obj and obj.pk and callable(getattr(obj, callfunc, None)):
+        if idstring != "druidia_mob" or (callfunc, interval) == (
+            obj.db.last_hook_key,
+            obj.db.last_ticker_interval,
+        ):
+            return None
+    TICKER_HANDLER.remove(store_key=store_key)
+    return "ticker subscriptions"
+
+
+def _check_orphan(dbid):
+    """Delete an object stranded without a location."""
+    obj = ObjectDB.objects.get_id(dbid)
+    if obj and obj.location is None:
+        obj.delete()
+        return "orphaned objects"
+    return None
+
+
+def _check_demo(dbid):
+    """Return a demo object that was carried off to the demo area."""
+    from typeclasses.menus.intro_menu import _DEMO_TAG, _DEMO_TAG_CATEGORY
+
+    obj = ObjectDB.objects.get_id(dbid)
+    if not obj or obj.location is None or obj.destination:
+        # rooms and exits stay where they are
+        return None
+    location = obj.location
+    if location.tags.get(_DEMO_TAG, category=_DEMO_TAG_CATEGORY) or (
+        location.ndb._menutree
+    ):
+        # in the demo area, or with someone in the menu
+        return None
+    obj.location = obj.home
+    return "demo objects returned"
+
+
+def _check_legacy_demo(dbid):
+    """Remove the per-player demo rooms of someone no longer in the menu."""
+    from typeclasses.menus.intro_menu import _maintain_demo_room
+
+    character = ObjectDB.objects.get_id(dbid)
+    if not character or character.ndb._menutree:
+        return None
+    _maintain_demo_room(character, delete=True)
+    return "old demo rooms"
+
+
+def _check_world_tags(dbid):
+    """Move old `world` tags of a character into its progress record."""
+    character = ObjectDB.objects.get_id(dbid)
+    if not character or not hasattr(character, "progress"):
+        return None
+    for flag in character.tags.get(category="world", return_list=True):
+        character.progress.add(flag)
+    character.tags.clear(category="world")
+    return "world tags converted"
+
+
+def _items():
+    """
+    Generate everything a pass should look at, as (check, item) pairs.
+    Only ids are gathered here; the objects are fetched when checked,
+    so the pass always works on their current state.
+    """
+    from typeclasses.menus.intro_menu import _DEMO_TAG, _DEMO_TAG_CATEGORY
+
+    for store_key in list(TICKER_HANDLER.ticker_storage):
+        if store_key[4] in JANITOR_IDSTRINGS:
+            yield _check_ticker, store_key
+    orphans = ObjectDB.objects.filter(
+        db_location__isnull=True, db_typeclass_path__in=ORPHAN_TYPECLASSES
+    )
+    for dbid in list(orphans.values_list("id", flat=True)):
+        yield _check_orphan, dbid
+    for obj in search_tag(_DEMO_TAG, category=_DEMO_TAG_CATEGORY):
+        yield _check_demo, obj.id
+    legacy = ObjectDB.objects.filter(
+        db_attributes__db_key="tutorial_world_demo_room_data"
+    )
+    for dbid in list(legacy.values_list("id", flat=True)):
+        yield _check_legacy_demo, dbid
+    for obj in search_tag(category="world"):
+        yield _check_world_tags, obj.id
+
+
+# ------------------------------------------------------------
+#
+# Running passes
+#
+# ------------------------------------------------------------
+
+
+def _new_pass():
+    """Start a new pass."""
+    return {
+        "started": time.time(),
+        "finished": None,
+        "items": _items(),
+        "checked": 0,
+        "chunks": 0,
+        "seconds": 0.0,
+        "removed": Counter(),
+    }
+
+
+def _run_chunk(current, size):
+    """
+    Do up to `size` checks of the given pass.
+
+    Returns:
+        done (bool): If the pass is complete.
+
+    """
+    start = time.perf_counter()
+    done = True
+    for check, item in current["items"]:
+        try:
+            removed = check(item)
+        except Exception:
+            logger.log_trace("Druidia janitor: error checking %s." % (item,))
+            removed = None
+        current["checked"] += 1
+        if removed:
+            current["removed"][removed] += 1
+        if current["checked"] % size == 0:
+            done = False
+            break
+    current["chunks"] += 1
+    current["seconds"] += time.perf_counter() - start
+    return done
+
+
+def _finish(current):
+    """Store and log the report of a finished pass."""
+    global _LAST_REPORT
+    current["finished"] = time.time()
+    del current["items"]
+    _LAST_REPORT = current
+    if current["removed"]:
+        logger.log_info(
+            "Druidia janitor: %s (%i checked, %.3fs in %i chunks)."
+            % (
+                ", ".join(
+                    "%i %s" % (num, what) for what, num in current["removed"].items()
+                ),
+                current["checked"],
+                current["seconds"],
+                current["chunks"],
+            )
+        )
+
+
+def collect(*args, **kwargs):
+    """
+    Do the next chunk of the current pass, or start a new pass if it's
+    time for one. This is called by the TickerHandler.
+    """
+    global _PASS, _LAST_START
+    if _PASS is None:
+        if time.time() - _LAST_START < JANITOR_PASS_INTERVAL:
+            return
+        _PASS = _new_pass()
+        _LAST_START = _PASS["started"]
+    if _run_chunk(_PASS, JANITOR_CHUNK_SIZE):
+        _finish(_PASS)
+        _PASS = None
+
+
+def run_pass():
+    """
+    Do a complete pass right away, without chunking. A pass already in
+    progress is dropped and started over.
+
+    Returns:
+        report (dict): The report of the pass, see `last_report`.
+
+    """
+    global _PASS, _LAST_START
+    current = _new_pass()
+    _PASS = None
+    _LAST_START = current["started"]
+    while not _run_chunk(current, JANITOR_CHUNK_SIZE):
+        pass
+    _finish(current)
+    return current
+
+
+def last_report():
+    """
+    Get the report of the last finished pass.
+
+    Returns:
+        report (dict): Empty if no pass was finished yet. Otherwise
+            holds `started` and `finished` (timestamps), `checked` (the
+            number of checks done), `chunks` (the number of ticks used),
+            `seconds` (the processing time spent, over all chunks) and
+            `removed` (a Counter of what was cleaned up).
+
+    """
+    return _LAST_REPORT
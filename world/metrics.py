@@ -0,0 +1,303 @@
+"""
+Metrics
+
+Counters and histograms of how the server is doing, served in the
+Prometheus text format on a local port (see
+server/conf/server_services_plugins.py):
+
+    curl http://127.0.0.1:4010/metrics
+
+Collected are
+
+ - druidia_command_seconds: time to run each command, by command key
+   (commands inheriting from the classes in commands/command.py).
+ - druidia_command_queries: database queries made by each command.
+ - druidia_ticker_seconds: time spent in ticker callbacks, by idstring
+   (callbacks decorated with `timed_ticker`).
+ - druidia_db_queries_total: all database queries of the main thread.
+ - druidia_reactor_lag_seconds: how late the reactor runs a timer set
+   to fire every METRICS_LAG_INTERVAL seconds.
+ - druidia_sessions: the number of connected sessions.
+
+Recording an event is a fixed, small amount of work: a bisect over a
+short tuple of buckets and a few additions, with no allocations once a
+label has been seen. The number of label values per metric is capped
+at METRICS_MAX_LABELS; further values are counted under "other". The
+text for Prometheus is only built when it is asked for.
+
+"""
+
+import time
+from bisect import bisect_left
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
+
+METRICS_PORT = getattr(settings, "DRUIDIA_METRICS_PORT", 4010)
+METRICS_INTERFACE = getattr(settings, "DRUIDIA_METRICS_INTERFACE", "127.0.0.1")
+# most label values kept per metric
+METRICS_MAX_LABELS = 200
+# seconds between reactor lag measurements
+METRICS_LAG_INTERVAL = 1.0
+
+# upper bounds of the histogram buckets, in seconds
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# upper bounds for counts (of database queries)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+# ------------------------------------------------------------
+#
+# Metric types
+#
+# ------------------------------------------------------------
+
+
+def _label(value):
+    """Escape a label value for the text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    """
+    A number that only goes up.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, doc):
+        self.name = name
+        self.doc = doc
+        self.value = 0
+
+    def inc(self, amount=1):
+        """Add to the counter."""
+        self.value += amount
+
+    def lines(self):
+        """The samples, in the text format."""
+        return ["%s %s" % (self.name, self.value)]
+
+
+class Gauge(Counter):
+    """
+    A value read when the metrics are asked for.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, doc, func):
+        super().__init__(name, doc)
+        self.func = func
+
+    def lines(self):
+        """The samples, in the text format."""
+        return ["%s %s" % (self.name, self.func())]
+
+
+class Histogram:
+    """
+    Counts of observed values falling into fixed buckets, per label
+    value.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, doc, label=None, buckets=TIME_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.label = label
+        self.buckets = tuple(buckets)
+        # {label value: [bucket counts..., +Inf count, sum]}
+        self.series = {}
+
+    def observe(self, value, label=None):
+        """
+        Record a value.
+
+        Args:
+            value (float): The value seen.
+            label (str, optional): What it was seen for, like the key
+                of a command.
+
+        """
+        series = self.series.get(label)
+        if series is None:
+            if len(self.series) >= METRICS_MAX_LABELS:
+                label = "other"
+            series = self.series.setdefault(label, [0] * (len(self.buckets) + 2))
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def lines(self):
+        """The samples, in the text format."""
+        lines = []
+        for label, series in sorted(self.series.items(), key=lambda item: str(item[0])):
+            prefix = '%s="%s",' % (self.label, _label(label)) if self.label else ""
+            total = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                total += count
+                lines.append(
+                    '%s_bucket{%sle="%s"} %s' % (self.name, prefix, bound, total)
+                )
+            prefix = "{%s}" % prefix[:-1] if prefix else ""
+            lines.append("%s_sum%s %s" % (self.name, prefix, series[-1]))
+            lines.append("%s_count%s %s" % (self.name, prefix, total))
+        return lines
+
+
+def _session_count():
+    from evennia.server.sessionhandler import SESSION_HANDLER
+
+    return len(SESSION_HANDLER)
+
+
+COMMAND_SECONDS = Histogram(
+    "druidia_command_seconds", "Time to run a command.", label="command"
+)
+COMMAND_QUERIES = Histogram(
+    "druidia_command_queries",
+    "Database queries made by a command.",
+    label="command",
+    buckets=COUNT_BUCKETS,
+)
+TICKER_SECONDS = Histogram(
+    "druidia_ticker_seconds", "Time spent in a ticker callback.", label="idstring"
+)
+DB_QUERIES = Counter("druidia_db_queries_total", "Database queries made.")
+REACTOR_LAG = Histogram(
+    "druidia_reactor_lag_seconds", "How late the reactor runs a timer."
+)
+SESSIONS = Gauge("druidia_sessions", "Connected sessions.", _session_count)
+
+METRICS = (
+    COMMAND_SECONDS,
+    COMMAND_QUERIES,
+    TICKER_SECONDS,
+    DB_QUERIES,
+    REACTOR_LAG,
+    SESSIONS,
+)
+
+
+def render():
+    """
+    Get all metrics in the Prometheus text format.
+
+    Returns:
+        text (str): The metrics.
+
+    """
+    lines = []
+    for metric in METRICS:
+        lines.append("# HELP %s %s" % (metric.name, metric.doc))
+        lines.append("# TYPE %s %s" % (metric.name, metric.kind))
+        lines.extend(metric.lines())
+    return "\n".join(lines) + "\n"
+
+
+# ------------------------------------------------------------
+#
+# Collecting
+#
+# ------------------------------------------------------------
+
+
+def _count_query(execute, sql, params, many, context):
+    """Database execute wrapper, counting every query."""
+    DB_QUERIES.value += 1
+    return execute(sql, params, many, context)
+
+
+def command_started(cmd):
+    """Note the start of a command. Called by its at_pre_cmd."""
+    cmd._metrics_start = (time.perf_counter(), DB_QUERIES.value)
+
+
+def command_finished(cmd):
+    """
+    Record the time and queries of a command. Called by its at_post_cmd.
+
+    Returns:
+        seconds (float or None): How long the command took, or None if
+            its start was not noted.
+
+    """
+    start = getattr(cmd, "_metrics_start", None)
+    if not start:
+        return None
+    seconds = time.perf_counter() - start[0]
+    COMMAND_SECONDS.observe(seconds, cmd.key)
+    COMMAND_QUERIES.observe(DB_QUERIES.value - start[1], cmd.key)
+    cmd._metrics_start = None
+    return seconds
+
+
+def timed_ticker(idstring):
+    """
+    Decorator recording the time a ticker callback takes.
+
+    Args:
+        idstring (str): The idstring the callback is ticked with.
+
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                TICKER_SECONDS.observe(time.perf_counter() - start, idstring)
+
+        return wrapper
+
+    return decorator
+
+
+class _LagMonitor:
+    """Measures how late a regular timer fires."""
+
+    def __init__(self):
+        self.expected = None
+        self.loop = LoopingCall(self.tick)
+
+    def tick(self):
+        now = reactor.seconds()
+        if self.expected is not None:
+            REACTOR_LAG.observe(max(0.0, now - self.expected))
+        self.expected = now + METRICS_LAG_INTERVAL
+
+
+_LAG_MONITOR = None
+
+
+def start():
+    """
+    Start collecting the metrics that need it: queries and reactor lag.
+    This is called by the metrics service at server start.
+    """
+    global _LAG_MONITOR
+    if _LAG_MONITOR is not None:
+        return
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+    _LAG_MONITOR = _LagMonitor()
+    _LAG_MONITOR.loop.start(METRICS_LAG_INTERVAL)
+
+
+def stop():
+    """
+    Stop collecting. This is called when the server stops or reloads.
+    """
+    global _LAG_MONITOR
+    if _count_query in connection.execute_wrappers:
+        connection.execute_wrappers.remove(_count_query)
+    if _LAG_MONITOR is not None:
+        if _LAG_MONITOR.loop.running:
+            _LAG_MONITOR.loop.stop()
+        _LAG_MONITOR = None
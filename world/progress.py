@@ -0,0 +1,250 @@
+"""
+Progress
+
+Druidia used to remember what a character had done in the world through
+a handful of separate Tags and Attributes (climbed_tree, weaponrack_1,
+puzzle_clue, tutorial_bridge_position and so on). Each of those is its
+own database row, and leaving Druidia through the Outro room had to
+delete them one by one.
+
+This module replaces them with a single compact record per character,
+stored in one Attribute. Boolean flags are packed into an integer
+bitset and the few non-boolean values live in a small fixed struct. The
+record is loaded once, kept in memory on the handler and written back
+as a whole, so clearing it is a single write.
+
+Usage:
+
+    caller.progress.add("climbed_tree")
+    if caller.progress.has("climbed_tree"):
+        ...
+    caller.progress.set("bridge_position", 2)
+    position = caller.progress.get("bridge_position")
+    caller.progress.clear()
+
+Flags not listed in PROGRESS_FLAGS (such as the rack_id of a custom
+weapon rack) are still accepted; they are kept in a small tuple next to
+the bitset instead of getting a bit of their own.
+
+"""
+
+from world import writebehind
+
+# the Attribute holding the packed record
+PROGRESS_ATTR = "druidia_progress"
+
+# Attributes that held this state before the progress record; they may
+# still linger on older characters
+LEGACY_ATTRIBUTES = (
+    "last_climbed",
+    "puzzle_clue",
+    "combat_parry_mode",
+    "tutorial_bridge_position",
+)
+
+# The bit position of each flag is its index in this tuple. Only ever
+# append to it - reordering would scramble stored records.
+PROGRESS_FLAGS = (
+    "climbed_tree",
+    "crumbling_wall_found_button",
+    "crumbling_wall_found_exit",
+    "combat_parry_mode",  # no longer used, see world/effects.py
+    "weaponrack_1",
+    "rack_barrel",
+    "rack_sarcophagus",
+)
+
+_FLAG_BITS = {name: 1 << index for index, name in enumerate(PROGRESS_FLAGS)}
+
+
+class ProgressRecord:
+    """
+    The in-memory form of a character's progress.
+
+    Fields:
+        flags (int): Bitset of the flags in PROGRESS_FLAGS.
+        puzzle_clue (int): Index of the obelisk clue last seen.
+        last_climbed (int): Id of the object last climbed.
+        bridge_position (int): Current step (0-4) on the bridge.
+        extra_flags (tuple): Flags without a reserved bit.
+
+    """
+
+    __slots__ = (
+        "flags",
+        "puzzle_clue",
+        "last_climbed",
+        "bridge_position",
+        "extra_flags",
+    )
+
+    # the fields that can be read/written with ProgressHandler.get/set
+    FIELDS = ("puzzle_clue", "last_climbed", "bridge_position")
+
+    def __init__(
+        self,
+        flags=0,
+        puzzle_clue=None,
+        last_climbed=None,
+        bridge_position=None,
+        extra_flags=(),
+    ):
+        self.flags = flags
+        self.puzzle_clue = puzzle_clue
+        self.last_climbed = last_climbed
+        self.bridge_position = bridge_position
+        self.extra_flags = tuple(extra_flags)
+
+    def pack(self):
+        """Returns the record as a plain tuple, suitable for an Attribute."""
+        return (
+            self.flags,
+            self.puzzle_clue,
+            self.last_climbed,
+            self.bridge_position,
+            self.extra_flags,
+        )
+
+    @classmethod
+    def unpack(cls, data):
+        """
+        Re-creates a record from the output of pack().
+
+        Args:
+            data (tuple or None): The stored data. `None` gives an
+                empty record.
+
+        """
+        if not data:
+            return cls()
+        return cls(*data)
+
+    def is_empty(self):
+        """True if nothing at all is stored in this record."""
+        return (
+            not self.flags
+            and not self.extra_flags
+            and all(getattr(self, field) is None for field in self.FIELDS)
+        )
+
+
+class ProgressHandler:
+    """
+    Handler for a character's progress record. It is made available as
+    `obj.progress` on Druidia characters and objects.
+
+    The record is fetched from the database the first time it is
+    needed and then kept in memory. Every change updates the in-memory
+    record and writes the single packed Attribute back.
+
+    """
+
+    def __init__(self, obj):
+        self.obj = obj
+        self._record = None
+
+    def _load(self):
+        """Fetch the record, if we did not already do so."""
+        if self._record is None:
+            self._record = ProgressRecord.unpack(self.obj.attributes.get(PROGRESS_ATTR))
+        return self._record
+
+    def _save(self):
+        """Store the record in its Attribute."""
+        record = self._record
+        if record.is_empty():
+            self.obj.attributes.remove(PROGRESS_ATTR)
+        else:
+            writebehind.set_attribute(self.obj, PROGRESS_ATTR, record.pack())
+
+    def has(self, flag):
+        """
+        Check a flag.
+
+        Args:
+            flag (str): The flag to check.
+
+        Returns:
+            bool: If the flag is set.
+
+        """
+        record = self._load()
+        bit = _FLAG_BITS.get(flag)
+        if bit is None:
+            return flag in record.extra_flags
+        return bool(record.flags & bit)
+
+    def add(self, flag):
+        """
+        Set a flag.
+
+        Args:
+            flag (str): The flag to set.
+
+        """
+        if self.has(flag):
+            return
+        record = self._record
+        bit = _FLAG_BITS.get(flag)
+        if bit is None:
+            record.extra_flags += (flag,)
+        else:
+            record.flags |= bit
+        self._save()
+
+    def remove(self, flag):
+        """
+        Unset a flag.
+
+        Args:
+            flag (str): The flag to unset.
+
+        """
+        if not self.has(flag):
+            return
+        record = self._record
+        bit = _FLAG_BITS.get(flag)
+        if bit is None:
+            record.extra_flags = tuple(
+                extra for extra in record.extra_flags if extra != flag
+            )
+        else:
+            record.flags &= ~bit
+        self._save()
+
+    def get(self, field, default=None):
+        """
+        Get a field of the record.
+
+        Args:
+            field (str): One of ProgressRecord.FIELDS.
+            default (any, optional): Returned if the field is unset.
+
+        """
+        if field not in ProgressRecord.FIELDS:
+            raise KeyError("Unknown progress field '%s'." % field)
+        value = getattr(self._load(), field)
+        return default if value is None else value
+
+    def set(self, field, value):
+        """
+        Set a field of the record.
+
+        Args:
+            field (str): One of ProgressRecord.FIELDS.
+            value (int or None): The new value. `None` unsets it.
+
+        """
+        if field not in ProgressRecord.FIELDS:
+            raise KeyError("Unknown progress field '%s'." % field)
+        record = self._load()
+        if getattr(record, field) != value:
+            setattr(record, field, value)
+            self._save()
+
+    def clear(self):
+        """
+        Forget all progress. This is a single delete of the Attribute.
+        """
+        self._record = ProgressRecord()
+        self.obj.attributes.remove(PROGRESS_ATTR)
@@ -0,0 +1,225 @@
+"""
+Snapshots
+
+Ready-made JSON views of the world for the web API (see web/api.py):
+the room graph with room details, who is online where, and where the
+mobs are. Map and status tools can poll these as often as they like;
+a request only ever reads the last snapshot from memory, never the
+database.
+
+Each kind of snapshot has a version counter, bumped by Django signals
+when something it shows changes:
+
+    rooms       a room or exit is created, changed or deleted, or a
+                desc/details Attribute is saved
+    occupancy   a character is saved (which includes moving it)
+    mobs        a mob is saved or deleted, or changes is_dead
+
+Every SNAPSHOT_INTERVAL the snapshots with a new version are rebuilt,
+so a burst of changes means at most one rebuild per interval. Each
+snapshot is stored as its encoded JSON with an ETag from its content,
+so a rebuild that changes nothing keeps the old ETag. Clients can ask
+with If-None-Match and get 304 Not Modified until something actually
+changed.
+
+"""
+
+import hashlib
+import json
+
+from django.db.models.signals import post_delete, post_save
+from twisted.internet.task import LoopingCall
+from evennia import DefaultCharacter, DefaultExit, DefaultRoom, logger
+from evennia.objects.models import ObjectDB
+from evennia.typeclasses.attributes import Attribute
+
+# seconds between checks for snapshots to rebuild
+SNAPSHOT_INTERVAL = 2.0
+
+SNAPSHOT_KINDS = ("rooms", "occupancy", "mobs")
+
+_VERSIONS = dict.fromkeys(SNAPSHOT_KINDS, 1)
+# the version each kind was last built from
+_BUILT = dict.fromkeys(SNAPSHOT_KINDS, 0)
+# {name: (body, etag)}; "rooms", "occupancy", "mobs" and "room:<id>"
+_SNAPSHOTS = {}
+# the LoopingCall running `update`, when started
+_LOOP = None
+
+
+# ------------------------------------------------------------
+#
+# Versions
+#
+# ------------------------------------------------------------
+
+
+def _kind(obj):
+    """What snapshot an object is shown in, if any."""
+    from typeclasses.npcs.mob import Mob
+
+    if isinstance(obj, (DefaultRoom, DefaultExit)):
+        return "rooms"
+    if isinstance(obj, Mob):
+        return "mobs"
+    if isinstance(obj, DefaultCharacter):
+        return "occupancy"
+    return None
+
+
+def _changed(sender, instance, raw=False, **kwargs):
+    """Bump the version of the snapshot showing what changed."""
+    if raw:
+        return
+    if isinstance(instance, ObjectDB):
+        kind = _kind(instance)
+    elif isinstance(instance, Attribute):
+        kind = {"desc": "rooms", "details": "rooms", "is_dead": "mobs"}.get(
+            instance.db_key
+        )
+    else:
+        return
+    if kind:
+        _VERSIONS[kind] += 1
+
+
+# rooms, mobs and their Attributes are saved under many sender classes
+# (one per typeclass), so the snapshots listen to every save and delete
+post_save.connect(_changed, dispatch_uid="druidia_snapshots_saved")
+post_delete.connect(_changed, dispatch_uid="druidia_snapshots_deleted")
+
+
+# ------------------------------------------------------------
+#
+# Building
+#
+# ------------------------------------------------------------
+
+
+def _store(name, data):
+    """Encode a snapshot and give it an ETag."""
+    body = json.dumps(data, sort_keys=True).encode("utf-8")
+    _SNAPSHOTS[name] = (body, '"%s"' % hashlib.sha1(body).hexdigest()[:20])
+
+
+def _exits(room):
+    return [
+        {"key": exi.key, "destination": exi.destination.id if exi.destination else None}
+        for exi in room.exits
+    ]
+
+
+def _build_rooms():
+    graph = {}
+    # the room snapshots from before, to find those of deleted rooms
+    names = {name for name in _SNAPSHOTS if name.startswith("room:")}
+    for room in DefaultRoom.objects.all_family():
+        exits = _exits(room)
+        graph[str(room.id)] = {"key": room.key, "exits": exits}
+        desc = room.get_desc() if hasattr(room, "get_desc") else room.db.desc
+        details = room.db.details or {}
+        if not details and room.db.template:
+            details = room.db.template.db.details or {}
+        _store(
+            "room:%s" % room.id,
+            {
+                "id": room.id,
+                "key": room.key,
+                "desc": desc,
+                "details": sorted(details),
+                "exits": exits,
+            },
+        )
+        names.discard("room:%s" % room.id)
+    for name in names:
+        # deleted rooms
+        del _SNAPSHOTS[name]
+    _store("rooms", {"rooms": graph})
+
+
+def _build_occupancy():
+    from evennia.server.sessionhandler import SESSION_HANDLER
+
+    rooms = {}
+    for session in SESSION_HANDLER.values():
+        puppet = session.puppet
+        if puppet and puppet.location:
+            rooms.setdefault(str(puppet.location.id), set()).add(puppet.key)
+    _store("occupancy", {room: sorted(keys) for room, keys in rooms.items()})
+
+
+def _build_mobs():
+    from typeclasses.npcs.mob import Mob
+
+    mobs = [
+        {
+            "id": mob.id,
+            "key": mob.key,
+            "location": mob.location.id if mob.location else None,
+            "alive": not mob.db.is_dead,
+        }
+        for mob in Mob.objects.all_family()
+    ]
+    _store("mobs", {"mobs": mobs})
+
+
+_BUILDERS = {
+    "rooms": _build_rooms,
+    "occupancy": _build_occupancy,
+    "mobs": _build_mobs,
+}
+
+
+def update():
+    """
+    Rebuild the snapshots whose version changed. This is run every
+    SNAPSHOT_INTERVAL once started.
+    """
+    for kind in SNAPSHOT_KINDS:
+        version = _VERSIONS[kind]
+        if _BUILT[kind] != version:
+            try:
+                _BUILDERS[kind]()
+            except Exception:
+                logger.log_trace("Druidia snapshots: could not build %s." % kind)
+            _BUILT[kind] = version
+
+
+def get(name):
+    """
+    Get a snapshot. This only reads memory, so it is safe to call from
+    the web server's threads.
+
+    Args:
+        name (str): "rooms", "occupancy", "mobs" or "room:<id>".
+
+    Returns:
+        snapshot (tuple or None): (body, etag), the JSON-encoded
+            snapshot and its ETag, or None if there is no such snapshot
+            (yet).
+
+    """
+    return _SNAPSHOTS.get(name)
+
+
+def start():
+    """
+    Build the snapshots and keep them current. This is called at server
+    start.
+    """
+    global _LOOP
+    if _LOOP is None:
+        _LOOP = LoopingCall(update)
+        _LOOP.start(SNAPSHOT_INTERVAL)
+
+
+def stop():
+    """
+    Stop updating the snapshots. This is called when the server stops
+    or reloads.
+    """
+    global _LOOP
+    if _LOOP is not None:
+        if _LOOP.running:
+            _LOOP.stop()
+        _LOOP = None
@@ -0,0 +1,391 @@
+"""
+Spawning
+
+Evennia's spawner resolves the `prototype_parent` chain of a prototype
+and validates it every time something is spawned from it. For the
+prototypes we spawn during play (like the weapons handed out by the
+weapon racks), this module instead does that work once, when the
+prototypes are loaded:
+
+    FLAT_PROTOTYPES, ERRORS = flatten_prototypes(PROTOTYPES)
+    obj = spawn_prototype(FLAT_PROTOTYPES["sword"])
+
+A flattened prototype has all inheritance resolved and its Attributes
+collected into a single list, so spawning from it is a single
+`create_object` call. To populate an area with many objects at once,
+use `spawn_many`, which creates them all in a single transaction and
+writes their Attributes and tags in bulk. A single prototype can be
+flattened on its own with `flatten_prototype`:
+
+    goblin = flatten_prototype(GOBLIN, prototype_parents=MOB_PROTOTYPES)
+    goblins = spawn_many(goblin, 200, locations=rooms)
+
+Only what our prototypes use is supported: typeclass, key, aliases,
+locks, tags, attrs and plain Attribute keywords. Values may be callables
+(called for every object spawned); $protfuncs are not evaluated here and
+need the normal spawner.
+
+"""
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.db.models.signals import post_save
+from evennia import create_object
+from evennia.objects.models import ObjectDB
+from evennia.typeclasses.attributes import Attribute
+from evennia.utils.dbserialize import to_pickle
+from evennia.utils.utils import class_from_module, make_iter
+
+# the tag category the spawner uses to mark what prototype made an object
+PROTOTYPE_TAG_CATEGORY = "from_prototype"
+
+# prototype keys that are not Attributes
+_RESERVED_KEYS = (
+    "prototype_key",
+    "prototype_parent",
+    "prototype_desc",
+    "prototype_tags",
+    "prototype_locks",
+    "typeclass",
+    "key",
+    "aliases",
+    "locks",
+    "tags",
+    "attrs",
+    "location",
+    "home",
+    "destination",
+    "permissions",
+)
+
+
+def _resolve(name, prototypes, chain):
+    """
+    Merge a prototype with all its parents. Later parents override
+    earlier ones and the prototype itself overrides them all, like in
+    the spawner.
+
+    Args:
+        name (str): The (lower-case) name of the prototype.
+        prototypes (dict): All prototypes, keyed by lower-case name.
+        chain (tuple): The names seen so far, to catch loops.
+
+    Returns:
+        merged (dict): The merged prototype, with `attrs` and `tags`
+            given as dicts keyed by Attribute name / tag.
+
+    Raises:
+        ValueError: If a parent is missing or inherits from itself.
+
+    """
+    if name in chain:
+        raise ValueError("prototype_parent loop: %s" % " -> ".join(chain + (name,)))
+    if name not in prototypes:
+        raise ValueError("unknown prototype_parent '%s'" % name)
+    prototype = prototypes[name]
+    merged = {"attrs": {}, "tags": {}}
+    for parent in make_iter(prototype.get("prototype_parent", ())):
+        parent = _resolve(parent.lower(), prototypes, chain + (name,))
+        merged["attrs"].update(parent.pop("attrs"))
+        merged["tags"].update(parent.pop("tags"))
+        merged.update(parent)
+
+    for key, value in prototype.items():
+        if key == "attrs":
+            for attr in value:
+                merged["attrs"][attr[0]] = tuple(attr)
+        elif key == "tags":
+            for tag in value:
+                tag = tuple(make_iter(tag))
+                merged["tags"][tag[:2]] = tag
+        elif key in _RESERVED_KEYS:
+            merged[key] = value
+        else:
+            merged["attrs"][key] = (key, value)
+    merged.pop("prototype_parent", None)
+    return merged
+
+
+def flatten_prototypes(prototypes):
+    """
+    Resolve the inheritance of a set of prototypes and check them.
+
+    Args:
+        prototypes (dict): Prototypes keyed by name, as used with the
+            `prototype_parents` argument of `spawn`.
+
+    Returns:
+        flat (dict): The usable prototypes, keyed by lower-case name.
+            Each is a dict with the keys `prototype_key`, `typeclass`,
+            `key`, `aliases`, `locks`, `tags` and `attrs` (a list of
+            Attribute tuples).
+        errors (list): One message for each prototype that could not
+            be used. These are left out of `flat`.
+
+    """
+    prototypes = {name.lower(): prototype for name, prototype in prototypes.items()}
+    flat, errors = {}, []
+    for name in prototypes:
+        try:
+            merged = _resolve(name, prototypes, ())
+            typeclass = merged.get("typeclass", settings.BASE_OBJECT_TYPECLASS)
+            class_from_module(typeclass)
+        except Exception as err:
+            errors.append("Prototype '%s': %s" % (name, err))
+            continue
+        prototype_key = merged.get("prototype_key", name)
+        tags = dict(merged["tags"])
+        tags[(prototype_key, PROTOTYPE_TAG_CATEGORY)] = (
+            prototype_key,
+            PROTOTYPE_TAG_CATEGORY,
+        )
+        flat[name] = {
+            "prototype_key": prototype_key,
+            "typeclass": typeclass,
+            "key": merged.get("key", "Spawned Object"),
+            "aliases": list(make_iter(merged.get("aliases", []))),
+            "locks": merged.get("locks"),
+            "tags": list(tags.values()),
+            "attrs": list(merged["attrs"].values()),
+        }
+    return flat, errors
+
+
+def flatten_prototype(prototype, prototype_parents=None):
+    """
+    Flatten a single prototype, see `flatten_prototypes`.
+
+    Args:
+        prototype (dict): A normal prototype dict.
+        prototype_parents (dict, optional): Prototypes it may inherit
+            from, keyed by name.
+
+    Returns:
+        flat (dict): The flattened prototype.
+
+    Raises:
+        ValueError: If the prototype could not be flattened.
+
+    """
+    prototypes = dict(prototype_parents or {})
+    name = prototype.get("prototype_key", "_flatten_prototype")
+    prototypes[name] = prototype
+    flat, errors = flatten_prototypes(prototypes)
+    if name.lower() not in flat:
+        raise ValueError("; ".join(errors))
+    return flat[name.lower()]
+
+
+def _value(value):
+    """Values given as callables are evaluated for each spawned object."""
+    return value() if callable(value) else value
+
+
+def spawn_prototype(prototype, location=None, home=None):
+    """
+    Create an object from a flattened prototype.
+
+    Args:
+        prototype (dict): A prototype from `flatten_prototypes`.
+        location (Object, optional): Where to put the new object.
+        home (Object, optional): The home of the new object.
+
+    Returns:
+        obj (Object): The new object.
+
+    """
+    return create_object(
+        prototype["typeclass"],
+        key=_value(prototype["key"]),
+        location=location,
+        home=home,
+        aliases=prototype["aliases"],
+        locks=prototype["locks"],
+        tags=prototype["tags"],
+        attributes=[
+            (attr[0], _value(attr[1])) + tuple(attr[2:]) for attr in prototype["attrs"]
+        ],
+    )
+
+
+# ------------------------------------------------------------
+#
+# Bulk writes
+#
+# ------------------------------------------------------------
+
+
+def _bulk_insert(model, rows):
+    """
+    Insert rows with one query and give them their primary keys.
+
+    Databases that don't report the keys of bulk-inserted rows (SQLite
+    and MySQL) leave them unset, so the new rows are read back: this
+    runs inside the spawning transaction, which already holds the write
+    lock, so the rows above the highest id from before the insert are
+    ours, numbered in the order inserted. If others show up anyway, the
+    transaction is rolled back rather than guessing.
+    """
+    if not rows:
+        return
+    features = connection.features
+    returns_ids = getattr(
+        features, "can_return_rows_from_bulk_insert", False
+    ) or getattr(features, "can_return_ids_from_bulk_insert", False)
+    top = None if returns_ids else model.objects.aggregate(top=Max("id"))["top"]
+    model.objects.bulk_create(rows)
+    if rows[0].pk is not None:
+        return
+    ids = list(
+        model.objects.filter(id__gt=top or 0)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    if len(ids) != len(rows):
+        raise RuntimeError(
+            "Expected %i new %s rows, found %i." % (len(rows), model.__name__, len(ids))
+        )
+    for row, dbid in zip(rows, ids):
+        row.id = dbid
+
+
+def _bulk_tags(objs, prototype):
+    """
+    Tag all objs with the tags and aliases of the prototype. Tags are
+    shared rows, so there is one lookup per distinct tag and a single
+    insert of all links.
+    """
+    tags = {}
+    for tag in prototype["tags"]:
+        key, category, *data = tuple(make_iter(tag)) + (None,)
+        category = str(category).strip().lower() if category else None
+        tag = ObjectDB.objects.create_tag(
+            str(key).strip().lower(), category, data[0] if data else None
+        )
+        tags[tag.id] = tag
+    for alias in prototype["aliases"]:
+        tag = ObjectDB.objects.create_tag(str(alias).strip().lower(), tagtype="alias")
+        tags[tag.id] = tag
+    if not tags:
+        return
+    through = ObjectDB.db_tags.through
+    linked = set(
+        through.objects.filter(
+            objectdb_id__in=[obj.id for obj in objs],
+            tag_id__in=list(tags),
+        ).values_list("objectdb_id", "tag_id")
+    )
+    through.objects.bulk_create(
+        [
+            through(objectdb_id=obj.id, tag_id=tag.id)
+            for obj in objs
+            for tag in tags.values()
+            if (obj.id, tag.id) not in linked
+        ]
+    )
+    for obj in objs:
+        obj.tags.reset_cache()
+        obj.aliases.reset_cache()
+
+
+def _bulk_attributes(objs, prototype):
+    """
+    Add the Attributes of the prototype to all objs, with one insert for
+    the Attributes and one for their links. Attributes the creation
+    hooks already set (like a Weapon's default `hit`) are updated
+    instead, all in one go.
+
+    Bulk writes don't send signals, so post_save is sent for every
+    Attribute afterwards, for the caches that listen to it.
+    """
+    if not prototype["attrs"]:
+        return
+    specs = []
+    for attr in prototype["attrs"]:
+        category = attr[2] if len(attr) > 2 else None
+        category = category.strip().lower() if category else None
+        lockstring = attr[3] if len(attr) > 3 else ""
+        specs.append((attr[0].strip().lower(), category, attr[1], lockstring))
+
+    through = ObjectDB.db_attributes.through
+    existing = {}
+    for conn in through.objects.filter(
+        objectdb_id__in=[obj.id for obj in objs],
+        attribute__db_attrtype=None,
+        attribute__db_key__in=[spec[0] for spec in specs],
+    ).select_related("attribute"):
+        attr = conn.attribute
+        category = attr.db_category.lower() if attr.db_category else None
+        existing[(conn.objectdb_id, attr.db_key.lower(), category)] = attr
+
+    changed, created, links = [], [], []
+    for obj in objs:
+        for key, category, value, lockstring in specs:
+            attr = existing.get((obj.id, key, category))
+            if attr:
+                attr.db_value = to_pickle(_value(value))
+                changed.append(attr)
+            else:
+                attr = Attribute(
+                    db_key=key,
+                    db_category=category,
+                    db_value=to_pickle(_value(value)),
+                    db_lock_storage=lockstring or "",
+                    db_model="objectdb",
+                    db_attrtype=None,
+                )
+                created.append(attr)
+                links.append((obj, attr))
+    if changed:
+        Attribute.objects.bulk_update(changed, ["db_value"])
+    _bulk_insert(Attribute, created)
+    through.objects.bulk_create(
+        [through(objectdb_id=obj.id, attribute_id=attr.id) for obj, attr in links]
+    )
+    for obj in objs:
+        obj.attributes.reset_cache()
+    for attrs, new in ((changed, False), (created, True)):
+        for attr in attrs:
+            post_save.send(sender=Attribute, instance=attr, created=new, raw=False)
+
+
+def spawn_many(prototype, count, locations=None):
+    """
+    Create many objects from the same prototype.
+
+    All objects are created inside one database transaction, which is
+    committed once at the end instead of after every single write, and
+    the prototype is only resolved once. Each object is still created
+    with `create_object`, so its typeclass creation hooks run, but the
+    prototype's Attributes and tags are then written for all objects
+    together, with a few bulk queries instead of several per object.
+    If anything fails, none of the objects are created.
+
+    Args:
+        prototype (dict): A prototype from `flatten_prototypes` or
+            `flatten_prototype`.
+        count (int): How many objects to create.
+        locations (Object or list, optional): Where to put the objects.
+            With a list, the objects are spread out over the locations
+            in turn.
+
+    Returns:
+        objs (list): The new objects.
+
+    """
+    locations = make_iter(locations) if locations else [None]
+
+    with transaction.atomic():
+        objs = [
+            create_object(
+                prototype["typeclass"],
+                key=_value(prototype["key"]),
+                location=locations[num % len(locations)],
+                locks=prototype["locks"],
+            )
+            for num in range(count)
+        ]
+        _bulk_tags(objs, prototype)
+        _bulk_attributes(objs, prototype)
+    return objs
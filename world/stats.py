@@ -0,0 +1,181 @@
+"""
+Stats
+
+Running counts of what the Druidia world is made of: rooms, exits,
+mobiles, other objects, areas and help entries. They are used for the
+MSSP information given to MUD listing crawlers (see server/conf/mssp.py)
+and shown by the @stats command.
+
+Counting objects on every request would mean scanning the object table,
+so instead the counts are kept in memory. They are recounted with a
+single grouped query when the server starts and then once an hour, and
+kept up to date in between by adding and subtracting as objects are
+created and deleted. Reading them is a dict lookup.
+
+MSSP is answered by the Portal, which has no access to the game
+database, so every STATS_INTERVAL the counts are also written (if they
+changed) to `settings.DRUIDIA_STATS_FILE`, where mssp.py reads them.
+
+"""
+
+import json
+import os
+import time
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.signals import post_delete, post_save
+from evennia import DefaultCharacter, DefaultExit, DefaultRoom, logger
+from evennia.help.models import HelpEntry
+from evennia.objects.models import ObjectDB
+from evennia.utils.utils import class_from_module
+
+from world.instances import INSTANCE_CATEGORY
+
+# seconds between writes of the counts for the Portal
+STATS_INTERVAL = 60
+# seconds between full recounts, correcting any drift
+STATS_RECOUNT_INTERVAL = 60 * 60
+# where the counts are written for the Portal
+STATS_FILE = settings.DRUIDIA_STATS_FILE
+
+# what is counted; objects are sorted into the first four by typeclass
+STATS_KEYS = ("rooms", "exits", "mobiles", "objects", "areas", "helpfiles")
+
+_COUNTS = dict.fromkeys(STATS_KEYS, 0)
+# {"recounted": time, "drift": corrected difference, "written": time}
+_INFO = {"recounted": None, "drift": 0, "written": None}
+# the counts as last written to STATS_FILE
+_WRITTEN = {}
+# {typeclass path: key in STATS_KEYS, or None for uncounted ones}
+_KINDS = {}
+
+
+def _kind(typeclass_path):
+    """
+    Get what an object counts as, from its typeclass. Characters are
+    not counted here; MSSP gets the number of players from Evennia.
+    """
+    if typeclass_path not in _KINDS:
+        from typeclasses.npcs.mob import Mob
+
+        try:
+            typeclass = class_from_module(typeclass_path)
+        except ImportError:
+            kind = "objects"
+        else:
+            if issubclass(typeclass, DefaultRoom):
+                kind = "rooms"
+            elif issubclass(typeclass, DefaultExit):
+                kind = "exits"
+            elif issubclass(typeclass, Mob):
+                kind = "mobiles"
+            elif issubclass(typeclass, DefaultCharacter):
+                kind = None
+            else:
+                kind = "objects"
+        _KINDS[typeclass_path] = kind
+    return _KINDS[typeclass_path]
+
+
+def _object_saved(sender, instance, created=False, raw=False, **kwargs):
+    """Count a new object."""
+    if created and not raw and isinstance(instance, ObjectDB):
+        kind = _kind(instance.db_typeclass_path)
+        if kind:
+            _COUNTS[kind] += 1
+
+
+def _object_deleted(sender, instance, **kwargs):
+    """Stop counting a deleted object."""
+    if isinstance(instance, ObjectDB):
+        kind = _kind(instance.db_typeclass_path)
+        if kind:
+            _COUNTS[kind] -= 1
+
+
+# objects are created and deleted as their typeclass, so the sender
+# varies; listen to all and pick out the objects in the handlers
+post_save.connect(_object_saved, dispatch_uid="druidia_stats_saved")
+post_delete.connect(_object_deleted, dispatch_uid="druidia_stats_deleted")
+
+
+def recount():
+    """
+    Count everything from scratch, with one grouped query for all
+    objects.
+    """
+    counts = dict.fromkeys(STATS_KEYS, 0)
+    for row in ObjectDB.objects.values("db_typeclass_path").annotate(num=Count("id")):
+        kind = _kind(row["db_typeclass_path"])
+        if kind:
+            counts[kind] += row["num"]
+    # the shared area, and any instances of it (see world/instances.py).
+    # Tags are never deleted, so only count those still in use.
+    counts["areas"] = (
+        1
+        + ObjectDB.objects.filter(db_tags__db_category=INSTANCE_CATEGORY)
+        .values("db_tags__db_key")
+        .distinct()
+        .count()
+    )
+    counts["helpfiles"] = HelpEntry.objects.count()
+    if _INFO["recounted"]:
+        _INFO["drift"] = sum(abs(counts[key] - _COUNTS[key]) for key in STATS_KEYS)
+    _COUNTS.update(counts)
+    _INFO["recounted"] = time.time()
+
+
+def snapshot():
+    """
+    Get the current counts.
+
+    Returns:
+        counts (dict): A copy of the counts, keyed by STATS_KEYS.
+
+    """
+    return dict(_COUNTS)
+
+
+def info():
+    """
+    Get how current the counts are.
+
+    Returns:
+        info (dict): `recounted` and `written` (times of the last full
+            recount and write for the Portal, or None) and `drift` (how
+            far off the running counts were at the last recount).
+
+    """
+    return dict(_INFO)
+
+
+def _write():
+    """Write the counts for the Portal, if they changed."""
+    if _COUNTS == _WRITTEN:
+        return
+    os.makedirs(os.path.dirname(STATS_FILE), exist_ok=True)
+    # write and rename, so the Portal never reads a half-written file
+    with open(STATS_FILE + ".tmp", "w") as fil:
+        json.dump(_COUNTS, fil)
+    os.replace(STATS_FILE + ".tmp", STATS_FILE)
+    _WRITTEN.clear()
+    _WRITTEN.update(_COUNTS)
+    _INFO["written"] = time.time()
+
+
+def update(*args, **kwargs):
+    """
+    Recount if it's time, and pass the counts on to the Portal. This is
+    called every STATS_INTERVAL by the TickerHandler (see
+    server/conf/at_server_startstop.py).
+    """
+    try:
+        if (
+            not _INFO["recounted"]
+            or time.time() - _INFO["recounted"] >= STATS_RECOUNT_INTERVAL
+        ):
+            recount()
+        _write()
+    except Exception:
+        logger.log_trace("Druidia stats: could not update the counts.")
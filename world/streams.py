@@ -0,0 +1,245 @@
+"""
+Streams
+
+State pushed to clients that ask for it, so they don't have to parse
+text or poll with `look` to keep a status display up to date. A client
+subscribes to a stream with an OOB/GMCP command of the same name (see
+server/conf/inputfuncs.py):
+
+    Room.Info       the room's id, name and exits, and the position on
+                    the bridge while crossing it
+    Char.Vitals     health and max health
+    Room.Players    the other player characters in the room, {id: name}
+
+On subscribing, the client gets the full state. After that, it only
+gets deltas: the keys whose values changed, with removed keys set to
+null. The changes are collected and sent once per STREAM_INTERVAL, so
+a burst of changes (a round of combat, say) becomes one message per
+session.
+
+Health is changed in many places, some of them deliberately bypassing
+the normal Attribute saving (see world/writebehind.py), so rather than
+hooking every one of them, each interval compares the state of every
+subscription with what was last sent. This only reads values already
+cached in memory, and only for sessions that have subscribed.
+
+Subscriptions survive a reload: they are saved when the server stops
+for a reload and picked up again as the sessions reconnect. They are
+not kept over a shutdown, since session ids start over after it.
+
+"""
+
+import time
+
+from twisted.internet.task import LoopingCall
+from evennia import logger
+from evennia.server.models import ServerConfig
+from evennia.server.sessionhandler import SESSION_HANDLER
+
+# seconds between checks for changes; changes within one interval are
+# sent together
+STREAM_INTERVAL = 1.0
+# the ServerConfig key subscriptions are saved under over a reload
+STREAMS_CONFIG_KEY = "druidia_streams"
+# seconds to wait for sessions to come back after a reload
+STREAMS_RESTORE_TIMEOUT = 60
+
+# {sessid: {stream: last sent state}}
+_SUBSCRIPTIONS = {}
+# saved subscriptions of sessions not yet back, {sessid: [stream, ...]}
+_PENDING = {}
+_PENDING_UNTIL = 0
+# the LoopingCall running `process`, when started
+_LOOP = None
+
+
+# ------------------------------------------------------------
+#
+# Stream states
+#
+# ------------------------------------------------------------
+
+
+def _room_info(character):
+    location = character.location
+    if not location:
+        return {}
+    return {
+        "id": location.id,
+        "name": location.key,
+        "exits": sorted(exi.key for exi in location.exits),
+        "bridge_position": (
+            character.progress.get("bridge_position")
+            if hasattr(character, "progress")
+            else None
+        ),
+    }
+
+
+def _char_vitals(character):
+    return {
+        "health": character.attributes.get("health"),
+        "health_max": character.attributes.get("health_max"),
+    }
+
+
+def _room_players(character):
+    location = character.location
+    if not location:
+        return {}
+    return {
+        str(obj.id): obj.key
+        for obj in location.contents
+        if obj != character and obj.has_account
+    }
+
+
+# the streams, and how to get their state for a puppeted character
+STREAMS = {
+    "room_info": _room_info,
+    "char_vitals": _char_vitals,
+    "room_players": _room_players,
+}
+
+
+def _state(session, stream):
+    """The current state of a stream for a session."""
+    character = session.puppet
+    return STREAMS[stream](character) if character else {}
+
+
+def _delta(old, new):
+    """The changes from the old to the new state; None for removed keys."""
+    delta = {key: value for key, value in new.items() if old.get(key, ()) != value}
+    delta.update((key, None) for key in old if key not in new)
+    return delta
+
+
+# ------------------------------------------------------------
+#
+# Subscriptions
+#
+# ------------------------------------------------------------
+
+
+def subscribe(session, stream):
+    """
+    Start sending a stream to a session, beginning with its full state.
+
+    Args:
+        session (Session): The subscribing session.
+        stream (str): One of STREAMS.
+
+    """
+    state = _state(session, stream)
+    _SUBSCRIPTIONS.setdefault(session.sessid, {})[stream] = state
+    session.msg(**{stream: ((), state)})
+
+
+def unsubscribe(session, stream=None):
+    """
+    Stop sending a stream to a session.
+
+    Args:
+        session (Session): The session.
+        stream (str, optional): The stream to stop. All, if not given.
+
+    """
+    streams = _SUBSCRIPTIONS.get(session.sessid)
+    if streams is not None:
+        if stream:
+            streams.pop(stream, None)
+        if not stream or not streams:
+            del _SUBSCRIPTIONS[session.sessid]
+
+
+def _restore_pending():
+    """Resubscribe sessions that were subscribed before a reload."""
+    for sessid in list(_PENDING):
+        session = SESSION_HANDLER.get(sessid)
+        if session:
+            for stream in _PENDING.pop(sessid):
+                subscribe(session, stream)
+    if time.time() > _PENDING_UNTIL:
+        _PENDING.clear()
+
+
+def process():
+    """
+    Send every subscribed session what changed since the last time.
+
+    Returns:
+        count (int): The number of messages sent.
+
+    """
+    if _PENDING:
+        _restore_pending()
+    count = 0
+    for sessid, streams in list(_SUBSCRIPTIONS.items()):
+        session = SESSION_HANDLER.get(sessid)
+        if not session:
+            # disconnected
+            del _SUBSCRIPTIONS[sessid]
+            continue
+        outgoing = {}
+        try:
+            for stream, old in streams.items():
+                new = _state(session, stream)
+                if new != old:
+                    outgoing[stream] = ((), _delta(old, new))
+                    streams[stream] = new
+        except Exception:
+            logger.log_trace("Druidia streams: error updating %s." % session)
+            continue
+        if outgoing:
+            session.msg(**outgoing)
+            count += 1
+    return count
+
+
+def start():
+    """
+    Start sending stream updates. This is called at server start.
+    """
+    global _LOOP, _PENDING_UNTIL
+    if _LOOP is not None:
+        return
+    _PENDING.update(ServerConfig.objects.conf(STREAMS_CONFIG_KEY) or {})
+    _PENDING_UNTIL = time.time() + STREAMS_RESTORE_TIMEOUT
+    ServerConfig.objects.conf(STREAMS_CONFIG_KEY, delete=True)
+    _LOOP = LoopingCall(process)
+    _LOOP.start(STREAM_INTERVAL, now=False)
+
+
+def stop():
+    """
+    Stop sending updates. This is called when the server stops or
+    reloads, after `save` for a reload.
+    """
+    global _LOOP
+    if _LOOP is not None:
+        if _LOOP.running:
+            _LOOP.stop()
+        _LOOP = None
+    _SUBSCRIPTIONS.clear()
+
+
+def save():
+    """
+    Save who is subscribed to what, to be restored by `start`. This is
+    called when the server stops for a reload; the sessions keep their
+    ids over it.
+    """
+    saved = {sessid: list(streams) for sessid, streams in _SUBSCRIPTIONS.items()}
+    if saved:
+        ServerConfig.objects.conf(STREAMS_CONFIG_KEY, saved)
+
+
+def forget():
+    """
+    Drop any saved subscriptions. This is called on a cold start or
+    stop, after which session ids start over and the saved ones would
+    belong to other sessions.
+    """
+    _PENDING.clear()
+    ServerConfig.objects.conf(STREAMS_CONFIG_KEY, delete=True)
@@ -0,0 +1,239 @@
+"""
+Telemetry
+
+A record of every attack made in Druidia, for checking the combat
+balance offline. `CmdAttack` (which is also what mobs attack with)
+calls `record_attack` for every stab, slash and parry.
+
+Each attack becomes one fixed-size binary record (see RECORD_FIELDS).
+Recording only appends a tuple to a queue; a background thread packs
+the records and appends them to a file in
+`settings.DRUIDIA_TELEMETRY_DIR`. When a file grows past
+`settings.DRUIDIA_TELEMETRY_MAX_BYTES` a new one is started. Next to
+each file, a small .json file lists the weapon prototype names that
+the `weapon` field indexes.
+
+The files are just records back to back, so they can be loaded (or
+memory-mapped) straight into NumPy:
+
+    from world import telemetry
+    records, weapons = telemetry.load("server/logs/telemetry/combat-....bin")
+    hits = records[records["flags"] & telemetry.FLAG_HIT != 0]
+
+NumPy is only needed for `load`, not for recording.
+
+"""
+
+import json
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from evennia import logger
+
+# field name, struct format and numpy type of each part of a record
+RECORD_FIELDS = (
+    ("time", "d", "<f8"),  # unix time of the attack
+    ("attacker", "I", "<u4"),  # id of the attacker
+    ("target", "I", "<u4"),  # id of the target, 0 for a parry
+    ("weapon", "H", "<u2"),  # index in the weapon names, see WEAPON_UNKNOWN
+    ("mode", "B", "u1"),  # index in MODES
+    ("flags", "B", "u1"),  # FLAG_* bits
+    ("hit_chance", "f", "<f4"),  # chance to hit, after modifiers
+    ("roll", "f", "<f4"),  # the roll made; a hit if <= hit_chance
+    ("damage", "f", "<f4"),  # damage dealt on a hit, before resistances
+    ("target_health", "f", "<f4"),  # target health after the attack, or NaN
+)
+RECORD = struct.Struct("<" + "".join(fmt for _, fmt, _ in RECORD_FIELDS))
+
+MODES = ("stab", "slash", "parry")
+FLAG_HIT = 1
+FLAG_PARRIED = 2  # the target was parrying
+FLAG_MAGIC = 4  # the weapon was magic
+# weapon index of weapons not made from a prototype
+WEAPON_UNKNOWN = 0xFFFF
+
+TELEMETRY_ENABLED = getattr(settings, "DRUIDIA_TELEMETRY", True)
+TELEMETRY_DIR = getattr(
+    settings,
+    "DRUIDIA_TELEMETRY_DIR",
+    os.path.join(settings.GAME_DIR, "server", "logs", "telemetry"),
+)
+TELEMETRY_MAX_BYTES = getattr(settings, "DRUIDIA_TELEMETRY_MAX_BYTES", 16 * 1024**2)
+# records waiting to be written beyond this are dropped, oldest first
+TELEMETRY_MAX_QUEUE = 100000
+
+_NAN = float("nan")
+# records waiting for the writer thread. A deque's append and popleft
+# are thread-safe, so no lock is needed.
+_QUEUE = deque(maxlen=TELEMETRY_MAX_QUEUE)
+# the writer thread, while running
+_WRITER = None
+
+
+def record_attack(
+    attacker, target, weapon, mode, hit=0.0, roll=0.0, damage=0.0, parried=False
+):
+    """
+    Record an attack. This does nothing unless the telemetry writer has
+    been started.
+
+    Args:
+        attacker (Object): Who attacked.
+        target (Object or None): Who was attacked. None for a parry.
+        weapon (Weapon): What was used.
+        mode (str): One of MODES.
+        hit (float, optional): The chance to hit.
+        roll (float, optional): The random roll made against `hit`.
+        damage (float, optional): The damage of a hit.
+        parried (bool, optional): If the target was parrying.
+
+    """
+    if _WRITER is None:
+        return
+    stats = weapon.stats
+    flags = (
+        (FLAG_HIT if target and roll <= hit else 0)
+        | (FLAG_PARRIED if parried else 0)
+        | (FLAG_MAGIC if stats.magic else 0)
+    )
+    health = target.attributes.get("health") if target else None
+    _QUEUE.append(
+        (
+            time.time(),
+            attacker.id,
+            target.id if target else 0,
+            stats.prototype,
+            MODES.index(mode),
+            flags,
+            hit,
+            roll,
+            damage,
+            _NAN if health is None else health,
+        )
+    )
+
+
+class _Writer(threading.Thread):
+    """
+    Drains the queue into the telemetry files. Records are written
+    about once a second, or as soon as the thread is told to stop.
+    """
+
+    def __init__(self, weapon_names):
+        super().__init__(name="druidia-telemetry", daemon=True)
+        self.weapon_names = list(weapon_names)
+        self.weapon_index = {name: num for num, name in enumerate(self.weapon_names)}
+        self.stopping = threading.Event()
+        self.file = None
+        self.size = 0
+
+    def _open(self):
+        """Start a new file, with its list of weapon names."""
+        os.makedirs(TELEMETRY_DIR, exist_ok=True)
+        path = os.path.join(
+            TELEMETRY_DIR,
+            "combat-%s.bin" % time.strftime("%Y%m%d-%H%M%S", time.gmtime()),
+        )
+        with open(path[:-4] + ".json", "w") as names:
+            json.dump({"weapons": self.weapon_names}, names)
+        self.file = open(path, "ab")
+        self.size = 0
+
+    def _write(self):
+        """Write all queued records."""
+        chunk = []
+        while _QUEUE:
+            record = list(_QUEUE.popleft())
+            record[3] = self.weapon_index.get(record[3], WEAPON_UNKNOWN)
+            chunk.append(RECORD.pack(*record))
+        if not chunk:
+            return
+        if self.file is None or self.size >= TELEMETRY_MAX_BYTES:
+            if self.file:
+                self.file.close()
+            self._open()
+        data = b"".join(chunk)
+        self.file.write(data)
+        self.file.flush()
+        self.size += len(data)
+
+    def run(self):
+        while not self.stopping.wait(1.0):
+            try:
+                self._write()
+            except Exception:
+                logger.log_trace("Druidia telemetry: could not write records.")
+        self._write()
+        if self.file:
+            self.file.close()
+
+
+def start():
+    """
+    Start the writer thread. This is called at server start.
+    """
+    global _WRITER
+    if TELEMETRY_ENABLED and _WRITER is None:
+        from typeclasses.weapons.rack import WEAPON_PROTOTYPES
+
+        _WRITER = _Writer(sorted(name.lower() for name in WEAPON_PROTOTYPES))
+        _WRITER.start()
+
+
+def stop():
+    """
+    Write what is left in the queue and stop the writer thread. This is
+    called when the server stops or reloads.
+    """
+    global _WRITER
+    if _WRITER is not None:
+        writer, _WRITER = _WRITER, None
+        writer.stopping.set()
+        writer.join(5)
+
+
+def record_dtype():
+    """
+    Get the NumPy dtype of a record.
+
+    Returns:
+        dtype (numpy.dtype): A packed structured dtype matching RECORD.
+
+    """
+    import numpy
+
+    return numpy.dtype([(name, dtype) for name, _, dtype in RECORD_FIELDS])
+
+
+def load(path, mmap=True):
+    """
+    Load a telemetry file into NumPy. This needs NumPy installed.
+
+    Args:
+        path (str): The path of a .bin file written by the telemetry.
+        mmap (bool, optional): Memory-map the file instead of reading it
+            into memory.
+
+    Returns:
+        records (numpy.ndarray): One structured entry per record.
+        weapons (list): The weapon prototype names, indexed by the
+            `weapon` field of the records.
+
+    """
+    import numpy
+
+    dtype = record_dtype()
+    if mmap and os.path.getsize(path):
+        records = numpy.memmap(path, dtype=dtype, mode="r")
+    else:
+        records = numpy.fromfile(path, dtype=dtype)
+    weapons = []
+    names = os.path.splitext(path)[0] + ".json"
+    if os.path.exists(names):
+        with open(names) as fil:
+            weapons = json.load(fil)["weapons"]
+    return records, weapons
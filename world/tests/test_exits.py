@@ -25,6 +25,9 @@ class TestExits(TwistedTestCase, CommandTest):
         self.assertFalse(wall.db.button_exposed)
         self.assertFalse(wall.db.exit_open)
         wall.db.root_pos = {"yellow": 0, "green": 0, "red": 0, "blue": 0}
+        desc = wall.db.desc
+        self.assertIn("|wshift|n", wall.return_appearance(self.char1))
+        self.assertEqual(wall.db.desc, desc)
         self.call(
             drucrumblingwall.CmdShiftRoot(),
             "blue root right",
@@ -1,9 +1,16 @@
 # test the NPCs.
+import time
+
+from mock import patch
+
 from evennia import create_object
+from evennia.typeclasses.attributes import Attribute
 from evennia.commands.default.tests import CommandTest
 from evennia.utils.test_resources import EvenniaTest
 
 from typeclasses.npcs import mob as drumob
+from typeclasses.weapons import edged as druedged
+from world import combat, effects, stats, writebehind
 
 
 class TestMob(EvenniaTest):
@@ -16,3 +23,60 @@ class TestMob(EvenniaTest):
         self.assertEqual(mobobj.db.is_dead, True)
         mobobj._set_ticker(0, "foo", stop=True)
         # TODO should be expanded with further tests of the modes and damage etc.
+
+    @patch("world.combat.random.random", return_value=0.0)
+    def test_mob_defeat(self, mockrandom):
+        mobobj = create_object(drumob.Mob, key="mob", location=self.room1)
+        mobobj.db.send_defeated_to = self.room2.key
+        weapon = create_object(druedged.Weapon, key="sword", location=mobobj)
+        self.char1.db.health = 1
+        # defeated as soon as the hit lands, also in a combat round
+        report = combat.RoundReport(self.room1)
+        combat.resolve_attack(mobobj, weapon, "slash", self.char1, report)
+        self.assertEqual(self.char1.location, self.room2)
+        self.assertIn(mobobj.db.defeat_msg, report.lines[self.char1])
+        # and so is bleeding to death from a wound the mob gave
+        self.char2.db.health = 1
+        effects.apply(self.char2, "bleed", damage=2, source=mobobj.id)
+        effects.process(time.time() + effects.Bleeding.interval + 1)
+        self.assertEqual(self.char2.location, self.room2)
+
+    def test_mob_ticker(self):
+        mobobj = create_object(drumob.Mob, key="mob", location=self.room1)
+        mobobj.set_alive()
+        mobobj.start_hunting()
+        self.assertEqual(mobobj.db.last_hook_key, "do_hunting")
+        storage = drumob.TICKER_HANDLER.ticker_storage
+        keys = [key for key, (_, kwargs) in storage.items() if kwargs["_obj"] == mobobj]
+        self.assertEqual(len(keys), 1)
+        mobobj.delete()
+        self.assertFalse(any(key in storage for key in keys))
+
+    def test_mob_stats(self):
+        stats.recount()
+        counts = stats.snapshot()
+        self.assertEqual(counts["rooms"], 2)
+        mobobj = create_object(drumob.Mob, key="mob", location=self.room1)
+        self.assertEqual(stats.snapshot()["mobiles"], counts["mobiles"] + 1)
+        mobobj.delete()
+        self.assertEqual(stats.snapshot(), counts)
+        stats.recount()
+        self.assertEqual(stats.info()["drift"], 0)
+
+    @patch("world.writebehind._LOOP", True)
+    def test_mob_health_write_behind(self):
+        mobobj = create_object(drumob.Mob, key="mob", location=self.room1)
+        mobobj.set_alive()
+        weapon = create_object(druedged.Weapon, key="sword", location=self.char1)
+        weapon.db.magic = True
+        mobobj.at_hit(weapon, self.char1, 5)
+        self.assertEqual(mobobj.db.health, 15)
+        stored = Attribute.objects.filter(
+            id=mobobj.attributes.get("health", return_obj=True).id
+        ).values_list("db_value", flat=True)
+        self.assertEqual(stored[0], 20)
+        # a failed write is kept for the next flush
+        with patch.object(Attribute.objects, "bulk_update", side_effect=Exception):
+            self.assertEqual(writebehind.flush(), 0)
+        writebehind.flush()
+        self.assertEqual(stored.all()[0], 15)
@@ -1,12 +1,23 @@
 # Test Druidia's rooms.
-from evennia import create_object
+import json
+
+from mock import MagicMock, patch
+from django.test import RequestFactory
+from evennia import DefaultCharacter, DefaultRoom, create_object
 from evennia.commands.default.tests import CommandTest
+from evennia.server.sessionhandler import SESSION_HANDLER
 
 from typeclasses import base as drubase
 from typeclasses.rooms import ticker as druticker
 from typeclasses.rooms import introoutro as druintro
 from typeclasses.rooms import dark as drudark
 from typeclasses.rooms import teleports as drutele
+from typeclasses.menus import intro_menu
+from commands import admin
+from server.conf import at_search, inlinefuncs, serversession
+from world import instances as druinstances
+from world import janitor, metrics, snapshots, streams, warmup
+from web import api
 
 
 class TestRoom(CommandTest):
@@ -23,6 +34,161 @@ class TestRoom(CommandTest):
         self.call(drubase.CmdLook(), "foo", "A detail", obj=room)
         room.delete()
 
+    def test_command_metrics(self):
+        self.call(drubase.CmdLook(), "", "Room")
+        text = metrics.render()
+        self.assertIn('druidia_command_seconds_count{command="look"}', text)
+        self.assertIn('druidia_command_queries_bucket{command="look",le="+Inf"}', text)
+
+    def test_session_throttle(self):
+        session = serversession.ServerSession()
+        session.init_session("telnet", ("localhost", "testmode"), SESSION_HANDLER)
+        session.sessid = 99
+        self.assertTrue(session.throttle())
+        # one very slow command empties the bucket
+        session.record_command("look", 0.5)
+        with patch.object(session, "msg") as msg:
+            self.assertFalse(session.throttle())
+            self.assertFalse(session.throttle())
+            self.assertEqual(msg.call_count, 1)
+        latency = session.latency_stats()
+        self.assertEqual(latency["slowest"], "look")
+        self.assertEqual(latency["throttled"], 2)
+        with patch.object(SESSION_HANDLER, "values", return_value=[session]):
+            self.call(admin.CmdLatency(), "", "Session latency\n  #99")
+
+    def test_room_appearance_cache(self):
+        room = create_object(drubase.Room, key="room")
+        room.db.desc = "A plain room."
+        self.char1.location = room
+        self.assertTrue(room.return_appearance(self.char1).endswith("A plain room."))
+        self.assertEqual(len(room.ndb.appearance_cache), 1)
+        # moving something in is picked up without any explicit bump
+        pebble = create_object(drubase.Object, key="pebble", location=room)
+        self.assertIn("You see:|n a pebble", room.return_appearance(self.char1))
+        # and so is a new name
+        pebble.key = "stone"
+        self.assertIn("You see:|n a stone", room.return_appearance(self.char1))
+        # and so is a new view lock
+        pebble.locks.add("view:false()")
+        self.assertNotIn("stone", room.return_appearance(self.char1))
+        room.db.desc = "A changed room."
+        self.assertIn("A changed room.", room.return_appearance(self.char1))
+        room.set_detail("floor", "Dusty.")
+        self.assertEqual(room.ndb.appearance_cache, {})
+        room.delete()
+
+    def test_room_inlinefuncs(self):
+        room = create_object(drubase.Room, key="room")
+        room.db.desc = "Welcome, $viewer(). It costs \\$5."
+        self.char1.location = room
+        self.assertIn("Welcome, Char. It costs $5.", room.return_appearance(self.char1))
+        self.assertIn("Welcome, Char2.", room.return_appearance(self.char2))
+        # Evennia's inlinefuncs get their arguments as given
+        room.db.desc = "A $pad(sign, 6, r, -)."
+        self.assertIn("A --sign.", room.return_appearance(self.char1))
+        room.db.desc = "Welcome, $viewer(). It costs \\$5."
+        # looking again reuses the compiled template
+        hits = inlinefuncs._TEMPLATES.hits
+        room.return_appearance(self.char1)
+        self.assertEqual(inlinefuncs._TEMPLATES.hits, hits + 1)
+        self.assertGreater(inlinefuncs._TEMPLATES.info()["hit_rate"], 0)
+        room.delete()
+
+    def test_search_multimatch(self):
+        char = create_object(drubase.Character, key="searcher", location=self.room1)
+        stone = create_object(drubase.Object, key="small stone", location=self.room1)
+        box = create_object(drubase.Object, key="small box", location=self.room1)
+        self.assertIsNone(at_search.at_search_result([stone, box], char, "small"))
+        self.assertEqual(char.ndb.last_multimatch[2], [stone, box])
+        # the follow-up is answered without a new search
+        with patch.object(DefaultCharacter, "search") as search:
+            self.assertEqual(char.search("2-small"), box)
+            search.assert_not_called()
+        self.assertEqual(at_search.suggestions(char, "smal stone")[0], stone)
+        # only what was searched is suggested
+        self.assertEqual(at_search.suggestions(char, "stone", candidates=[box]), [])
+        with patch.object(char, "msg") as msg:
+            at_search.at_search_result([], char, "smal stone", global_search=True)
+            self.assertNotIn("Did you mean", msg.call_args[0][0])
+        box.location = None
+        self.assertIsNone(at_search.remembered_match(char, "2-small"))
+
+    def test_streams(self):
+        session = MagicMock(puppet=self.char1, sessid=4711)
+        self.char1.db.health = 20
+        with patch("world.streams.SESSION_HANDLER", {4711: session}):
+            streams.subscribe(session, "char_vitals")
+            session.msg.assert_called_with(
+                char_vitals=((), {"health": 20, "health_max": None})
+            )
+            session.msg.reset_mock()
+            self.assertEqual(streams.process(), 0)
+            self.char1.db.health = 12
+            self.char1.db.health = 15
+            # only the last change, and only what changed, is sent
+            self.assertEqual(streams.process(), 1)
+            session.msg.assert_called_once_with(char_vitals=((), {"health": 15}))
+            # kept over a reload, but not over a shutdown
+            streams.save()
+            streams.forget()
+            streams.start()
+            self.assertEqual(streams._PENDING, {})
+            streams.stop()
+        self.assertNotIn(4711, streams._SUBSCRIPTIONS)
+
+    def test_snapshots(self):
+        snapshots.update()
+        body, etag = snapshots.get("room:%s" % self.room1.id)
+        self.assertEqual(json.loads(body.decode())["key"], "Room")
+        self.room1.db.desc = "A new desc."
+        snapshots.update()
+        body, new_etag = snapshots.get("room:%s" % self.room1.id)
+        self.assertEqual(json.loads(body.decode())["desc"], "A new desc.")
+        self.assertNotEqual(etag, new_etag)
+        request = RequestFactory().get("/api/rooms/", HTTP_IF_NONE_MATCH=new_etag)
+        self.assertEqual(api.room_detail(request, str(self.room1.id)).status_code, 304)
+
+    def test_instance(self):
+        template = create_object(drubase.Room, key="cabin", aliases=["dru#99"])
+        template.db.desc = "A shared desc."
+        template.set_detail("floor", "Dusty.")
+        instance_id = druinstances.create_instance([self.char1], start=template)
+        room = self.char1.location
+        self.assertEqual(room.db.instance_id, instance_id)
+        self.assertEqual(room.db.template, template)
+        self.assertIsNone(room.attributes.get("desc"))
+        self.assertEqual(room.get_desc(), "A shared desc.")
+        # also for lookers that can't use the cached render
+        watcher = create_object(drubase.Object, key="watcher", location=room)
+        self.assertIn("A shared desc.", room.return_appearance(watcher))
+        watcher.delete()
+        self.assertEqual(room.return_detail("floor"), "Dusty.")
+        self.assertEqual(druinstances.instance_search("dru#99", room), [room])
+        self.assertEqual(druinstances.instance_search("dru#99"), [template])
+        # not empty yet
+        druinstances.collect_instances()
+        self.assertTrue(room.pk)
+        self.char1.move_to(self.room1)
+        druinstances.collect_instances()
+        self.assertFalse(room.pk)
+        template.delete()
+
+    def test_warmup(self):
+        template = create_object(drubase.Room, key="cabin", aliases=["dru#98"])
+        template.db.desc = "You are $viewer(here, in the cabin)."
+        template.db.east_exit = "nowhere"
+        template.ndb.appearance_cache = None
+        report = warmup.run()
+        self.assertEqual(report["counts"]["rooms"], 1)
+        self.assertEqual(report["counts"]["renders"], 1)
+        self.assertTrue(template.ndb.appearance_cache)
+        self.assertEqual(
+            report["missing"], ["'nowhere' (east_exit of %s)" % template.dbref]
+        )
+        self.assertIs(warmup.last_report(), report)
+        template.delete()
+
     def test_weatherroom(self):
         room = create_object(druticker.WeatherRoom, key="weatherroom")
         room.update_weather()
@@ -38,6 +204,34 @@ class TestRoom(CommandTest):
         room = create_object(druintro.IntroRoom, key="introroom")
         room.at_object_receive(self.char1, self.room1)
 
+    def test_demo_area(self):
+        self.char1.location = self.room2
+        intro_menu._maintain_demo_room(self.char1)
+        self.assertIsInstance(self.char1.location, intro_menu.DemoRoom)
+        self.assertFalse(self.char1.location.cmdset.has("room_cmdset"))
+        self.assertEqual(self.char1.ndb.demo_room_return, self.room2)
+        intro_menu._maintain_demo_room(self.char1, delete=True)
+        self.assertEqual(self.char1.location, self.room2)
+        self.assertIsNone(self.char1.ndb.demo_room_return)
+        # leaving the area some other way forgets the way back too
+        intro_menu._maintain_demo_room(self.char1)
+        self.char1.move_to(self.room1, quiet=True)
+        self.assertIsNone(self.char1.ndb.demo_room_return)
+        intro_menu._maintain_demo_room(self.char1)
+        self.assertIsInstance(self.char1.location, intro_menu.DemoRoom)
+
+    def test_legacy_demo_room(self):
+        character = create_object(DefaultCharacter, key="offline", home=self.room1)
+        demo_room = create_object(DefaultRoom, key="old demo room")
+        character.location = None
+        character.db.tutorial_world_demo_room_data = [self.room2, demo_room]
+        report = janitor.run_pass()
+        self.assertEqual(report["removed"]["old demo rooms"], 1)
+        self.assertFalse(demo_room.pk)
+        # logged off characters stay out of the world until they log in
+        self.assertIsNone(character.location)
+        self.assertEqual(character.db.prelogout_location, self.room2)
+
     def test_bridgeroom(self):
         room = create_object(druticker.BridgeRoom, key="bridgeroom")
         room.update_weather()
@@ -69,4 +263,13 @@ class TestRoom(CommandTest):
         create_object(drutele.TeleportRoom, key="teleportroom")
 
     def test_outroroom(self):
-        create_object(druintro.OutroRoom, key="outroroom")
+        room = create_object(druintro.OutroRoom, key="outroroom")
+        self.char1.progress.add("climbed_tree")
+        self.char1.progress.set("puzzle_clue", 2)
+        # left over from before the progress record
+        self.char1.db.tutorial_bridge_position = 3
+        room.at_object_receive(self.char1, self.room1)
+        self.assertIsNone(self.char1.db.tutorial_bridge_position)
+        self.assertFalse(self.char1.progress.has("climbed_tree"))
+        self.assertIsNone(self.char1.progress.get("puzzle_clue"))
+        self.assertIsNone(self.char1.attributes.get("druidia_progress"))
@@ -29,10 +29,8 @@ class TestScenery(TwistedTestCase, CommandTest):
             "You climb tree. Having looked around, you climb down again.",
             obj=climbable,
         )
-        self.assertEqual(
-            self.char1.tags.get("climbed_tree", category="world"),
-            "climbed_tree",
-        )
+        self.assertTrue(self.char1.progress.has("climbed_tree"))
+        self.assertEqual(self.char1.progress.get("last_climbed"), climbable.id)
 
     def test_obelisk(self):
         obelisk = create_object(drusculptures.Obelisk, key="obelisk", location=self.room1)
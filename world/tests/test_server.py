@@ -0,0 +1,163 @@
+# Test the Portal and Server plugins in server/conf.
+
+from mock import MagicMock, patch
+
+from evennia import CmdSet, Command
+from evennia.commands.cmdparser import cmdparser as evennia_cmdparser
+from evennia.utils.test_resources import EvenniaTest
+from twisted.trial.unittest import TestCase as TwistedTestCase
+
+from server.conf import cmdparser as drucmdparser
+from server.conf import portal_services_plugins as druportal
+
+
+def _ambient(text):
+    return {"text": ((text,), {"type": "ambient"})}
+
+
+class TestOutputQueue(TwistedTestCase):
+    def setUp(self):
+        self.session = MagicMock(sessid=1)
+        self.session.transport.producer = None
+        self.sent = []
+        self.queue = druportal.OutputQueue(
+            self.session, lambda session, **kwargs: self.sent.append(kwargs)
+        )
+
+    def texts(self):
+        return [kwargs["text"][0][0] for kwargs in self.sent]
+
+    def test_passthrough(self):
+        self.queue.put({"text": (("hello",), {})})
+        self.assertEqual(self.texts(), ["hello"])
+        self.assertFalse(self.queue.direct)
+
+    def test_pause_resume(self):
+        self.queue.pauseProducing()
+        self.queue.put(_ambient("It rains."))
+        self.queue.put({"text": (("one",), {})})
+        self.queue.put({"text": (("two",), {})})
+        self.assertEqual(self.sent, [])
+        self.queue.resumeProducing()
+        # direct output first, in order, ambient last
+        self.assertEqual(self.texts(), ["one", "two", "It rains."])
+        # nothing held any more, so output passes straight through again
+        self.queue.put({"text": (("three",), {})})
+        self.assertEqual(self.texts()[-1], "three")
+
+    def test_direct_cap(self):
+        self.queue.pauseProducing()
+        with patch.object(druportal, "OUTPUT_MAX_DIRECT", 3):
+            for num in range(5):
+                self.queue.put({"text": (("line %i" % num,), {})})
+        self.assertEqual(self.queue.dropped, 2)
+        self.queue.resumeProducing()
+        self.assertEqual(self.texts(), ["line 2", "line 3", "line 4"])
+
+    def test_ambient_merge_cap(self):
+        self.queue.pauseProducing()
+        with patch.object(druportal, "OUTPUT_MAX_AMBIENT", 2):
+            for text in ("A gust.", "Thunder.", "Thunder.", "Rain.", "Rain."):
+                self.queue.put(_ambient(text))
+        self.assertEqual(self.queue.dropped, 1)
+        self.queue.resumeProducing()
+        self.assertEqual(self.texts(), ["Thunder. (x2)", "Rain. (x2)"])
+
+    def test_release(self):
+        self.session.transport.producer = self.queue
+        druportal.OutputQueueService.queues[1] = self.queue
+        self.queue.pauseProducing()
+        self.queue.put({"text": (("Goodbye!",), {})})
+        self.queue.release()
+        # held output is handed over and the transport may close
+        self.assertEqual(self.texts(), ["Goodbye!"])
+        self.session.transport.unregisterProducer.assert_called_once()
+        self.assertNotIn(1, druportal.OutputQueueService.queues)
+
+
+class _ParserCmdSet(CmdSet):
+    key = "parser_test"
+
+    def at_cmdset_creation(self):
+        for key, aliases, arg_regex, locks in (
+            ("give", [], None, "cmd:all()"),
+            ("give up", [], None, "cmd:all()"),
+            ("get", [], None, "cmd:all()"),
+            ("get weapon", ["grab weapon"], None, "cmd:all()"),
+            ("@examine", ["exa"], None, "cmd:all()"),
+            ("look", ["l"], r"\s|$", "cmd:all()"),
+            ("/who", [], None, "cmd:all()"),
+            ("secret", ["@secret"], None, "cmd:false()"),
+        ):
+            self.add(
+                type(
+                    "Cmd",
+                    (Command,),
+                    {
+                        "key": key,
+                        "aliases": aliases,
+                        "arg_regex": arg_regex,
+                        "locks": locks,
+                    },
+                )()
+            )
+
+
+class TestCmdParser(EvenniaTest):
+    def test_same_as_default(self):
+        cmdset = _ParserCmdSet()
+        # two commands with the same name, as after a merge with duplicates
+        for num in range(2):
+            cmdset.commands.append(
+                type("Cmd", (Command,), {"key": "push", "locks": "cmd:all()"})()
+            )
+            cmdset.commands[-1].obj = num
+
+        def parse(parser, string):
+            return sorted(
+                (match[0], match[1], match[3], match[4], match[5], match[2].key)
+                for match in parser(string, cmdset, self.char1)
+            )
+
+        for string in (
+            "give up",
+            "Give up now",
+            "give apple",
+            "get weapon",
+            "get weapon sword",
+            "grab weapon",
+            "get",
+            "@examine me",
+            "examine me",
+            "@@examine",
+            "exa",
+            "/look",
+            "@look here",
+            "look",
+            "lookat",
+            "who",
+            "/who",
+            "2-push",
+            "1-push button",
+            "push",
+            "secret",
+            "@secret",
+            "nothing",
+            "",
+        ):
+            self.assertEqual(
+                parse(drucmdparser.cmdparser, string),
+                parse(evennia_cmdparser, string),
+                string,
+            )
+        self.assertEqual(
+            drucmdparser.cmdparser("give up now", cmdset, self.char1)[0][0], "give up"
+        )
+        self.assertEqual(
+            drucmdparser.cmdparser("2-push", cmdset, self.char1)[0][2].obj, 1
+        )
+        self.assertEqual(drucmdparser.cmdparser("lookat", cmdset, self.char1), [])
+        self.assertEqual(drucmdparser.cmdparser("secret", cmdset, self.char1), [])
+        # the trie is compiled once per merged cmdset
+        trie = drucmdparser._get_trie(cmdset)
+        self.assertIs(drucmdparser._get_trie(cmdset), trie)
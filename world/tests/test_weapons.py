@@ -1,11 +1,16 @@
 #  Test weapons (and weapon racks).
 
+import time
+
+from mock import patch
 
 from evennia import create_object
 from evennia.commands.default.tests import CommandTest
 
 from typeclasses.weapons import edged as druedged
 from typeclasses.weapons import rack as drurack
+from world import effects, janitor, telemetry
+from world.spawning import flatten_prototype, spawn_many, spawn_prototype
 from twisted.trial.unittest import TestCase as TwistedTestCase
 
 
@@ -23,3 +28,120 @@ class TestWeapons(TwistedTestCase, CommandTest):
         rack = create_object(drurack.WeaponRack, key="rack", location=self.room1)
         rack.db.available_weapons = ["sword"]
         self.call(drurack.CmdGetWeapon(), "", "You find Rusty sword.", obj=rack)
+        # prototypes that failed their check are never handed out
+        rack.db.available_weapons = ["no such weapon"]
+        self.call(
+            drurack.CmdGetWeapon(),
+            "",
+            "The rack is empty.",
+            obj=rack,
+            caller=self.char2,
+        )
+
+    def test_orphaned_weapon(self):
+        weapon = create_object(druedged.Weapon, key="sword", location=self.char1)
+        weapon.location = None
+        report = janitor.run_pass()
+        self.assertEqual(report["removed"]["orphaned objects"], 1)
+        self.assertFalse(weapon.pk)
+
+    def test_weapon_stats(self):
+        weapon = create_object(druedged.Weapon, key="sword", location=self.char1)
+        self.assertEqual(weapon.stats.damage, 1.0)
+        self.assertIs(weapon.stats, weapon.stats)
+        weapon.db.damage = 4
+        self.assertEqual(weapon.stats.damage, 4)
+        with self.assertRaises(AttributeError):
+            weapon.stats.damage = 10
+
+    def test_flat_weapon_prototypes(self):
+        self.assertEqual(drurack.WEAPON_PROTOTYPE_ERRORS, [])
+        attrs = dict(drurack.FLAT_WEAPON_PROTOTYPES["hawkblade"]["attrs"])
+        self.assertEqual(attrs["magic"], True)
+        self.assertEqual(attrs["damage"], 11)
+        weapon = spawn_prototype(drurack.FLAT_WEAPON_PROTOTYPES["hawkblade"])
+        self.assertEqual(weapon.typeclass_path, "typeclasses.weapons.edged.Weapon")
+        self.assertEqual(weapon.stats.parry, 0.7)
+        self.assertTrue(weapon.tags.get("hawkblade", category="from_prototype"))
+
+    def test_spawn_many(self):
+        weapons = spawn_many(
+            drurack.FLAT_WEAPON_PROTOTYPES["club"],
+            4,
+            locations=[self.room1, self.room2],
+        )
+        self.assertEqual(len(weapons), 4)
+        self.assertEqual(
+            [weapon.location for weapon in weapons],
+            [self.room1, self.room2, self.room1, self.room2],
+        )
+        # the defaults of Weapon.at_object_creation are overridden
+        self.assertEqual(weapons[0].stats.damage, 6)
+        self.assertEqual(weapons[3].stats.prototype, "club")
+        self.assertTrue(weapons[3].db.desc.startswith("A heavy wooden club"))
+        hammers = spawn_many(drurack.FLAT_WEAPON_PROTOTYPES["warhammer"], 2)
+        self.assertIn("hammer", hammers[1].aliases.all())
+        knife = flatten_prototype(
+            {"prototype_parent": "knife", "key": "Butter knife"},
+            prototype_parents=drurack.WEAPON_PROTOTYPES,
+        )
+        knives = spawn_many(knife, 2)
+        self.assertEqual(knives[1].key, "Butter knife")
+        self.assertEqual(knives[1].stats.damage, 3)
+
+    @patch("world.telemetry._WRITER", True)
+    def test_attack_telemetry(self):
+        weapon = create_object(druedged.Weapon, key="sword", location=self.char1)
+        telemetry._QUEUE.clear()
+        self.call(
+            druedged.CmdAttack(),
+            "Char",
+            "You slash with sword.",
+            obj=weapon,
+            cmdstring="slash",
+        )
+        record = telemetry._QUEUE.popleft()
+        self.assertEqual(record[1:3], (self.char1.id, self.char1.id))
+        self.assertEqual(record[4], telemetry.MODES.index("slash"))
+        self.assertEqual(len(telemetry.RECORD.pack(*record[:3], 0, *record[4:])), 36)
+
+    @patch("world.combat.delay")
+    def test_combat_rounds(self, mockdelay):
+        self.room1.db.combat_rounds = True
+        weapon = create_object(druedged.Weapon, key="sword", location=self.char1)
+        self.call(
+            druedged.CmdAttack(),
+            "",
+            "You get ready to parry.",
+            obj=weapon,
+            cmdstring="parry",
+        )
+        self.call(
+            druedged.CmdAttack(),
+            "Char2",
+            "You get ready to slash at Char2.",
+            obj=weapon,
+            cmdstring="slash",
+        )
+        # one round, and the slash replaced the parry
+        self.assertEqual(mockdelay.call_count, 1)
+        self.assertEqual(
+            list(self.room1.combat.actions.values()), [(weapon, "slash", self.char2)]
+        )
+        with patch.object(self.char2, "msg") as char2msg:
+            self.room1.combat.resolve_round()
+        self.assertEqual(char2msg.call_count, 1)
+        self.assertEqual(self.room1.combat.actions, {})
+
+    def test_parry_window(self):
+        weapon = create_object(druedged.Weapon, key="sword", location=self.char1)
+        self.call(
+            druedged.CmdAttack(),
+            "",
+            "You raise your weapon in a defensive pose",
+            obj=weapon,
+            cmdstring="parry",
+        )
+        self.assertTrue(effects.has(self.char1, "parry"))
+        effects.process(time.time() + effects.ParryWindow.duration + 1)
+        self.assertFalse(effects.has(self.char1, "parry"))
@@ -0,0 +1,294 @@
+"""
+Warm-up
+
+Right after a start or reload every cache in Druidia is empty: the
+typeclassed rooms, their Attributes, the parsed intro menu, the room
+renders. The first players to look around pay for filling them, one
+query at a time, which is most noticeable right after a reload when
+everyone is back at once.
+
+The warm-up fills them before anyone asks:
+
+ - the Druidia rooms (the template area and all instances, see
+   world/instances.py) and everything in them are loaded with one
+   query per chunk of WARMUP_CHUNK_SIZE rooms, and the Attribute cache
+   of each is filled.
+ - named destinations (like the bridge's `east_exit` or a teleport
+   room's `success_teleport_to`) are looked up, loading their targets.
+   Names that find nothing are reported in the log.
+ - the intro menu is parsed and the weapon typeclasses are imported.
+ - the rooms are rendered once, filling the appearance cache and the
+   compiled inlinefunc templates (see server/conf/inlinefuncs.py).
+
+The work is split into slices of at most WARMUP_SLICE seconds, and the
+reactor is given back between slices, so players connecting during the
+warm-up are not kept waiting. How long it took is written to the log.
+
+"""
+
+import time
+from collections import Counter
+
+from django.conf import settings
+from twisted.internet import reactor
+from evennia import logger
+from evennia.objects.models import ObjectDB
+from evennia.utils.utils import class_from_module
+
+from world.instances import AREA_ALIAS_PREFIX, INSTANCE_CATEGORY, instance_search
+
+# set DRUIDIA_WARMUP to False to start with cold caches
+WARMUP = getattr(settings, "DRUIDIA_WARMUP", True)
+# max seconds of work before giving the reactor back
+WARMUP_SLICE = getattr(settings, "DRUIDIA_WARMUP_SLICE", 0.05)
+# rooms loaded per query
+WARMUP_CHUNK_SIZE = 100
+
+# Attributes holding the name of an object found with `instance_search`
+NAMED_DESTINATIONS = (
+    "east_exit",
+    "west_exit",
+    "fall_exit",
+    "success_teleport_to",
+    "failure_teleport_to",
+    "send_defeated_to",
+)
+
+# the warm-up in progress, if any
+_WARMUP = None
+# report of the last finished warm-up, see `last_report`
+_LAST_REPORT = {}
+
+
+# ------------------------------------------------------------
+#
+# Steps
+#
+# Each step does one piece of the warm-up and counts what it
+# did in the report.
+#
+# ------------------------------------------------------------
+
+
+def _room_ids():
+    """The ids of all Druidia rooms, templates and instance copies."""
+    rooms = ObjectDB.objects.filter(db_location__isnull=True)
+    templates = rooms.filter(
+        db_tags__db_key__startswith=AREA_ALIAS_PREFIX, db_tags__db_tagtype="alias"
+    )
+    copies = rooms.filter(db_tags__db_category=INSTANCE_CATEGORY)
+    return sorted(
+        set(templates.values_list("id", flat=True))
+        | set(copies.values_list("id", flat=True))
+    )
+
+
+def _load_attributes(objs):
+    """
+    Fill the Attribute caches of objects. Listing all Attributes of an
+    object makes its AttributeHandler load and cache them, which
+    otherwise happens on the first Attribute access.
+
+    Returns:
+        count (int): The number of Attributes loaded.
+
+    """
+    return sum(len(obj.attributes.all()) for obj in objs)
+
+
+def _load_rooms(report, ids):
+    """Load a chunk of rooms, their contents and all their Attributes."""
+    rooms = list(ObjectDB.objects.filter(id__in=ids))
+    contents = list(ObjectDB.objects.filter(db_location__in=ids))
+    report["counts"]["rooms"] += len(rooms)
+    report["counts"]["contents"] += len(contents)
+    report["counts"]["attributes"] += _load_attributes(rooms + contents)
+    report["rooms"].extend(rooms)
+    report["objects"].extend(rooms + contents)
+
+
+def _resolve_destinations(report, obj):
+    """Look up the named destinations of an object."""
+    for attrname in NAMED_DESTINATIONS:
+        name = obj.attributes.get(attrname)
+        if not name:
+            continue
+        if instance_search(name, obj):
+            report["counts"]["destinations"] += 1
+        else:
+            report["missing"].append("'%s' (%s of %s)" % (name, attrname, obj.dbref))
+
+
+def _prepare_menus(report):
+    """Parse the intro menu and import the weapon typeclasses."""
+    from typeclasses.menus.intro_menu import get_menutree
+    from typeclasses.weapons.rack import FLAT_WEAPON_PROTOTYPES
+
+    get_menutree()
+    report["counts"]["menus"] += 1
+    for prototype in FLAT_WEAPON_PROTOTYPES.values():
+        class_from_module(prototype["typeclass"])
+    report["counts"]["prototypes"] += len(FLAT_WEAPON_PROTOTYPES)
+
+
+def _render_room(report, room):
+    """Render a room, filling its appearance cache."""
+    if not hasattr(room, "invalidate_appearance"):
+        # not a Druidia room; nothing is cached
+        return
+    # the room has no permissions of its own, so it sees what any
+    # player would see
+    room.return_appearance(room)
+    report["counts"]["renders"] += 1
+
+
+def _steps(report):
+    """
+    Generate the warm-up, one step at a time. The rooms are all loaded
+    before anything is resolved or rendered, so those steps only find
+    objects already in memory.
+    """
+    ids = _room_ids()
+    for index in range(0, len(ids), WARMUP_CHUNK_SIZE):
+        yield _load_rooms, (report, ids[index : index + WARMUP_CHUNK_SIZE])
+    yield _prepare_menus, (report,)
+    for obj in report["objects"]:
+        yield _resolve_destinations, (report, obj)
+    for room in report["rooms"]:
+        yield _render_room, (report, room)
+
+
+# ------------------------------------------------------------
+#
+# Running the warm-up
+#
+# ------------------------------------------------------------
+
+
+def _new_warmup():
+    """Start a new warm-up."""
+    report = {
+        "started": time.time(),
+        "finished": None,
+        "slices": 0,
+        "seconds": 0.0,
+        "counts": Counter(),
+        "missing": [],
+        "rooms": [],
+        "objects": [],
+    }
+    report["steps"] = _steps(report)
+    return report
+
+
+def _run_slice(current, budget):
+    """
+    Do steps of the given warm-up for up to `budget` seconds.
+
+    Returns:
+        done (bool): If the warm-up is complete.
+
+    """
+    start = time.perf_counter()
+    done = True
+    for step, args in current["steps"]:
+        try:
+            step(*args)
+        except Exception:
+            logger.log_trace("Druidia warm-up: error in %s." % step.__name__)
+        if time.perf_counter() - start >= budget:
+            done = False
+            break
+    current["slices"] += 1
+    current["seconds"] += time.perf_counter() - start
+    return done
+
+
+def _finish(current):
+    """Store and log the report of a finished warm-up."""
+    global _LAST_REPORT
+    current["finished"] = time.time()
+    for key in ("steps", "rooms", "objects"):
+        del current[key]
+    _LAST_REPORT = current
+    counts = current["counts"]
+    logger.log_info(
+        "Druidia warm-up: %i rooms, %i objects, %i Attributes, %i destinations, "
+        "%i renders in %.3fs (%i slices, %.1fs total)."
+        % (
+            counts["rooms"],
+            counts["contents"],
+            counts["attributes"],
+            counts["destinations"],
+            counts["renders"],
+            current["seconds"],
+            current["slices"],
+            current["finished"] - current["started"],
+        )
+    )
+    for missing in current["missing"]:
+        logger.log_warn("Druidia warm-up: named destination %s not found." % missing)
+
+
+def _next_slice():
+    """Do the next slice, and schedule the one after it."""
+    global _WARMUP
+    if _WARMUP is None:
+        # stopped
+        return
+    if _run_slice(_WARMUP, WARMUP_SLICE):
+        _finish(_WARMUP)
+        _WARMUP = None
+    else:
+        reactor.callLater(0, _next_slice)
+
+
+def start():
+    """
+    Start warming up in the background, if enabled. This is called at
+    server start.
+    """
+    global _WARMUP
+    if WARMUP and _WARMUP is None:
+        _WARMUP = _new_warmup()
+        reactor.callLater(0, _next_slice)
+
+
+def stop():
+    """
+    Drop a warm-up still in progress. This is called when the server
+    stops or reloads.
+    """
+    global _WARMUP
+    _WARMUP = None
+
+
+def run():
+    """
+    Do a complete warm-up right away, without slicing.
+
+    Returns:
+        report (dict): The report of the warm-up, see `last_report`.
+
+    """
+    current = _new_warmup()
+    while not _run_slice(current, float("inf")):
+        pass
+    _finish(current)
+    return current
+
+
+def last_report():
+    """
+    Get the report of the last finished warm-up.
+
+    Returns:
+        report (dict): Empty if no warm-up was finished yet. Otherwise
+            holds `started` and `finished` (timestamps), `slices` (the
+            number of slices used), `seconds` (the processing time
+            spent, over all slices), `counts` (a Counter of rooms,
+            contents, attributes, destinations, renders and so on
+            warmed) and `missing` (named destinations not found).
+
+    """
+    return _LAST_REPORT
@@ -0,0 +1,126 @@
+"""
+Write-behind
+
+Some Attributes change all the time during play: the health of
+combatants on every hit, the root positions of the crumbling wall on
+every shift and the progress record (see world/progress.py) on every
+parry or step across the bridge. Normally each change is its own
+database save.
+
+For the Attributes listed in `settings.DRUIDIA_HOT_ATTRIBUTES`,
+`set_attribute` instead only updates the cached Attribute in memory (so
+everyone reading it sees the new value right away) and marks it dirty.
+Dirty Attributes are written to the database together, in one
+transaction, every `settings.DRUIDIA_WRITE_BEHIND_INTERVAL` seconds,
+when more than `settings.DRUIDIA_WRITE_BEHIND_MAX_DIRTY` are waiting,
+and when the server stops or reloads. At most one interval of changes
+can thus be lost in a crash.
+
+Until `start` has been called (from server/conf/at_server_startstop.py),
+and if the interval is set to 0, everything is written straight away.
+
+Usage:
+
+    from world import writebehind
+    writebehind.set_attribute(target, "health", target.db.health - damage)
+
+Note that mutable values (like a dict) must be given as a new plain
+object and not be changed in place through `obj.db`, since such changes
+are saved immediately by Evennia.
+
+"""
+
+from django.conf import settings
+from django.db import transaction
+from twisted.internet.task import LoopingCall
+from evennia import logger
+from evennia.typeclasses.attributes import Attribute
+from evennia.utils.dbserialize import to_pickle
+
+HOT_ATTRIBUTES = frozenset(
+    getattr(
+        settings, "DRUIDIA_HOT_ATTRIBUTES", ("health", "root_pos", "druidia_progress")
+    )
+)
+WRITE_BEHIND_INTERVAL = getattr(settings, "DRUIDIA_WRITE_BEHIND_INTERVAL", 5)
+WRITE_BEHIND_MAX_DIRTY = getattr(settings, "DRUIDIA_WRITE_BEHIND_MAX_DIRTY", 500)
+
+# Attributes with unsaved changes, by id
+_DIRTY = {}
+# the LoopingCall flushing _DIRTY, when running
+_LOOP = None
+
+
+def set_attribute(obj, key, value):
+    """
+    Set an (uncategorized) Attribute on obj. Hot Attributes are saved
+    later, all others right away.
+
+    Args:
+        obj (Object): The object to set the Attribute on.
+        key (str): The name of the Attribute.
+        value (any): The new value.
+
+    """
+    if _LOOP is None or key not in HOT_ATTRIBUTES:
+        obj.attributes.add(key, value)
+        return
+    attr = obj.attributes.get(key, return_obj=True)
+    if attr is None:
+        # new Attributes are created right away
+        obj.attributes.add(key, value)
+        return
+    attr.db_value = to_pickle(value)
+    _DIRTY[attr.id] = attr
+    if len(_DIRTY) >= WRITE_BEHIND_MAX_DIRTY:
+        flush()
+
+
+def flush():
+    """
+    Write all dirty Attributes to the database. If the write fails,
+    they stay dirty and are tried again at the next flush.
+
+    Returns:
+        count (int): The number of Attributes written.
+
+    """
+    if not _DIRTY:
+        return 0
+    # skip Attributes deleted since they were changed
+    attrs = [attr for attr in _DIRTY.values() if attr.pk]
+    _DIRTY.clear()
+    try:
+        with transaction.atomic():
+            Attribute.objects.bulk_update(attrs, ["db_value"])
+    except Exception:
+        logger.log_trace(
+            "Druidia: could not write %i Attributes; will retry." % len(attrs)
+        )
+        for attr in attrs:
+            _DIRTY.setdefault(attr.id, attr)
+        return 0
+    return len(attrs)
+
+
+def start():
+    """
+    Start writing hot Attributes behind. This is called at server start.
+    """
+    global _LOOP
+    if WRITE_BEHIND_INTERVAL and _LOOP is None:
+        _LOOP = LoopingCall(flush)
+        _LOOP.start(WRITE_BEHIND_INTERVAL, now=False)
+
+
+def stop():
+    """
+    Write everything still pending and go back to saving right away.
+    This is called when the server stops or reloads.
+    """
+    global _LOOP
+    if _LOOP is not None:
+        if _LOOP.running:
+            _LOOP.stop()
+        _LOOP = None
+    flush()